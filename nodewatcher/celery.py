@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import os
 
 import celery
+from celery import signals
 
 from django.conf import settings
 
@@ -15,3 +16,13 @@ app = celery.Celery('nodewatcher')
 # pickle the object when using Windows.
 app.config_from_object('django.conf:settings')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+@signals.worker_process_init.connect
+def warmup_worker_process(**kwargs):
+    """
+    Eagerly loads the configured per-application modules in each worker process.
+    """
+
+    from nodewatcher.utils import loader
+    loader.warmup()
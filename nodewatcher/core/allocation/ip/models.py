@@ -84,7 +84,7 @@ class IpPool(allocation_models.PoolBase):
         return left, right
 
     @allocation_models.PoolBase.modifies_pool
-    def reserve_subnet(self, network, prefix_len, check_only=False):
+    def reserve_subnet(self, network, prefix_len, check_only=False, reclaim=True):
         """
         Attempts to reserve a specific subnet in the allocation pool. The subnet
         must be a valid subnet and must be allocatable.
@@ -92,9 +92,11 @@ class IpPool(allocation_models.PoolBase):
         :param network: Subnet address
         :param prefix_len: Subnet prefix length
         :param check_only: Should only a check be performed and no actual allocation
+        :param reclaim: Should held down pools be reclaimed first; callers reserving
+          many subnets at once may reclaim them only once
         """
 
-        if not self.parent:
+        if not self.parent and reclaim:
             self.reclaim_held_down()
 
         if prefix_len == 31:
@@ -0,0 +1,92 @@
+from django.core.cache import cache
+
+
+def _get_generation_key(node_pk):
+    return 'nodewatcher.node.generation.%s' % node_pk
+
+
+def _get_user_permissions_generation_key(user_pk):
+    return 'nodewatcher.user.permissions.generation.%s' % user_pk
+
+
+def _get_router_id_index_generation_key():
+    return 'nodewatcher.routerid.generation'
+
+
+def _get_generation(key):
+    generation = cache.get(key)
+    if generation is None:
+        generation = 1
+        cache.add(key, generation, None)
+
+    return generation
+
+
+def _bump_generation(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Generation is not yet cached
+        cache.add(key, 2, None)
+
+
+def get_node_generation(node_pk):
+    """
+    Returns the current data generation of a node. The generation changes
+    whenever the node's configuration or monitoring data is modified, so it
+    may be used as part of cache keys for node-dependent content.
+
+    :param node_pk: Node primary key
+    """
+
+    return _get_generation(_get_generation_key(node_pk))
+
+
+def bump_node_generation(node_pk):
+    """
+    Invalidates all cached content that depends on the given node.
+
+    :param node_pk: Node primary key
+    """
+
+    _bump_generation(_get_generation_key(node_pk))
+
+
+def get_user_permissions_generation(user_pk):
+    """
+    Returns the current object permissions generation of a user. The generation
+    changes whenever object permissions of the user or of any of its groups are
+    assigned or revoked.
+
+    :param user_pk: User primary key
+    """
+
+    return _get_generation(_get_user_permissions_generation_key(user_pk))
+
+
+def bump_user_permissions_generation(user_pk):
+    """
+    Invalidates all cached content that depends on object permissions of the
+    given user.
+
+    :param user_pk: User primary key
+    """
+
+    _bump_generation(_get_user_permissions_generation_key(user_pk))
+
+
+def get_router_id_index_generation():
+    """
+    Returns the current generation of the router ID index. The generation changes
+    whenever any router ID is saved or deleted.
+    """
+
+    return _get_generation(_get_router_id_index_generation_key())
+
+
+def bump_router_id_index_generation():
+    """
+    Invalidates the router ID index.
+    """
+
+    _bump_generation(_get_router_id_index_generation_key())
@@ -1,23 +1,28 @@
 import copy
+import hashlib
 import re
 
 from django.conf import settings
+from django.core.cache import cache
 from django.template import loader
+from django.utils import timezone, translation
 
 from . import exceptions
+from ... import cache as core_cache
 
 # Exports
 __all__ = [
     'Partial',
     'PartialEntry',
-    'partials'
+    'partials',
+    'node_cache_key',
 ]
 
 VALID_NAME = re.compile('^[A-Za-z_][A-Za-z0-9_]*$')
 
 
 class PartialEntry(object):
-    def __init__(self, name, template, visible=None, weight=0, classes=None, extra_context=None):
+    def __init__(self, name, template, visible=None, weight=0, classes=None, extra_context=None, cache_key=None):
         if not name:
             raise exceptions.InvalidPartial("A partial entry has invalid name")
 
@@ -34,6 +39,7 @@ class PartialEntry(object):
         self._classes = ' '.join(classes)
 
         self._extra_context = extra_context
+        self._cache_key = cache_key
 
         self._context = None
 
@@ -63,11 +69,48 @@ class PartialEntry(object):
         else:
             return self._extra_context or {}
 
+    def get_cache_key(self, context):
+        if self._cache_key is None:
+            return None
+
+        key = self._cache_key(context)
+        if key is None:
+            return None
+
+        # Rendered output also depends on the active language and timezone
+        key = ':'.join([self._name, self._template, key, translation.get_language() or '', timezone.get_current_timezone_name()])
+        return 'nodewatcher.partial.%s' % hashlib.md5(key.encode('utf8')).hexdigest()
+
     def render(self, context=None):
         if context is None:
             context = self._context
+
+        cache_key = self.get_cache_key(context)
+        if cache_key is not None:
+            rendered = cache.get(cache_key)
+            if rendered is not None:
+                return rendered
+
         extra_context = self.get_extra_context(context)
-        return loader.render_to_string(self._template, extra_context, context)
+        rendered = loader.render_to_string(self._template, extra_context, context)
+
+        if cache_key is not None:
+            cache.set(cache_key, rendered, getattr(settings, 'FRONTEND_PARTIAL_CACHE_TIMEOUT', 300))
+
+        return rendered
+
+
+def node_cache_key(context):
+    """
+    A partial entry cache key for entries that only depend on the node in
+    the context. Cached entries are invalidated when the node's data changes.
+    """
+
+    node = context.get('node', None)
+    if node is None:
+        return None
+
+    return '%s:%s' % (node.pk, core_cache.get_node_generation(node.pk))
 
 
 class DeferredPartial(object):
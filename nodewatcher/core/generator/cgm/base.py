@@ -1,3 +1,9 @@
+import hashlib
+import json
+import pkgutil
+
+from django.utils import importlib
+
 from ....utils import loader
 
 from ...registry import registration
@@ -243,6 +249,7 @@ class PlatformBase(object):
         self._modules = []
         self._packages = []
         self._devices = {}
+        self._lazy_devices = {}
 
     def generate(self, node):
         """
@@ -251,9 +258,15 @@ class PlatformBase(object):
 
         cfg = self.config_class()
 
+        # Import the descriptor of a lazily registered device before the module chain is
+        # built, so that any device-specific modules it registers are included
+        router = getattr(node.config.core.general(), 'router', None)
+        if router in self._lazy_devices:
+            self.get_device(router)
+
         # Execute the module chain in order
         for _, module, device in sorted(self._modules):
-            if device is None or device == node.config.core.general().router:
+            if device is None or device == router:
                 module(node, cfg)
 
         # Process user-configured packages
@@ -345,17 +358,20 @@ class PlatformBase(object):
             except generator_models.BuildVersion.DoesNotExist:
                 raise exceptions.NoBuildersConfigured
 
-        # Select a proper builder
-        try:
-            builder = generator_models.Builder.objects.get(
-                platform=self.name,
-                architecture=device.architecture,
-                channels=build_channel,
-                version=version,
-            )
-        except generator_models.Builder.DoesNotExist:
+        # Select a proper builder; the build scheduler may later move the build to
+        # any equivalent builder that becomes available first
+        builders = list(generator_models.Builder.objects.filter(
+            platform=self.name,
+            architecture=device.architecture,
+            channels=build_channel,
+            version=version,
+        ).order_by('pk'))
+        if not builders:
             raise exceptions.NoSuitableBuildersFound
 
+        from .. import scheduler
+        builder = scheduler.select_builder(builders) or builders[0]
+
         return build_channel, builder
 
     def register_module(self, weight, module, device=None):
@@ -397,7 +413,29 @@ class PlatformBase(object):
             raise TypeError("Router descriptor must be a subclass of DeviceBase!")
 
         self._devices[device.identifier] = device
-        device.register(self)
+        # Registry choices of devices listed in the manifest have already been registered
+        device.register(self, register_choices=device.identifier not in self._lazy_devices)
+
+    def register_lazy_device(self, entry):
+        """
+        Registers a device from its manifest entry, without importing the
+        device descriptor. The descriptor module is imported on first use.
+
+        :param entry: Device manifest entry
+        """
+
+        if entry['identifier'] in self._devices or entry['identifier'] in self._lazy_devices:
+            return
+
+        self._lazy_devices[entry['identifier']] = entry
+        cgm_devices.register_device_choices(
+            self,
+            entry['identifier'],
+            entry['manufacturer'],
+            entry['name'],
+            entry['ports'],
+            entry['radios'],
+        )
 
     def get_device(self, device):
         """
@@ -406,8 +444,23 @@ class PlatformBase(object):
         :param device: Unique device identifier
         """
 
+        if device not in self._devices and device in self._lazy_devices:
+            # Importing the descriptor module registers the device
+            importlib.import_module(self._lazy_devices[device]['module'])
+
         return self._devices[device]
 
+    def get_devices(self):
+        """
+        Returns all device descriptors registered with this platform, importing
+        any descriptors that have not yet been loaded.
+        """
+
+        for identifier in self._lazy_devices:
+            self.get_device(identifier)
+
+        return self._devices.values()
+
 
 def register_platform(enum, text, platform):
     """
@@ -480,10 +533,81 @@ def iterate_devices():
     """
 
     for platform in PLATFORM_REGISTRY.values():
-        for device in platform._devices.values():
+        for device in platform.get_devices():
             yield device
 
 
+def _get_module_checksum(module):
+    """
+    Returns a checksum of a module's source, without importing the module.
+
+    :param module: Module name
+    :return: Checksum or None if the module source cannot be found
+    """
+
+    try:
+        module_loader = pkgutil.get_loader(module)
+        with open(module_loader.get_filename(), 'rb') as source:
+            return hashlib.sha1(source.read()).hexdigest()
+    except (AttributeError, IOError, ImportError):
+        return None
+
+
+def generate_device_manifest(modules):
+    """
+    Generates a device manifest for the devices registered by the given
+    modules. All modules must already be imported.
+
+    :param modules: A list of device module names
+    :return: Manifest dictionary
+    """
+
+    manifest = {'modules': {}}
+    for module in modules:
+        manifest['modules'][module] = {
+            'checksum': _get_module_checksum(module),
+            'devices': [],
+        }
+
+    for platform in PLATFORM_REGISTRY.values():
+        for device in platform.get_devices():
+            if device.__module__ not in manifest['modules']:
+                continue
+
+            manifest['modules'][device.__module__]['devices'].append(device.get_manifest_entry(platform))
+
+    return manifest
+
+
+def load_device_manifest(path):
+    """
+    Registers devices listed in a device manifest, so that their descriptor
+    modules are only imported when the devices are actually used. Modules
+    that have changed since the manifest was generated are skipped.
+
+    :param path: Path to the manifest file
+    :return: A set of module names that have been registered from the manifest
+    """
+
+    try:
+        with open(path, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (IOError, ValueError):
+        return set()
+
+    modules = set()
+    for module, module_entry in manifest.get('modules', {}).items():
+        if module_entry['checksum'] is None or module_entry['checksum'] != _get_module_checksum(module):
+            continue
+
+        for entry in module_entry['devices']:
+            get_platform(entry['platform']).register_lazy_device(entry)
+
+        modules.add(module)
+
+    return modules
+
+
 def generate_firmware(node, user=None, only_validate=False):
     """
     Generates configuration and/or firmware for the specified node.
@@ -202,6 +202,51 @@ class Switch(object):
         self.vlans = vlans
         self.cpu_tagged = cpu_tagged
 
+
+def register_device_choices(platform, identifier, manufacturer, name, ports, radios):
+    """
+    Registers configuration registry choices for a device.
+
+    :param platform: Platform instance
+    :param identifier: Device identifier
+    :param manufacturer: Device manufacturer
+    :param name: Device name
+    :param ports: A list of (identifier, description) tuples for device ports
+    :param radios: A list of (identifier, description) tuples for device radios
+    """
+
+    # Register a new choice in the configuration registry
+    registration.point('node.config').register_choice(
+        'core.general#router',
+        registration.Choice(
+            identifier,
+            _("%(manufacturer)s - %(name)s") % {'manufacturer': manufacturer, 'name': name},
+            limited_to=('core.general#platform', platform.name),
+        )
+    )
+
+    # Register a new choice for available device ports
+    for port_identifier, description in ports:
+        registration.point('node.config').register_choice(
+            'core.interfaces#eth_port',
+            registration.Choice(
+                port_identifier,
+                description,
+                limited_to=('core.general#router', identifier),
+            )
+        )
+
+    # Register a new choice for available device radios
+    for radio_identifier, description in radios:
+        registration.point('node.config').register_choice(
+            'core.interfaces#wifi_radio',
+            registration.Choice(
+                radio_identifier,
+                description,
+                limited_to=('core.general#router', identifier),
+            )
+        )
+
 # A list of attributes that are required to be defined
 REQUIRED_DEVICE_ATTRIBUTES = (
     'identifier',
@@ -284,43 +329,23 @@ class DeviceBase(object):
     switches = None
 
     @classmethod
-    def register(cls, platform):
+    def register(cls, platform, register_choices=True):
         """
         Performs device model registration.
 
         :param platform: Platform instance
+        :param register_choices: Set to False when registry choices have already
+          been registered from the device manifest
         """
 
-        # Register a new choice in the configuration registry
-        registration.point('node.config').register_choice(
-            'core.general#router',
-            registration.Choice(
+        if register_choices:
+            register_device_choices(
+                platform,
                 cls.identifier,
-                _("%(manufacturer)s - %(name)s") % {'manufacturer': cls.manufacturer, 'name': cls.name},
-                limited_to=('core.general#platform', platform.name),
-            )
-        )
-
-        # Register a new choice for available device ports
-        for port in cls.ports:
-            registration.point('node.config').register_choice(
-                'core.interfaces#eth_port',
-                registration.Choice(
-                    port.identifier,
-                    port.description,
-                    limited_to=('core.general#router', cls.identifier),
-                )
-            )
-
-        # Register a new choice for available device radios
-        for radio in cls.radios:
-            registration.point('node.config').register_choice(
-                'core.interfaces#wifi_radio',
-                registration.Choice(
-                    radio.identifier,
-                    radio.description,
-                    limited_to=('core.general#router', cls.identifier),
-                )
+                cls.manufacturer,
+                cls.name,
+                [(port.identifier, port.description) for port in cls.ports],
+                [(radio.identifier, radio.description) for radio in cls.radios],
             )
 
         # Register CGM methods
@@ -335,6 +360,27 @@ class DeviceBase(object):
                     cls.identifier,
                 )
 
+    @classmethod
+    def get_manifest_entry(cls, platform):
+        """
+        Returns device metadata suitable for inclusion in the device manifest,
+        which enables registration without importing the descriptor.
+
+        :param platform: Platform instance
+        """
+
+        return {
+            'identifier': cls.identifier,
+            'platform': platform.name,
+            'manufacturer': unicode(cls.manufacturer),
+            'name': unicode(cls.name),
+            'architecture': cls.architecture,
+            'module': cls.__module__,
+            'ports': [[port.identifier, unicode(port.description)] for port in cls.ports],
+            'radios': [[radio.identifier, unicode(radio.description)] for radio in cls.radios],
+            'profile': cls.profiles.get(platform.name, None),
+        }
+
     @classmethod
     def remap_port(cls, platform, interface_or_port):
         """
@@ -7,8 +7,10 @@ pre_firmware_build = dispatch.Signal(providing_args=['result'])
 # downloaded from the builder. If the build process fails, this signal is
 # not emitted.
 #
-# The files variable contains a list of (name, content) tuples which may
-# be replaced or even erased.
+# The files variable contains a list of (name, file) tuples which may
+# be replaced or even erased. Files are connection.ResultFile instances
+# with precomputed checksums; handlers may also replace them with plain
+# string content.
 post_firmware_build = dispatch.Signal(providing_args=['result', 'files'])
 
 # Called after build succeeds and post_firmware_build handlers have been called
@@ -1,25 +1,24 @@
-import hashlib
 import io
 import os
 
 from celery.task import task as celery_task
 
-from django.core.files import uploadedfile
-from django import db
 from django.db import transaction
 
 from ....utils import loader
 
 from . import signals, base as cgm_base, exceptions
 from .. import models as generator_models
-from .. import events as generator_events
+from .. import connection, events as generator_events
+from .. import scheduler
 
 
 @celery_task(bind=True)
-@transaction.atomic
 def background_build(self, result_uuid):
     """
-    A task for deferred building of a firmware image.
+    A task for deferred building of a firmware image. When all compatible
+    builders are busy, the build result remains queued and is dispatched
+    again once a build in the same builder pool completes.
 
     :param result_uuid: Destination build result UUID
     """
@@ -28,16 +27,53 @@ def background_build(self, result_uuid):
     if result.status != generator_models.BuildResult.PENDING:
         return
 
-    # Try to lock the builder for building
+    # Start the build on the least-loaded compatible builder
+    if not scheduler.claim(result):
+        # Older queued builds may still be waiting for a free builder
+        scheduler.dispatch_pending(result.builder, result.build_channel_id)
+        return
+
     try:
-        generator_models.Builder.objects.select_for_update(nowait=True).filter(pk=result.builder.pk)
-    except db.DatabaseError:
-        # Retry the build task again in 15 seconds
-        raise self.retry(countdown=15)
+        build(result)
+    except:
+        # The build has already been claimed, so it must not remain in building state
+        # and count towards builder load when it fails outside of the platform build
+        if generator_models.BuildResult.objects.filter(pk=result.pk, status=generator_models.BuildResult.BUILDING).exists():
+            fail_build(result, 'Internal build error.')
+        raise
+    finally:
+        # Dispatch queued builds to the builder which has just become available; the
+        # builder may be shared between build channels
+        for build_channel in result.builder.channels.values_list('pk', flat=True):
+            scheduler.dispatch_pending(result.builder, build_channel)
+
+
+def fail_build(result, build_log):
+    """
+    Marks a build result as failed.
 
-    result.status = generator_models.BuildResult.BUILDING
+    :param result: Build result
+    :param build_log: Build log to store
+    """
+
+    result.build_log = build_log
+    result.status = generator_models.BuildResult.FAILED
     result.save()
 
+    # Dispatch error signal
+    signals.fail_firmware_build.send(sender=None, result=result)
+    # Dispatch the result failed event
+    generator_events.BuildResultFailed(result).post()
+
+
+def build(result):
+    """
+    Builds the firmware for a build result, which has already been assigned
+    a builder.
+
+    :param result: Destination build result
+    """
+
     # Ensure that all CGMs are loaded before doing processing
     loader.load_modules('cgm')
     platform = cgm_base.get_platform(result.builder.platform)
@@ -49,50 +85,39 @@ def background_build(self, result_uuid):
     try:
         files = platform.build(result)
     except exceptions.BuildError, e:
-        if len(e.args) > 0:
-            result.build_log = e.args[0]
-
-        result.status = generator_models.BuildResult.FAILED
-        result.save()
-
-        # Dispatch error signal
-        signals.fail_firmware_build.send(sender=None, result=result)
-        # Dispatch the result failed event
-        generator_events.BuildResultFailed(result).post()
+        fail_build(result, e.args[0] if len(e.args) > 0 else result.build_log)
         return
     except:
-        result.build_log = 'Internal build error.'
-        result.status = generator_models.BuildResult.FAILED
-        result.save()
-
-        # Dispatch error signal
-        signals.fail_firmware_build.send(sender=None, result=result)
-        # Dispatch the result failed event
-        generator_events.BuildResultFailed(result).post()
+        fail_build(result, 'Internal build error.')
         return
 
     # Dispatch signal that can be used to modify files
     signals.post_firmware_build.send(sender=None, result=result, files=files)
 
-    # Store resulting files
-    for fw_name, fw_file in files:
-        r_file = generator_models.BuildResultFile(
-            result=result,
-            file=uploadedfile.InMemoryUploadedFile(
-                io.BytesIO(fw_file),
-                None,
-                os.path.basename(fw_name),
-                'application/octet-stream',
-                len(fw_file),
-                None
-            ),
-            checksum_md5=hashlib.md5(fw_file).hexdigest(),
-            checksum_sha256=hashlib.sha256(fw_file).hexdigest(),
-        )
-        r_file.save()
-
-    result.status = generator_models.BuildResult.OK
-    result.save()
+    try:
+        with transaction.atomic():
+            # Store resulting files
+            for fw_name, fw_file in files:
+                if not isinstance(fw_file, connection.ResultFile):
+                    # Content has been replaced by a signal handler
+                    fw_file = connection.ResultFile(fw_name, io.BytesIO(fw_file))
+
+                fw_file.name = os.path.basename(fw_name)
+                r_file = generator_models.BuildResultFile(
+                    result=result,
+                    file=fw_file,
+                    checksum_md5=fw_file.checksum_md5,
+                    checksum_sha256=fw_file.checksum_sha256,
+                )
+                r_file.save()
+
+            result.status = generator_models.BuildResult.OK
+            result.save()
+    finally:
+        # Remove local temporary files
+        for fw_name, fw_file in files:
+            if isinstance(fw_file, connection.ResultFile):
+                fw_file.close()
 
     # Dispatch finalize signal
     signals.finalize_firmware_build.send(sender=None, result=result)
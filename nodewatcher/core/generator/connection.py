@@ -3,110 +3,337 @@ import io
 import os
 import paramiko
 import pipes
+import tarfile
+import tempfile
+import threading
+import time
+
+from django.core.files import base as files_base
 
 from . import exceptions
 from .cgm import exceptions as cgm_exceptions
 
 BUILDER_PATH = '/builder/imagebuilder'
 
+# Maximum number of idle connections that are kept open for each builder
+POOL_MAX_IDLE = 2
+# Number of seconds after which an idle pooled connection is discarded
+POOL_IDLE_TIMEOUT = 300
+# Size of chunks in which result files are transferred from the builder
+RESULT_CHUNK_SIZE = 64 * 1024
 
-class BuilderConnection(object):
+
+class ResultFile(files_base.File):
     """
-    Connection with the builder.
+    A build result file spooled to a local temporary file, together with its
+    checksums, which are computed while the file is being transferred.
     """
 
-    def __init__(self, builder):
+    def __init__(self, name, source=None):
         """
         Class constructor.
 
-        :param builder: Builder configuration object
+        :param name: File name
+        :param source: Optional file-like object to copy the content from
         """
 
-        self.builder = builder
-        self.tempdirs = []
+        super(ResultFile, self).__init__(tempfile.TemporaryFile(), name)
 
-    def __enter__(self):
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        self._size = 0
+
+        if source is not None:
+            while True:
+                chunk = source.read(RESULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                self.append(chunk)
+
+            self.file.seek(0)
+
+    def append(self, chunk):
+        """
+        Appends a chunk of content to the file and updates its checksums.
+
+        :param chunk: Content chunk
+        """
+
+        self.file.write(chunk)
+        self._md5.update(chunk)
+        self._sha256.update(chunk)
+        self._size += len(chunk)
+
+    @property
+    def checksum_md5(self):
+        return self._md5.hexdigest()
+
+    @property
+    def checksum_sha256(self):
+        return self._sha256.hexdigest()
+
+
+class PooledClient(object):
+    """
+    An authenticated SSH client together with its SFTP session.
+    """
+
+    def __init__(self, client):
+        """
+        Class constructor.
+
+        :param client: Connected paramiko SSH client
+        """
+
+        self.client = client
+        self.sftp = client.get_transport().open_sftp_client()
+        self.released = time.time()
+
+    def is_usable(self):
+        """
+        Returns true if the underlying transport is still active.
+        """
+
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self):
+        """
+        Closes the SFTP session and the SSH connection.
         """
-        Establishes a connection with the builder.
+
+        try:
+            self.sftp.close()
+        except (paramiko.SSHException, EOFError, IOError):
+            pass
+
+        self.client.close()
+
+
+class BuilderConnectionPool(object):
+    """
+    A per-process pool of authenticated builder connections, so that consecutive
+    builds on the same builder do not need to repeat SSH handshakes.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _get_key(self, builder):
+        """
+        Returns the pool key for a given builder. The private key is part of the
+        key, so that changing builder credentials never reuses old connections.
+        """
+
+        return (builder.host, hashlib.sha1(builder.private_key.encode('utf8')).hexdigest())
+
+    def _connect(self, builder):
+        """
+        Establishes a new connection with the builder.
+
+        :param builder: Builder configuration object
         """
 
         # Load private key (detect RSA or DSS)
         try:
-            pkey = paramiko.RSAKey.from_private_key(io.StringIO(self.builder.private_key))
+            pkey = paramiko.RSAKey.from_private_key(io.StringIO(builder.private_key))
         except paramiko.SSHException:
             # Not a RSA key, try to decode the key as a DSS key
             try:
-                pkey = paramiko.DSSKey.from_private_key(io.StringIO(self.builder.private_key))
+                pkey = paramiko.DSSKey.from_private_key(io.StringIO(builder.private_key))
             except paramiko.SSHException:
                 raise exceptions.MalformedPrivateKey
 
         try:
-            self.client = paramiko.SSHClient()
-            self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.client.connect(
-                hostname=self.builder.host,
+            client = paramiko.SSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            client.connect(
+                hostname=builder.host,
                 username='builder',
                 pkey=pkey,
             )
-            transport = self.client.get_transport()
-            transport.set_keepalive(60)
-            self.sftp = transport.open_sftp_client()
+            client.get_transport().set_keepalive(60)
+            return PooledClient(client)
         except (paramiko.SSHException, paramiko.SFTPError):
             raise exceptions.BuilderConnectionFailed
 
+    def acquire(self, builder):
+        """
+        Returns an idle connection to the builder or establishes a new one.
+
+        :param builder: Builder configuration object
+        :return: A PooledClient instance
+        """
+
+        key = self._get_key(builder)
+        stale = []
+        pooled = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                candidate = idle.pop()
+                if candidate.is_usable() and time.time() - candidate.released < POOL_IDLE_TIMEOUT:
+                    pooled = candidate
+                    break
+
+                stale.append(candidate)
+
+        for candidate in stale:
+            candidate.close()
+
+        if pooled is None:
+            pooled = self._connect(builder)
+
+        return pooled
+
+    def release(self, builder, pooled):
+        """
+        Returns a connection back into the pool.
+
+        :param builder: Builder configuration object
+        :param pooled: A PooledClient instance previously obtained via acquire
+        """
+
+        if not pooled.is_usable():
+            pooled.close()
+            return
+
+        pooled.released = time.time()
+        with self._lock:
+            idle = self._idle.setdefault(self._get_key(builder), [])
+            if len(idle) < POOL_MAX_IDLE:
+                idle.append(pooled)
+                return
+
+        pooled.close()
+
+    def discard(self, pooled):
+        """
+        Closes a connection that should not be reused.
+
+        :param pooled: A PooledClient instance previously obtained via acquire
+        """
+
+        pooled.close()
+
+    def close_all(self):
+        """
+        Closes all idle connections.
+        """
+
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for connections in idle.values():
+            for pooled in connections:
+                pooled.close()
+
+pool = BuilderConnectionPool()
+
+
+class BuilderConnection(object):
+    """
+    Connection with the builder.
+    """
+
+    def __init__(self, builder):
+        """
+        Class constructor.
+
+        :param builder: Builder configuration object
+        """
+
+        self.builder = builder
+        self.tempdirs = []
+        self.pending = []
+        self.pooled = None
+
+    @property
+    def client(self):
+        return self.pooled.client
+
+    @property
+    def sftp(self):
+        return self.pooled.sftp
+
+    def __enter__(self):
+        """
+        Obtains a connection with the builder from the connection pool.
+        """
+
+        self.pooled = pool.acquire(self.builder)
         return self
 
-    def __exit__(self, *args):
+    def __exit__(self, exc_type, exc_value, traceback):
         """
-        Cleans up any temporary resources and closes the connection.
+        Cleans up any temporary resources and returns the connection to the pool.
         """
 
-        # Cleanup temporary directories
-        for tmpdir in self.tempdirs:
-            self.client.exec_command('rm -rf %s' % tmpdir)
+        self.pending = []
 
-        self.client.close()
+        try:
+            # Cleanup temporary directories
+            if self.tempdirs:
+                self.client.exec_command('rm -rf %s' % " ".join([pipes.quote(tmpdir) for tmpdir in self.tempdirs]))
+        except paramiko.SSHException:
+            pool.discard(self.pooled)
+            return
+
+        if exc_type is not None and issubclass(exc_type, (paramiko.SSHException, EOFError, IOError)):
+            # The connection may be in an undefined state, so do not reuse it
+            pool.discard(self.pooled)
+        else:
+            pool.release(self.builder, self.pooled)
+
+    def _add_pending(self, path, content=None, mode=None, directory=False):
+        """
+        Queues a file or a directory for upload with the next archive.
+        """
+
+        info = tarfile.TarInfo(path.lstrip('/'))
+        info.mtime = int(time.time())
+        if directory:
+            info.type = tarfile.DIRTYPE
+            info.mode = 0755 if mode is None else mode
+        else:
+            info.size = len(content)
+            info.mode = 0644 if mode is None else mode
+
+        self.pending.append((info, content))
 
     def create_tempdir(self):
         """
-        Creates a remote temporary directory.
+        Creates a remote temporary directory. The directory is created together
+        with the rest of the uploaded files.
         """
 
         dirname = os.path.join('/tmp', hashlib.md5(os.urandom(16)).hexdigest()[:16])
-        try:
-            self.sftp.mkdir(dirname)
-        except IOError:
-            raise cgm_exceptions.BuildError('Failed to create temporary directory.')
+        self._add_pending(dirname, mode=0700, directory=True)
 
         self.tempdirs.append(dirname)
         return dirname
 
     def write_file(self, path, content, mode=None):
         """
-        Creates a file with specific content on the builder.
+        Creates a file with specific content on the builder. Files are queued and
+        uploaded as a single archive before the next command is executed; any
+        directories leading up to the file are created automatically.
 
         :param path: File path
         :param content: File content
         :param mode: File mode
         """
 
-        # Ensure that all directories leading up to the file are created
-        components = os.path.dirname(path).split('/')[1:]
-        for idx, component in enumerate(components):
-            try:
-                self.sftp.mkdir('/%s' % os.path.join('/'.join(components[:idx]), component))
-            except IOError:
-                pass
+        if isinstance(content, unicode):
+            content = content.encode('utf8')
 
-        # Write the file
-        try:
-            with self.sftp.open(path, 'w') as fobj:
-                fobj.write(content)
-
-            if mode is not None:
-                self.sftp.chmod(path, mode)
-        except IOError:
-            raise cgm_exceptions.BuildError('Failed to write file: %s' % path)
+        self._add_pending(path, content, mode=mode)
 
     def chmod(self, path, mode):
         """
@@ -116,16 +343,55 @@ class BuilderConnection(object):
         :param mode: New permissions
         """
 
+        # If the path is part of the pending upload, the mode is applied on extraction
+        arcname = path.lstrip('/')
+        for info, content in self.pending:
+            if info.name == arcname:
+                info.mode = mode
+                return
+
+        if any([info.name.startswith(arcname + '/') for info, content in self.pending]):
+            self._add_pending(path, mode=mode, directory=True)
+            return
+
         try:
             self.sftp.chmod(path, mode)
         except IOError:
             raise cgm_exceptions.BuildError('Failed to chmod file: %s' % path)
 
+    def upload_files(self):
+        """
+        Streams all queued files to the builder as one tar archive, which is
+        extracted remotely.
+        """
+
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, []
+
+        try:
+            stdin, stdout, stderr = self.client.exec_command('tar -x -p -f - -C / 2>&1')
+            archive = tarfile.open(fileobj=stdin, mode='w|')
+            for info, content in pending:
+                archive.addfile(info, io.BytesIO(content) if content is not None else None)
+            archive.close()
+            stdin.channel.shutdown_write()
+
+            output = stdout.read()
+            if stdout.channel.recv_exit_status() != 0:
+                raise cgm_exceptions.BuildError('Failed to upload files: %s' % output)
+        except (paramiko.SSHException, IOError):
+            raise cgm_exceptions.BuildError('Failed to upload files.')
+
     def call(self, *args):
         """
         Executes a builder command.
         """
 
+        # Ensure that all files are available before the command runs
+        self.upload_files()
+
         try:
             cmd = [
                 'cd %s;' % BUILDER_PATH,
@@ -152,3 +418,16 @@ class BuilderConnection(object):
 
         with self.sftp.open(os.path.join(BUILDER_PATH, path), 'r') as fobj:
             return fobj.read()
+
+    def fetch_result_file(self, path):
+        """
+        Streams a result file from the builder into a local temporary file,
+        without holding the whole file in memory.
+
+        :param path: Path relative to the builder directory
+        :return: A ResultFile instance
+        """
+
+        with self.sftp.open(os.path.join(BUILDER_PATH, path), 'r') as fobj:
+            fobj.prefetch()
+            return ResultFile(os.path.basename(path), fobj)
@@ -125,9 +125,10 @@ class Builder(models.Model):
     private_key = models.TextField(
         help_text=_('Private key for SSH authentication.'),
     )
-
-    class Meta:
-        unique_together = ('platform', 'architecture', 'version')
+    capacity = models.PositiveIntegerField(
+        default=1,
+        help_text=_('Maximum number of concurrent builds on this builder.'),
+    )
 
     def get_metadata(self):
         """
@@ -252,6 +253,28 @@ class BuildResult(models.Model):
         default=PENDING,
         help_text=_('Build status.')
     )
+    started = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        help_text=_('Timestamp when the build was started on a builder.'),
+    )
+
+    def get_queue_position(self):
+        """
+        Returns the number of builds queued before this one.
+        """
+
+        from . import scheduler
+        return scheduler.get_queue_position(self)
+
+    def get_eta(self):
+        """
+        Returns the estimated time until this build completes.
+        """
+
+        from . import scheduler
+        return scheduler.get_eta(self)
 
     def __repr__(self):
         return '<BuildResult for node \'%s\'>' % self.node_id
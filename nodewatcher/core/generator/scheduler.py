@@ -0,0 +1,249 @@
+import datetime
+
+from django.db import models as django_models, transaction
+from django.utils import timezone
+
+from . import models as generator_models
+
+# Builds running for longer than this are considered lost and do not count towards builder load
+BUILD_TIMEOUT = datetime.timedelta(hours=1)
+# Build duration estimate used when no completed builds are available for a builder pool
+DEFAULT_BUILD_DURATION = datetime.timedelta(minutes=5)
+# Number of recently completed builds used for estimating build duration
+DURATION_SAMPLE_SIZE = 20
+
+
+def get_compatible_builders(builder, build_channel=None):
+    """
+    Returns all builders that are equivalent to the given builder, forming a
+    builder pool. Builders are equivalent when they have the same platform,
+    architecture and version.
+
+    :param builder: Builder instance
+    :param build_channel: Optional build channel the builders must belong to
+    :return: Builder queryset
+    """
+
+    builders = generator_models.Builder.objects.filter(
+        platform=builder.platform,
+        architecture=builder.architecture,
+        version=builder.version_id,
+    )
+
+    if build_channel is not None:
+        builders = builders.filter(channels=build_channel)
+
+    return builders.order_by('pk')
+
+
+def get_pool_results(builder, build_channel=None):
+    """
+    Returns all build results belonging to the builder pool of the given builder.
+
+    :param builder: Builder instance
+    :param build_channel: Optional build channel the results must belong to
+    :return: BuildResult queryset
+    """
+
+    results = generator_models.BuildResult.objects.filter(
+        builder__platform=builder.platform,
+        builder__architecture=builder.architecture,
+        builder__version=builder.version_id,
+    )
+
+    if build_channel is not None:
+        results = results.filter(build_channel=build_channel)
+
+    return results
+
+
+def get_builder_loads(builders):
+    """
+    Returns the number of builds that are currently running on each of the
+    given builders.
+
+    :param builders: A list of builder instances
+    :return: A dictionary mapping builder primary keys to running build counts
+    """
+
+    loads = dict([(builder.pk, 0) for builder in builders])
+    running = generator_models.BuildResult.objects.filter(
+        builder__in=[builder.pk for builder in builders],
+        status=generator_models.BuildResult.BUILDING,
+        started__gte=timezone.now() - BUILD_TIMEOUT,
+    ).values('builder').annotate(count=django_models.Count('pk'))
+
+    for item in running:
+        loads[item['builder']] = item['count']
+
+    return loads
+
+
+def select_builder(builders, loads=None):
+    """
+    Selects the least-loaded builder that still has free capacity.
+
+    :param builders: A list of compatible builder instances
+    :param loads: Optional precomputed builder loads
+    :return: Builder instance or None when all builders are busy
+    """
+
+    if loads is None:
+        loads = get_builder_loads(builders)
+
+    candidates = [builder for builder in builders if loads[builder.pk] < builder.capacity]
+    if not candidates:
+        return None
+
+    return min(candidates, key=lambda builder: float(loads[builder.pk]) / builder.capacity)
+
+
+def get_free_capacity(builders, loads=None):
+    """
+    Returns the number of builds that can still be started on the given builders.
+
+    :param builders: A list of compatible builder instances
+    :param loads: Optional precomputed builder loads
+    """
+
+    if loads is None:
+        loads = get_builder_loads(builders)
+
+    return sum([max(0, builder.capacity - loads[builder.pk]) for builder in builders])
+
+
+def claim(result):
+    """
+    Attempts to start the given pending build result on the least-loaded
+    compatible builder. Build results are started in the order they were
+    created, so a result is only claimed when all older pending results in
+    the same builder pool and build channel can be started as well.
+
+    :param result: Pending build result
+    :return: True if the result has been claimed for building, False if it
+      should remain queued
+    """
+
+    with transaction.atomic():
+        # Lock all builders in the pool, so that concurrent schedulers see consistent loads
+        builders = list(get_compatible_builders(result.builder, result.build_channel).select_for_update())
+        if not builders:
+            return False
+
+        try:
+            locked = generator_models.BuildResult.objects.select_for_update().get(
+                pk=result.pk,
+                status=generator_models.BuildResult.PENDING,
+            )
+        except generator_models.BuildResult.DoesNotExist:
+            # Result has already been claimed by another worker
+            return False
+
+        loads = get_builder_loads(builders)
+        older = get_pool_results(result.builder, result.build_channel_id).filter(
+            status=generator_models.BuildResult.PENDING,
+            created__lt=locked.created,
+        ).count()
+        if older >= get_free_capacity(builders, loads):
+            return False
+
+        builder = select_builder(builders, loads)
+        if builder is None:
+            return False
+
+        locked.builder = builder
+        locked.status = generator_models.BuildResult.BUILDING
+        locked.started = timezone.now()
+        locked.save()
+
+    result.builder = locked.builder
+    result.status = locked.status
+    result.started = locked.started
+    return True
+
+
+def dispatch_pending(builder, build_channel):
+    """
+    Enqueues build tasks for the oldest pending results of the builder pool in
+    the given build channel, as many as there is free capacity in the channel.
+
+    :param builder: Any builder of the pool
+    :param build_channel: Build channel
+    """
+
+    builders = list(get_compatible_builders(builder, build_channel))
+    free = get_free_capacity(builders)
+    if not free:
+        return
+
+    pending = get_pool_results(builder, build_channel).filter(
+        status=generator_models.BuildResult.PENDING,
+    ).order_by('created').values_list('pk', flat=True)[:free]
+
+    from .cgm import tasks
+    for result_uuid in pending:
+        tasks.background_build.delay(result_uuid)
+
+
+def get_build_duration(builder):
+    """
+    Returns the estimated duration of a single build in the builder pool,
+    based on recently completed builds.
+
+    :param builder: Any builder of the pool
+    :return: A timedelta instance
+    """
+
+    durations = [
+        last_modified - started
+        for started, last_modified in get_pool_results(builder).filter(
+            status=generator_models.BuildResult.OK,
+            started__isnull=False,
+        ).order_by('-last_modified').values_list('started', 'last_modified')[:DURATION_SAMPLE_SIZE]
+    ]
+
+    if not durations:
+        return DEFAULT_BUILD_DURATION
+
+    return sum(durations, datetime.timedelta()) / len(durations)
+
+
+def get_queue_position(result):
+    """
+    Returns the number of pending build results that will be started before
+    the given one.
+
+    :param result: Build result instance
+    :return: Queue position or None if the result is not pending
+    """
+
+    if result.status != generator_models.BuildResult.PENDING:
+        return None
+
+    return get_pool_results(result.builder, result.build_channel_id).filter(
+        status=generator_models.BuildResult.PENDING,
+        created__lt=result.created,
+    ).count()
+
+
+def get_eta(result):
+    """
+    Returns the estimated time until the given build result completes.
+
+    :param result: Build result instance
+    :return: A timedelta instance or None if the result is already finished
+    """
+
+    duration = get_build_duration(result.builder)
+
+    if result.status == generator_models.BuildResult.BUILDING:
+        if result.started is None:
+            return duration
+
+        return max(datetime.timedelta(), duration - (timezone.now() - result.started))
+    elif result.status != generator_models.BuildResult.PENDING:
+        return None
+
+    builders = get_compatible_builders(result.builder, result.build_channel_id)
+    capacity = sum([builder.capacity for builder in builders]) or 1
+    return duration * (get_queue_position(result) // capacity + 1)
@@ -0,0 +1,35 @@
+import unittest
+
+from . import scheduler
+
+
+class DummyBuilder(object):
+    def __init__(self, pk, capacity):
+        self.pk = pk
+        self.capacity = capacity
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.builders = [
+            DummyBuilder('a', 1),
+            DummyBuilder('b', 2),
+            DummyBuilder('c', 4),
+        ]
+
+    def test_select_least_loaded(self):
+        builder = scheduler.select_builder(self.builders, {'a': 0, 'b': 1, 'c': 1})
+        self.assertEqual(builder.pk, 'a')
+
+        builder = scheduler.select_builder(self.builders, {'a': 1, 'b': 1, 'c': 1})
+        self.assertEqual(builder.pk, 'c')
+
+        builder = scheduler.select_builder(self.builders, {'a': 1, 'b': 1, 'c': 3})
+        self.assertEqual(builder.pk, 'b')
+
+    def test_select_busy(self):
+        self.assertIsNone(scheduler.select_builder(self.builders, {'a': 1, 'b': 2, 'c': 4}))
+
+    def test_free_capacity(self):
+        self.assertEqual(scheduler.get_free_capacity(self.builders, {'a': 0, 'b': 0, 'c': 0}), 7)
+        self.assertEqual(scheduler.get_free_capacity(self.builders, {'a': 1, 'b': 1, 'c': 5}), 1)
@@ -1,10 +1,15 @@
 import uuid
 
+from django import dispatch
+from django.contrib.auth import models as auth_models
 from django.db import models
+from django.db.models import signals as django_signals
 from django.utils.translation import ugettext_lazy as _
 
-from . import validators as core_validators
-from .registry import fields as registry_fields, registration
+from . import cache as core_cache, validators as core_validators
+from .registry import fields as registry_fields, models as registry_models, registration
+
+from guardian import models as guardian_models
 
 
 class Node(models.Model):
@@ -108,3 +113,72 @@ class StaticIpRouterIdConfig(RouterIdConfig):
         super(StaticIpRouterIdConfig, self).save(*args, **kwargs)
 
 registration.point('node.config').register_item(StaticIpRouterIdConfig)
+
+
+@dispatch.receiver([django_signals.post_save, django_signals.post_delete])
+def node_registry_item_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidates cached node content when any of the node's registry items change.
+    """
+
+    if not isinstance(instance, registry_models.RegistryItemBase):
+        return
+
+    # Saves of unmodified registry items are skipped, but still signalled
+    if update_fields is not None and not update_fields:
+        return
+
+    if instance.get_registry_regpoint().model is not Node or not instance.root_id:
+        return
+
+    core_cache.bump_node_generation(instance.root_id)
+
+
+@dispatch.receiver([django_signals.post_save, django_signals.post_delete])
+def router_id_changed(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalidates the router ID index when any router ID changes.
+    """
+
+    if not isinstance(instance, RouterIdConfig):
+        return
+
+    if update_fields is not None and not update_fields:
+        return
+
+    from . import routerid as core_routerid
+
+    core_routerid.invalidate()
+
+
+@dispatch.receiver([django_signals.post_save, django_signals.post_delete])
+def object_permission_changed(sender, instance, **kwargs):
+    """
+    Invalidates cached node permission sets when object permissions are assigned
+    or revoked.
+    """
+
+    from . import permissions as core_permissions
+
+    if isinstance(instance, guardian_models.UserObjectPermissionBase):
+        core_permissions.invalidate_users([instance.user_id])
+    elif isinstance(instance, guardian_models.GroupObjectPermissionBase):
+        core_permissions.invalidate_groups([instance.group_id])
+
+
+@dispatch.receiver(django_signals.m2m_changed, sender=auth_models.User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Invalidates cached node permission sets when group membership changes.
+    """
+
+    from . import permissions as core_permissions
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            core_permissions.invalidate_users([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        core_permissions.invalidate_users(pk_set)
+    elif action == 'pre_clear':
+        # Members are no longer known after the group has been cleared
+        core_permissions.invalidate_groups([instance.pk])
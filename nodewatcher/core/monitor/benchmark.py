@@ -0,0 +1,429 @@
+import BaseHTTPServer
+import json
+import multiprocessing
+import resource
+import SocketServer
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.backends import utils as db_utils
+
+from django_datastream import datastream
+
+from . import worker
+from .config import config as monitor_config
+from .. import models as core_models
+
+# Namespace for identifiers of synthetic nodes
+BENCHMARK_UUID_NAMESPACE = uuid.UUID('a6c8b8e4-3b0e-4b2b-9d1e-6f2f1a3e7c55')
+
+
+class SyntheticNode(object):
+    """
+    A synthetic node, which produces telemetry that changes on every fetch.
+    """
+
+    def __init__(self, index):
+        """
+        Class constructor.
+
+        :param index: Node index
+        """
+
+        self.index = index
+        self.uuid = str(uuid.uuid5(BENCHMARK_UUID_NAMESPACE, 'node-%d' % index))
+        self.name = 'bench-%d' % index
+        value = index + 1
+        self.router_id = '127.100.%d.%d' % (value // 250, value % 250 + 1)
+        self.fetches = 0
+        self.started = time.time()
+
+    def get_interface(self, name, config, counter):
+        statistics = dict([
+            (key, 0) for key in (
+                'collisions', 'multicast', 'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped',
+            )
+        ])
+        statistics.update({
+            'rx_packets': counter * 10,
+            'tx_packets': counter * 12,
+            'rx_bytes': counter * 10 * 512,
+            'tx_bytes': counter * 12 * 512,
+        })
+
+        return {
+            'name': name,
+            'config': config,
+            'addresses': [{'family': 'ipv4', 'address': self.router_id, 'mask': 32}],
+            'mac': '02:00:%02x:%02x:%02x:%02x' % tuple([(self.index >> shift) & 0xff for shift in (24, 16, 8, 0)]),
+            'mtu': 1500,
+            'up': True,
+            'carrier': True,
+            'statistics': statistics,
+        }
+
+    def get_feed(self):
+        """
+        Returns the nodewatcher HTTP telemetry feed of this node.
+        """
+
+        self.fetches += 1
+        counter = self.fetches * (self.index % 7 + 1)
+
+        return json.dumps({
+            'core.general': {
+                'uuid': self.uuid,
+                'hostname': self.name,
+                'version': 'git.benchmark',
+                'kernel': '3.10.36',
+                'local_time': int(time.time()),
+                'uptime': int(time.time() - self.started) + 60,
+                'hardware': {'board': 'tl-wr741nd-v4', 'model': 'TP-Link TL-WR740N/ND v4'},
+                '_meta': {'version': 4},
+            },
+            'core.interfaces': {
+                'wlan0': self.get_interface('wlan0', 'mesh', counter),
+                'eth0': self.get_interface('eth0', 'wan', counter * 3),
+                '_meta': {'version': 3},
+            },
+            'core.resources': {
+                'load_average': {'avg1': '0.05', 'avg5': '0.18', 'avg15': '0.27'},
+                'memory': {'total': 28988, 'free': 5888 + counter % 1024, 'buffers': 2016, 'cache': 6348},
+                'connections': {'ipv4': {'tcp': 3, 'udp': 15}, 'ipv6': {'tcp': 2, 'udp': 1}},
+                'processes': {'running': 3, 'sleeping': 33, 'blocked': 0, 'zombie': 0, 'stopped': 0, 'paging': 0},
+                'cpu': {'user': 2, 'system': 0, 'nice': 2, 'idle': 96, 'iowait': 0, 'irq': 0, 'softirq': 0},
+                '_meta': {'version': 2},
+            },
+        })
+
+
+class SyntheticMesh(object):
+    """
+    A synthetic mesh network of nodes, where each node is linked with a number of
+    its neighbours.
+    """
+
+    def __init__(self, size, links=3):
+        """
+        Class constructor.
+
+        :param size: Number of nodes
+        :param links: Number of links of each node
+        """
+
+        self.nodes = [SyntheticNode(index) for index in xrange(size)]
+        self.by_router_id = dict([(node.router_id, node) for node in self.nodes])
+        self.links = links
+
+    def get_txtinfo(self):
+        """
+        Returns the mesh topology as an olsrd txtinfo dump.
+        """
+
+        lines = ['Table: Topology', 'Dest. IP\tLast hop IP\tLQ\tNLQ\tCost']
+        size = len(self.nodes)
+        for node in self.nodes:
+            for offset in xrange(1, min(self.links, size - 1) + 1):
+                neighbour = self.nodes[(node.index + offset) % size]
+                lines.append('%s\t%s\t1.000\t1.000\t1.000' % (neighbour.router_id, node.router_id))
+                lines.append('%s\t%s\t1.000\t1.000\t1.000' % (node.router_id, neighbour.router_id))
+
+        lines += ['', 'Table: HNA', 'Destination\tGateway']
+        for node in self.nodes:
+            lines.append('10.%d.%d.0/24\t%s' % (node.index // 256, node.index % 256, node.router_id))
+
+        lines += ['', 'Table: MID', 'IP address\tAliases', '']
+        return '\n'.join(lines)
+
+    @transaction.atomic
+    def create(self):
+        """
+        Creates node instances and their configuration.
+        """
+
+        from nodewatcher.core.generator.cgm import models as cgm_models
+        from nodewatcher.modules.monitor.sources.http import models as http_models
+
+        for synthetic in self.nodes:
+            node, created = core_models.Node.objects.get_or_create(uuid=synthetic.uuid)
+            if not created:
+                continue
+
+            general_cfg = node.config.core.general(create=core_models.GeneralConfig)
+            general_cfg.name = synthetic.name
+            general_cfg.save()
+
+            node.config.core.routerid(
+                create=core_models.StaticIpRouterIdConfig,
+                address='%s/32' % synthetic.router_id,
+            ).save()
+
+            node.config.core.telemetry.http(
+                create=http_models.HttpTelemetrySourceConfig,
+                source='poll',
+            ).save()
+
+            for eth_port in ('wan', 'lan0'):
+                node.config.core.interfaces(
+                    create=cgm_models.EthernetInterfaceConfig,
+                    eth_port=eth_port,
+                ).save()
+
+    def remove(self):
+        """
+        Removes all node instances of this mesh.
+        """
+
+        for node in core_models.Node.objects.filter(uuid__in=[synthetic.uuid for synthetic in self.nodes]):
+            node.delete()
+
+    def reset_schedules(self):
+        """
+        Makes all nodes due for polling.
+        """
+
+        try:
+            from nodewatcher.modules.administration.status import models as status_models
+        except ImportError:
+            return
+
+        status_models.PollingSchedule.objects.filter(
+            node__in=[synthetic.uuid for synthetic in self.nodes]
+        ).update(next_poll=None)
+
+
+class ThreadingHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StandInRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Serves telemetry feeds of synthetic nodes, selecting the node by the local
+    address the request has been made to.
+    """
+
+    def do_GET(self):
+        content = self.server.get_content(self)
+        if content is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(object):
+    """
+    Local stand-in for node telemetry and olsrd txtinfo HTTP servers.
+    """
+
+    def __init__(self, mesh):
+        """
+        Class constructor.
+
+        :param mesh: Synthetic mesh instance
+        """
+
+        self.mesh = mesh
+        self.servers = []
+
+    def _serve(self, get_content):
+        server = ThreadingHTTPServer(('', 0), StandInRequestHandler)
+        server.get_content = get_content
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        self.servers.append(server)
+        return server.server_address[1]
+
+    def _get_feed(self, handler):
+        if handler.path.split('?')[0] != '/nodewatcher/feed':
+            return None
+
+        node = self.mesh.by_router_id.get(handler.connection.getsockname()[0], None)
+        if node is None:
+            return None
+
+        return node.get_feed()
+
+    def _get_txtinfo(self, handler):
+        return self.mesh.get_txtinfo()
+
+    def start(self):
+        """
+        Starts the servers and configures monitoring to use them.
+        """
+
+        settings.MONITOR_HTTP_PORT = self._serve(self._get_feed)
+        settings.OLSRD_MONITOR_HOST = '127.0.0.1'
+        settings.OLSRD_MONITOR_PORT = self._serve(self._get_txtinfo)
+
+    def stop(self):
+        """
+        Stops the servers.
+        """
+
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+        self.servers = []
+
+
+class Counters(object):
+    """
+    Counters of database queries and datastream writes, which are shared with all
+    monitoring processes forked after the counters have been installed.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.queries = multiprocessing.Value('L', 0)
+        self.writes = multiprocessing.Value('L', 0)
+        self._originals = None
+
+    def _counting(self, counter, function):
+        def wrapper(*args, **kwargs):
+            with counter.get_lock():
+                counter.value += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    def install(self):
+        """
+        Starts counting.
+        """
+
+        self._originals = (
+            db_utils.CursorWrapper.execute,
+            db_utils.CursorWrapper.executemany,
+            datastream.append,
+        )
+
+        db_utils.CursorWrapper.execute = self._counting(self.queries, db_utils.CursorWrapper.execute)
+        db_utils.CursorWrapper.executemany = self._counting(self.queries, db_utils.CursorWrapper.executemany)
+        datastream.append = self._counting(self.writes, datastream.append)
+
+    def uninstall(self):
+        """
+        Stops counting.
+        """
+
+        if self._originals is None:
+            return
+
+        db_utils.CursorWrapper.execute, db_utils.CursorWrapper.executemany, datastream.append = self._originals
+        self._originals = None
+
+    def get(self):
+        return self.queries.value, self.writes.value
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size (in kilobytes) of any monitoring process
+    that has finished so far.
+    """
+
+    return max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+
+
+def run_cycle(name):
+    """
+    Performs a single cycle of a monitoring run in a separate process, the same
+    way as the monitoring daemon does.
+
+    :param name: Run name
+    :return: Duration of the cycle in seconds
+    """
+
+    for run in monitor_config.get_runs():
+        if run['name'] == name:
+            break
+    else:
+        raise KeyError(name)
+
+    run_info = run.copy()
+    run_info['cycles'] = 1
+    run_info['process_only_node'] = None
+
+    start = time.time()
+    process = multiprocessing.Process(target=worker.cycle_worker, args=(worker.MonitorRun(run_info),))
+    process.start()
+    process.join()
+    return time.time() - start
+
+
+def benchmark(size, runs, cycles=1, links=3, keep=False, report=None):
+    """
+    Runs a benchmark of the monitoring pipeline on a synthetic mesh.
+
+    :param size: Number of nodes
+    :param runs: A list of monitoring run names
+    :param cycles: Number of cycles of each run
+    :param links: Number of links of each node
+    :param keep: Should the synthetic nodes be kept after the benchmark
+    :param report: Optional callable, which is called with the results of each cycle
+    :return: A list of per-cycle result dictionaries
+    """
+
+    mesh = SyntheticMesh(size, links)
+    mesh.create()
+
+    servers = StandInServer(mesh)
+    servers.start()
+
+    counters = Counters()
+    counters.install()
+
+    results = []
+    try:
+        for name in runs:
+            for cycle in xrange(cycles):
+                mesh.reset_schedules()
+
+                queries, writes = counters.get()
+                duration = run_cycle(name)
+                queries_after, writes_after = counters.get()
+
+                result = {
+                    'run': name,
+                    'cycle': cycle + 1,
+                    'nodes': size,
+                    'duration': duration,
+                    'nodes_per_second': size / max(duration, 0.001),
+                    'queries': queries_after - queries,
+                    'queries_per_node': (queries_after - queries) / float(size),
+                    'writes': writes_after - writes,
+                    'peak_rss': get_peak_rss(),
+                }
+                results.append(result)
+
+                if report is not None:
+                    report(result)
+    finally:
+        counters.uninstall()
+        servers.stop()
+
+        if not keep:
+            mesh.remove()
+
+    return results
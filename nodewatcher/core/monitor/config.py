@@ -4,6 +4,9 @@ from django.utils import importlib
 
 from . import processors as monitor_processors
 
+# Default fraction of the run interval, which a cycle may spend processing nodes
+CYCLE_BUDGET = getattr(settings, 'MONITOR_CYCLE_BUDGET', 0.9)
+
 
 class MonitorConfig(object):
     """
@@ -58,9 +61,11 @@ class MonitorConfig(object):
                         else:
                             processors.append([processor])
 
+            interval = config.get('interval', None)
             run_info = {
                 'name': run,
-                'interval': config.get('interval', None),
+                'interval': interval,
+                'budget': config.get('budget', interval * CYCLE_BUDGET if interval else None),
                 'workers': config.get('workers', None),
                 'max_tasks_per_child': config.get('max_tasks_per_child', 100),
                 'processors': processors,
@@ -0,0 +1,68 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import benchmark
+
+
+class Command(BaseCommand):
+    args = "[run ...]"
+    help = "Benchmarks monitoring runs (by default telemetry and topology) on a synthetic mesh served by " \
+        "local stand-in servers. Synthetic nodes are created in the configured database, so this should " \
+        "not be used on a production installation."
+    requires_model_validation = True
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--nodes',
+            dest='nodes',
+            default=100,
+            type=int,
+            help='Number of synthetic nodes',
+        ),
+        make_option(
+            '--links',
+            dest='links',
+            default=3,
+            type=int,
+            help='Number of links of each synthetic node',
+        ),
+        make_option(
+            '--cycles',
+            dest='cycles',
+            default=1,
+            type=int,
+            help='Number of cycles of each run',
+        ),
+        make_option(
+            '--keep',
+            dest='keep',
+            action='store_true',
+            default=False,
+            help='Keep synthetic nodes after the benchmark',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        runs = args or ('telemetry', 'topology')
+        if options['nodes'] < 1 or options['nodes'] > 60000:
+            raise CommandError("Number of nodes must be between 1 and 60000.")
+
+        self.stdout.write("Benchmarking runs %s with %d synthetic nodes...\n" % (", ".join(runs), options['nodes']))
+
+        try:
+            benchmark.benchmark(
+                options['nodes'],
+                runs,
+                cycles=options['cycles'],
+                links=options['links'],
+                keep=options['keep'],
+                report=self.report,
+            )
+        except KeyError, error:
+            raise CommandError("Unknown monitoring run %s!" % error)
+
+    def report(self, result):
+        self.stdout.write(
+            "%(run)s #%(cycle)d: %(duration).2f s, %(nodes_per_second).1f nodes/s, %(queries)d queries "
+            "(%(queries_per_node).1f per node), %(writes)d datastream writes, peak RSS %(peak_rss)d KiB\n" % result
+        )
@@ -0,0 +1,21 @@
+import urllib2
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import metrics
+
+
+class Command(BaseCommand):
+    help = "Outputs a snapshot of metrics of the running monitoring daemon in the Prometheus text format."
+    requires_model_validation = False
+
+    def handle(self, *args, **options):
+        if not metrics.is_enabled():
+            raise CommandError("Metrics are not enabled, set MONITOR_METRICS_PORT.")
+
+        url = 'http://%s:%d/metrics' % (metrics.METRICS_HOST, metrics.METRICS_PORT)
+        try:
+            response = urllib2.urlopen(url, timeout=10)
+            self.stdout.write(response.read())
+        except (urllib2.URLError, IOError), error:
+            raise CommandError("Unable to fetch metrics from '%s': %s" % (url, error))
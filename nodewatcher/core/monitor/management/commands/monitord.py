@@ -1,5 +1,6 @@
 from optparse import make_option
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
 from ... import worker
@@ -28,8 +29,19 @@ class Command(BaseCommand):
             default=None,
             help='Only process a specific node',
         ),
+        make_option(
+            '--shard',
+            dest='shard',
+            default=getattr(settings, 'MONITOR_SHARD_NAME', None),
+            help='Share monitoring with other instances, using the given unique instance name',
+        ),
     )
 
     def handle(self, *args, **options):
         w = worker.Worker()
-        w.run(cycles=options['cycles'], process_only_node=options['process_only_node'], filter_run=options['run'])
+        w.run(
+            cycles=options['cycles'],
+            process_only_node=options['process_only_node'],
+            filter_run=options['run'],
+            shard=options['shard'],
+        )
@@ -0,0 +1,343 @@
+import BaseHTTPServer
+import json
+import logging
+import socket
+import SocketServer
+import threading
+import traceback
+
+from django.conf import settings
+
+# Logger instance
+logger = logging.getLogger('monitor.metrics')
+
+# Address of the metrics collector, which receives updates over UDP and serves them over
+# HTTP on the same port; metrics are disabled when no port is configured
+METRICS_HOST = getattr(settings, 'MONITOR_METRICS_HOST', '127.0.0.1')
+METRICS_PORT = getattr(settings, 'MONITOR_METRICS_PORT', None)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+SUMMARY = 'summary'
+
+# Descriptions of known metrics
+METRICS = {
+    'nodewatcher_monitor_cycles_total': (COUNTER, "Number of finished monitoring cycles."),
+    'nodewatcher_monitor_cycle_duration_seconds': (GAUGE, "Duration of the last monitoring cycle."),
+    'nodewatcher_monitor_cycle_lag_seconds': (GAUGE, "Delay between the scheduled and the actual start of the last cycle."),
+    'nodewatcher_monitor_deadlines_missed_total': (COUNTER, "Number of monitoring cycles that have missed their deadline."),
+    'nodewatcher_monitor_nodes_processed_total': (COUNTER, "Number of nodes processed by monitoring cycles."),
+    'nodewatcher_monitor_nodes_carried_over': (GAUGE, "Number of nodes carried over to the next cycle by the last cycle."),
+    'nodewatcher_monitor_node_data_age_seconds': (GAUGE, "Age of the stalest node data at the start of the last cycle."),
+    'nodewatcher_monitor_worker_utilisation': (GAUGE, "Fraction of worker pool capacity used during the last cycle."),
+    'nodewatcher_monitor_processor_seconds': (SUMMARY, "Time spent in node processors."),
+    'nodewatcher_monitor_processor_failures_total': (COUNTER, "Number of node processor failures."),
+    'nodewatcher_monitor_pipeline_seconds': (SUMMARY, "Time spent processing on-demand (push) pipelines."),
+    'nodewatcher_monitor_pipeline_failures_total': (COUNTER, "Number of failed on-demand (push) pipelines."),
+    'nodewatcher_monitor_queue_depth': (GAUGE, "Number of messages waiting in the monitoring task queue."),
+    'nodewatcher_datastream_writes_total': (COUNTER, "Number of datapoints written to the datastream."),
+}
+
+_socket = None
+
+
+def is_enabled():
+    """
+    Returns true if metrics are enabled.
+    """
+
+    return METRICS_PORT is not None
+
+
+class Batch(object):
+    """
+    A batch of metric updates, which is sent to the collector as a single message.
+    Updates are best-effort and are silently lost when the collector is not running.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.updates = []
+
+    def increment(self, name, value=1, **labels):
+        """
+        Increments a counter.
+
+        :param name: Metric name
+        :param value: Increment
+        """
+
+        self.updates.append((COUNTER, name, value, labels))
+        return self
+
+    def set(self, name, value, **labels):
+        """
+        Sets a gauge.
+
+        :param name: Metric name
+        :param value: Gauge value
+        """
+
+        self.updates.append((GAUGE, name, value, labels))
+        return self
+
+    def observe(self, name, value, **labels):
+        """
+        Records an observation of a summary.
+
+        :param name: Metric name
+        :param value: Observed value
+        """
+
+        self.updates.append((SUMMARY, name, value, labels))
+        return self
+
+    def send(self):
+        """
+        Sends the updates to the collector.
+        """
+
+        global _socket
+
+        if not self.updates or not is_enabled():
+            return
+
+        try:
+            if _socket is None:
+                _socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _socket.sendto(json.dumps(self.updates), (METRICS_HOST, METRICS_PORT))
+        except (socket.error, TypeError, ValueError):
+            pass
+
+        self.updates = []
+
+
+def increment(name, value=1, **labels):
+    """
+    Increments a counter.
+
+    :param name: Metric name
+    :param value: Increment
+    """
+
+    Batch().increment(name, value, **labels).send()
+
+
+def set_gauge(name, value, **labels):
+    """
+    Sets a gauge.
+
+    :param name: Metric name
+    :param value: Gauge value
+    """
+
+    Batch().set(name, value, **labels).send()
+
+
+def observe(name, value, **labels):
+    """
+    Records an observation of a summary.
+
+    :param name: Metric name
+    :param value: Observed value
+    """
+
+    Batch().observe(name, value, **labels).send()
+
+
+def format_labels(labels):
+    """
+    Formats labels for the Prometheus text exposition format.
+
+    :param labels: A sorted sequence of (name, value) tuples
+    """
+
+    if not labels:
+        return ''
+
+    def escape(value):
+        return unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return '{%s}' % ','.join(['%s="%s"' % (name, escape(value)) for name, value in labels])
+
+
+class Registry(object):
+    """
+    Aggregated metric values.
+    """
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.values = {}
+        self.kinds = {}
+        self.lock = threading.Lock()
+
+    def update(self, kind, name, value, labels):
+        """
+        Applies a metric update.
+
+        :param kind: Metric kind
+        :param name: Metric name
+        :param value: Value
+        :param labels: Labels dictionary
+        """
+
+        labels = tuple(sorted(labels.items()))
+        with self.lock:
+            self.kinds.setdefault(name, kind)
+            if kind == COUNTER:
+                self.values[(name, labels)] = self.values.get((name, labels), 0) + value
+            elif kind == GAUGE:
+                self.values[(name, labels)] = value
+            elif kind == SUMMARY:
+                self.values[(name + '_sum', labels)] = self.values.get((name + '_sum', labels), 0) + value
+                self.values[(name + '_count', labels)] = self.values.get((name + '_count', labels), 0) + 1
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+
+        with self.lock:
+            values = self.values.copy()
+            kinds = self.kinds.copy()
+
+        series = {}
+        for (name, labels), value in values.iteritems():
+            for suffix in ('_sum', '_count'):
+                if name.endswith(suffix) and kinds.get(name[:-len(suffix)], None) == SUMMARY:
+                    family = name[:-len(suffix)]
+                    break
+            else:
+                family = name
+            series.setdefault(family, []).append((name, labels, value))
+
+        lines = []
+        for family in sorted(series):
+            kind, description = METRICS.get(family, (kinds.get(family, None), None))
+            if description:
+                lines.append('# HELP %s %s' % (family, description))
+            if kind:
+                lines.append('# TYPE %s %s' % (family, kind))
+            for name, labels, value in sorted(series[family]):
+                lines.append('%s%s %s' % (name, format_labels(labels), repr(float(value))))
+
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        content = self.server.collector.render().encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsHTTPServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Collector(object):
+    """
+    Receives metric updates from monitoring processes and serves them over HTTP.
+    """
+
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        """
+        Class constructor.
+
+        :param host: Address to listen on
+        :param port: Port to listen on (both UDP and TCP)
+        """
+
+        self.host = host
+        self.port = port
+        self.registry = Registry()
+        self._receiver = None
+        self._server = None
+
+    def collect_queue_depth(self):
+        """
+        Updates the depth of the monitoring task queue.
+        """
+
+        try:
+            from nodewatcher.celery import app
+
+            with app.connection() as connection:
+                name, depth, consumers = connection.default_channel.queue_declare(queue='monitor', passive=True)
+        except Exception:
+            return
+
+        self.registry.update(GAUGE, 'nodewatcher_monitor_queue_depth', depth, {'queue': 'monitor'})
+
+    def render(self):
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+
+        self.collect_queue_depth()
+        return self.registry.render()
+
+    def _receive(self):
+        while True:
+            try:
+                data = self._receiver.recv(65535)
+            except socket.error:
+                break
+
+            try:
+                for kind, name, value, labels in json.loads(data):
+                    self.registry.update(kind, name, value, labels)
+            except Exception:
+                logger.warning("Ignoring invalid metrics update:")
+                logger.warning(traceback.format_exc())
+
+    def start(self):
+        """
+        Starts receiving updates and serving metrics in background threads.
+        """
+
+        self._receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._receiver.bind((self.host, self.port))
+        thread = threading.Thread(target=self._receive)
+        thread.daemon = True
+        thread.start()
+
+        self._server = MetricsHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self._server.collector = self
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        logger.info("Serving metrics on http://%s:%d/metrics." % (self.host, self.port))
+
+    def stop(self):
+        """
+        Stops the collector.
+        """
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+        if self._receiver is not None:
+            self._receiver.close()
+            self._receiver = None
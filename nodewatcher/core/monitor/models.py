@@ -266,3 +266,47 @@ class AdjancencyHistory(models.Model):
 
     class Meta:
         unique_together = ('node_a', 'node_b', 'protocol')
+
+
+class MonitorInstance(models.Model):
+    """
+    A monitoring daemon instance taking part in sharded monitoring.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+    started = models.DateTimeField()
+    heartbeat = models.DateTimeField(db_index=True)
+
+
+class RunNodeState(models.Model):
+    """
+    Time when a node has last been processed by a monitoring run.
+    """
+
+    run = models.CharField(max_length=100)
+    node = models.ForeignKey(core_models.Node, related_name='+')
+    last_processed = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('run', 'node')
+
+
+class RunStatistics(models.Model):
+    """
+    Scheduling statistics of a monitoring run (per instance when monitoring is sharded).
+    """
+
+    run = models.CharField(max_length=100)
+    instance = models.CharField(max_length=100, default='')
+    cycles = models.IntegerField(default=0)
+    missed_deadlines = models.IntegerField(default=0)
+    carried_over = models.IntegerField(default=0)
+    last_cycle = models.DateTimeField(null=True)
+    last_duration = models.FloatField(null=True)
+    last_lag = models.FloatField(null=True)
+    last_processed = models.IntegerField(default=0)
+    last_carried_over = models.IntegerField(default=0)
+    last_max_node_age = models.FloatField(null=True)
+
+    class Meta:
+        unique_together = ('run', 'instance')
@@ -83,6 +83,52 @@ class ProcessorContext(dict):
         yield ctx
 
 
+class LazyProcessorContext(ProcessorContext):
+    """
+    A processor context which converts plain dictionary values into contexts of
+    the same class only when they are accessed. This avoids the conversion of
+    large parsed documents when only some of their parts are used.
+    """
+
+    lazy_conversion = True
+
+    def _convert(self, key, value):
+        """
+        Converts a plain dictionary value into a context and stores it.
+        """
+
+        if type(value) is dict:
+            context = self.__class__()
+            dict.update(context, value)
+            dict.__setitem__(self, key, context)
+            return context
+
+        return value
+
+    def __getitem__(self, key):
+        return self._convert(key, super(LazyProcessorContext, self).__getitem__(key))
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+
+        return self._convert(key, dict.__getitem__(self, key))
+
+    def iteritems(self):
+        for key in self.keys():
+            yield key, self._convert(key, dict.__getitem__(self, key))
+
+    def itervalues(self):
+        for key, value in self.iteritems():
+            yield value
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+
 class MonitoringProcessor(object):
     """
     Interface for a monitoring processor.
@@ -114,6 +160,11 @@ class NetworkProcessor(MonitoringProcessor):
     """
 
     requires_transaction = True
+    # When monitoring is sharded between multiple instances, elected processors only
+    # run on a single instance, while sharded processors only receive nodes of the
+    # local shard
+    elected = False
+    sharded = False
 
     def __init__(self, worker_pool=None, **kwargs):
         """
@@ -0,0 +1,189 @@
+import collections
+import logging
+import time
+import traceback
+
+from django.db import IntegrityError, models as django_models, transaction
+from django.utils import timezone
+
+from . import models as monitor_models
+
+# Logger instance
+logger = logging.getLogger('monitor.scheduler')
+
+# Number of nodes handled in a single state query
+STATE_BATCH_SIZE = 500
+
+
+def get_node_states(run, node_pks):
+    """
+    Returns a dictionary mapping node primary keys to the times when the nodes
+    have last been processed by a run.
+
+    :param run: Run name
+    :param node_pks: A list of node primary keys
+    """
+
+    states = {}
+    for offset in xrange(0, len(node_pks), STATE_BATCH_SIZE):
+        states.update(
+            monitor_models.RunNodeState.objects.filter(
+                run=run,
+                node__in=node_pks[offset:offset + STATE_BATCH_SIZE],
+            ).values_list('node', 'last_processed')
+        )
+
+    return states
+
+
+def order_by_staleness(run, nodes):
+    """
+    Orders nodes so that nodes whose data is the oldest come first. Nodes that
+    have never been processed by the run come before all others.
+
+    :param run: Run name
+    :param nodes: A set of nodes
+    :return: A tuple (ordered list of nodes, age in seconds of the oldest data or None)
+    """
+
+    states = get_node_states(run, [node.pk for node in nodes])
+    ordered = sorted(nodes, key=lambda node: (node.pk in states, states.get(node.pk, None), node.pk))
+
+    age = None
+    if states:
+        age = (timezone.now() - min(states.values())).total_seconds()
+
+    return ordered, age
+
+
+def mark_processed(run, node_pks):
+    """
+    Records that nodes have been processed by a run.
+
+    :param run: Run name
+    :param node_pks: A list of node primary keys
+    """
+
+    now = timezone.now()
+    for offset in xrange(0, len(node_pks), STATE_BATCH_SIZE):
+        batch = node_pks[offset:offset + STATE_BATCH_SIZE]
+        with transaction.atomic():
+            states = monitor_models.RunNodeState.objects.filter(run=run, node__in=batch)
+            existing = set(states.values_list('node', flat=True))
+            states.update(last_processed=now)
+
+            missing = [
+                monitor_models.RunNodeState(run=run, node_id=node_pk, last_processed=now)
+                for node_pk in batch if node_pk not in existing
+            ]
+
+            try:
+                with transaction.atomic():
+                    monitor_models.RunNodeState.objects.bulk_create(missing)
+            except IntegrityError:
+                # Another instance has started processing some of these nodes
+                for state in missing:
+                    monitor_models.RunNodeState.objects.update_or_create(
+                        run=run,
+                        node_id=state.node_id,
+                        defaults={'last_processed': now},
+                    )
+
+
+def record_cycle(run, instance, duration, lag, processed, carried_over, max_node_age, missed):
+    """
+    Records scheduling statistics of a finished cycle.
+
+    :param run: Run name
+    :param instance: Instance name when monitoring is sharded or an empty string
+    :param duration: Cycle duration in seconds
+    :param lag: Number of seconds by which the cycle started after its scheduled time
+    :param processed: Number of processed nodes
+    :param carried_over: Number of nodes carried over to the next cycle
+    :param max_node_age: Age in seconds of the oldest node data at the start of the cycle
+    :param missed: True if the cycle has missed its deadline
+    """
+
+    statistics, created = monitor_models.RunStatistics.objects.get_or_create(run=run, instance=instance)
+    monitor_models.RunStatistics.objects.filter(pk=statistics.pk).update(
+        cycles=django_models.F('cycles') + 1,
+        missed_deadlines=django_models.F('missed_deadlines') + (1 if missed else 0),
+        carried_over=django_models.F('carried_over') + carried_over,
+        last_cycle=timezone.now(),
+        last_duration=duration,
+        last_lag=lag,
+        last_processed=processed,
+        last_carried_over=carried_over,
+        last_max_node_age=max_node_age,
+    )
+
+
+class StageScheduler(object):
+    """
+    Submits nodes to the worker pool in staleness order while the cycle is within
+    its time budget. Nodes that could not be submitted in time are carried over to
+    the next cycle, where they are among the first to be processed.
+    """
+
+    # Interval in seconds at which results are polled
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, workers, concurrency, deadline=None):
+        """
+        Class constructor.
+
+        :param workers: Worker pool
+        :param concurrency: Maximum number of nodes submitted at once
+        :param deadline: Optional time after which no more nodes are submitted
+        """
+
+        self.workers = workers
+        self.concurrency = max(1, concurrency)
+        self.deadline = deadline
+        # Number of seconds workers have spent processing nodes
+        self.busy = 0.0
+
+    def run(self, function, nodes, get_arguments):
+        """
+        Processes nodes.
+
+        :param function: Function that is called for each node in the worker pool
+        :param nodes: An ordered list of nodes
+        :param get_arguments: Callable that returns the function argument for a node
+        :return: A tuple (list of processed nodes, list of carried over nodes)
+        """
+
+        processed = []
+        in_flight = collections.deque()
+        index = 0
+        while True:
+            while index < len(nodes) and len(in_flight) < self.concurrency:
+                if self.deadline is not None and time.time() >= self.deadline:
+                    break
+
+                node = nodes[index]
+                index += 1
+                in_flight.append((node, self.workers.apply_async(function, (get_arguments(node),))))
+
+            if not in_flight:
+                break
+
+            completed = [item for item in in_flight if item[1].ready()]
+            if not completed:
+                time.sleep(self.POLL_INTERVAL)
+                continue
+
+            for item in completed:
+                in_flight.remove(item)
+                node, result = item
+                try:
+                    self.busy += result.get() or 0.0
+                except KeyboardInterrupt:
+                    raise
+                except:
+                    logger.error("Processing of node '%s' has failed with exception:" % node.pk)
+                    logger.error(traceback.format_exc())
+
+                processed.append(node)
+
+        return processed, nodes[index:]
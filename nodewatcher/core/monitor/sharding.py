@@ -0,0 +1,156 @@
+import bisect
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import models as monitor_models
+
+# Number of seconds between heartbeats of a monitoring instance
+HEARTBEAT_INTERVAL = getattr(settings, 'MONITOR_SHARD_HEARTBEAT_INTERVAL', 30)
+# Number of seconds after the last heartbeat when an instance is considered gone
+INSTANCE_TIMEOUT = getattr(settings, 'MONITOR_SHARD_TIMEOUT', 120)
+# Number of points each instance has on the hash ring
+RING_REPLICAS = 64
+
+
+def get_hash(key):
+    """
+    Returns the position of a key on the hash ring.
+
+    :param key: Key string
+    """
+
+    return int(hashlib.md5(key).hexdigest()[:8], 16)
+
+
+class HashRing(object):
+    """
+    Consistent hash ring, which assigns keys to instances so that only keys
+    of a removed instance are reassigned when the set of instances changes.
+    """
+
+    def __init__(self, instances, replicas=RING_REPLICAS):
+        """
+        Class constructor.
+
+        :param instances: A list of instance names
+        :param replicas: Number of points each instance has on the ring
+        """
+
+        points = []
+        for instance in instances:
+            for replica in xrange(replicas):
+                points.append((get_hash('%s:%d' % (instance, replica)), instance))
+
+        points.sort()
+        self.positions = [position for position, instance in points]
+        self.instances = [instance for position, instance in points]
+
+    def get_instance(self, key):
+        """
+        Returns the instance a key is assigned to.
+
+        :param key: Key string
+        """
+
+        if not self.positions:
+            return None
+
+        index = bisect.bisect(self.positions, get_hash(key)) % len(self.positions)
+        return self.instances[index]
+
+
+def heartbeat(name):
+    """
+    Registers a monitoring instance or refreshes its heartbeat.
+
+    :param name: Instance name
+    """
+
+    now = timezone.now()
+    if monitor_models.MonitorInstance.objects.filter(name=name).update(heartbeat=now):
+        return
+
+    try:
+        with transaction.atomic():
+            monitor_models.MonitorInstance.objects.create(name=name, started=now, heartbeat=now)
+    except IntegrityError:
+        monitor_models.MonitorInstance.objects.filter(name=name).update(heartbeat=now)
+
+
+def unregister(name):
+    """
+    Removes a monitoring instance, so that its nodes are immediately taken over by
+    other instances.
+
+    :param name: Instance name
+    """
+
+    monitor_models.MonitorInstance.objects.filter(name=name).delete()
+
+
+def get_live_instances():
+    """
+    Returns a sorted list of names of instances with a recent heartbeat.
+    """
+
+    threshold = timezone.now() - datetime.timedelta(seconds=INSTANCE_TIMEOUT)
+    return sorted(monitor_models.MonitorInstance.objects.filter(heartbeat__gte=threshold).values_list('name', flat=True))
+
+
+class Shard(object):
+    """
+    Part of the network monitored by a single instance.
+    """
+
+    def __init__(self, name, instances):
+        """
+        Class constructor.
+
+        :param name: Name of the local instance
+        :param instances: Names of all live instances
+        """
+
+        self.name = name
+        self.instances = sorted(set(instances) | set([name]))
+        self.ring = HashRing(self.instances)
+
+    @classmethod
+    def current(cls, name):
+        """
+        Returns the shard of a local instance based on the currently live instances.
+
+        :param name: Name of the local instance
+        """
+
+        return cls(name, get_live_instances())
+
+    @property
+    def is_elected(self):
+        """
+        True when the local instance should run network-wide processors, which
+        must only run on a single instance.
+        """
+
+        return self.instances[0] == self.name
+
+    def owns(self, node_pk):
+        """
+        Returns true if the given node belongs to this shard.
+
+        :param node_pk: Node primary key
+        """
+
+        return self.ring.get_instance(str(node_pk)) == self.name
+
+    def filter(self, nodes):
+        """
+        Returns the subset of nodes that belong to this shard.
+
+        :param nodes: A set of nodes
+        """
+
+        return set([node for node in nodes if self.owns(node.pk)])
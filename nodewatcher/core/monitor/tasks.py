@@ -1,8 +1,10 @@
+import time
+
 from django.db import transaction
 
 from celery.task import task as celery_task
 
-from . import processors as monitor_processors, worker as monitor_worker
+from . import metrics, processors as monitor_processors, worker as monitor_worker
 from .config import config as monitor_config
 
 
@@ -24,6 +26,17 @@ def run_pipeline(self, run_id, base_context=None):
     # Prepare the on-demand monitoring run. The execution is a bit different than the
     # scheduled runs as here we don't spawn any additional workers or perform any
     # parallelization.
+    start = time.time()
+    try:
+        _run_pipeline(run_info, base_context)
+    except:
+        metrics.increment('nodewatcher_monitor_pipeline_failures_total', run=run_id)
+        raise
+    finally:
+        metrics.observe('nodewatcher_monitor_pipeline_seconds', time.time() - start, run=run_id)
+
+
+def _run_pipeline(run_info, base_context):
     nodes = set()
     context = monitor_processors.ProcessorContext()
 
@@ -44,4 +57,4 @@ def run_pipeline(self, run_id, base_context=None):
             # push updates from a single node.
             if nodes:
                 node = nodes.pop()
-                monitor_worker.stage_worker((context, node.pk, processor_list))
+                monitor_worker.stage_worker((context, node.pk, processor_list, run_info['name']))
@@ -0,0 +1,87 @@
+import time
+import unittest
+import uuid
+
+from . import metrics, scheduler, sharding
+
+
+class ImmediateResult(object):
+    def __init__(self, value):
+        self.value = value
+
+    def ready(self):
+        return True
+
+    def get(self):
+        return self.value
+
+
+class ImmediatePool(object):
+    def apply_async(self, function, args):
+        return ImmediateResult(function(*args))
+
+
+class ShardingTestCase(unittest.TestCase):
+    def test_shards(self):
+        keys = [str(uuid.uuid4()) for i in xrange(1000)]
+        shards = [sharding.Shard(name, ['a', 'b', 'c']) for name in ('a', 'b', 'c')]
+
+        # Each key is owned by exactly one instance
+        for key in keys:
+            self.assertEqual(len([shard for shard in shards if shard.owns(key)]), 1)
+
+        for shard in shards:
+            self.assertGreater(len([key for key in keys if shard.owns(key)]), 100)
+
+        # Exactly one instance is elected
+        self.assertEqual([shard.name for shard in shards if shard.is_elected], ['a'])
+
+    def test_rebalance(self):
+        before = sharding.HashRing(['a', 'b', 'c'])
+        after = sharding.HashRing(['a', 'c'])
+
+        # Only keys of the removed instance are reassigned
+        for key in [str(uuid.uuid4()) for i in xrange(1000)]:
+            if before.get_instance(key) != 'b':
+                self.assertEqual(before.get_instance(key), after.get_instance(key))
+            else:
+                self.assertIn(after.get_instance(key), ('a', 'c'))
+
+
+class StageSchedulerTestCase(unittest.TestCase):
+    def test_order(self):
+        calls = []
+        processed, carried_over = scheduler.StageScheduler(ImmediatePool(), 2).run(calls.append, range(10), lambda node: node)
+
+        self.assertEqual(calls, range(10))
+        self.assertEqual(processed, range(10))
+        self.assertEqual(carried_over, [])
+
+    def test_deadline(self):
+        def slow(node):
+            time.sleep(0.05)
+
+        processed, carried_over = scheduler.StageScheduler(ImmediatePool(), 1, time.time() + 0.12).run(slow, range(10), lambda node: node)
+
+        # Nodes that could not be submitted before the deadline are carried over in order
+        self.assertEqual(processed + carried_over, range(10))
+        self.assertTrue(0 < len(processed) < 10)
+
+
+class MetricsTestCase(unittest.TestCase):
+    def test_render(self):
+        registry = metrics.Registry()
+        registry.update(metrics.COUNTER, 'nodewatcher_monitor_cycles_total', 1, {'run': 'telemetry'})
+        registry.update(metrics.COUNTER, 'nodewatcher_monitor_cycles_total', 1, {'run': 'telemetry'})
+        registry.update(metrics.GAUGE, 'nodewatcher_monitor_nodes_carried_over', 5, {'run': 'telemetry'})
+        registry.update(metrics.GAUGE, 'nodewatcher_monitor_nodes_carried_over', 3, {'run': 'telemetry'})
+        registry.update(metrics.SUMMARY, 'nodewatcher_monitor_processor_seconds', 0.5, {'processor': 'A"B'})
+        registry.update(metrics.SUMMARY, 'nodewatcher_monitor_processor_seconds', 1.5, {'processor': 'A"B'})
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE nodewatcher_monitor_cycles_total counter', lines)
+        self.assertIn('nodewatcher_monitor_cycles_total{run="telemetry"} 2.0', lines)
+        self.assertIn('nodewatcher_monitor_nodes_carried_over{run="telemetry"} 3.0', lines)
+        self.assertIn('# TYPE nodewatcher_monitor_processor_seconds summary', lines)
+        self.assertIn('nodewatcher_monitor_processor_seconds_sum{processor="A\\"B"} 2.0', lines)
+        self.assertIn('nodewatcher_monitor_processor_seconds_count{processor="A\\"B"} 2.0', lines)
@@ -1,14 +1,16 @@
 import logging
 import multiprocessing
+import socket
 import time
 import traceback
 
 from django import db
 from django.db import connection, transaction
 
-from . import processors as monitor_processors, exceptions
+from . import processors as monitor_processors, exceptions, metrics, scheduler, sharding
 from .config import config as monitor_config
 from .. import models as core_models
+from ...utils import loader
 
 # Logger instance
 logger = logging.getLogger('monitor.worker')
@@ -17,13 +19,18 @@ logger = logging.getLogger('monitor.worker')
 def stage_worker(args):
     """
     Runs a list of (node) processors on a given node.
+
+    :return: Number of seconds spent processing the node
     """
 
-    context, node_pk, processors = args
+    context, node_pk, processors, run_name = args
+    start = time.time()
+    batch = metrics.Batch()
     node = core_models.Node.objects.get(pk=node_pk)
     cleanup_queue = []
     try:
         for p in processors:
+            processor_start = time.time()
             try:
                 abort_requested = False
                 with transaction.atomic():
@@ -43,7 +50,10 @@ def stage_worker(args):
             except:
                 logger.error("Processor for node '%s' has failed with exception:" % node.pk)
                 logger.error(traceback.format_exc())
+                batch.increment('nodewatcher_monitor_processor_failures_total', run=run_name, processor=p.__name__)
                 break
+            finally:
+                batch.observe('nodewatcher_monitor_processor_seconds', time.time() - processor_start, run=run_name, processor=p.__name__)
     finally:
         # Invoke all cleanup functions in reverse order
         for processor in cleanup_queue[::-1]:
@@ -54,6 +64,10 @@ def stage_worker(args):
                 logger.warning("Processor cleanup method for node '%s' has failed with exception:" % node.pk)
                 logger.warning(traceback.format_exc())
 
+        batch.send()
+
+    return time.time() - start
+
 
 def main_worker(run):
     """
@@ -65,12 +79,12 @@ def main_worker(run):
     run.start()
 
 
-def cycle_worker(run):
+def cycle_worker(run, scheduled=None):
     """
     Starts a cycle of the given run.
     """
 
-    run.cycle()
+    run.cycle(scheduled)
 
 
 class MonitorRun(object):
@@ -101,11 +115,29 @@ class MonitorRun(object):
 
         logger.info("Ready with %d workers for run '%s'." % (self.config['workers'], self.name))
 
-    def cycle(self):
+    def cycle(self, scheduled=None):
         """
-        Performs a single monitoring cycle.
+        Performs a single monitoring cycle. Nodes are processed in the order of the
+        age of their data until the time budget of the cycle is spent, remaining
+        nodes are carried over to the next cycle.
+
+        :param scheduled: Time when the cycle has been scheduled to start
         """
 
+        start = time.time()
+        if scheduled is None:
+            scheduled = start
+
+        deadline = None
+        if self.config.get('budget', None):
+            deadline = scheduled + self.config['budget']
+
+        processed = set()
+        carried_over = set()
+        max_node_age = None
+        busy = 0.0
+        capacity = 0.0
+
         logger.info("Preparing the worker pool for run '%s'..." % self.name)
         self.prepare_workers()
 
@@ -113,12 +145,29 @@ class MonitorRun(object):
             nodes = set()
             context = monitor_processors.ProcessorContext()
 
+            shard = None
+            if self.config.get('shard', None) is not None:
+                shard = sharding.Shard.current(self.config['shard'])
+                logger.info("Monitoring shard %d of %d as instance '%s'%s." % (
+                    shard.instances.index(shard.name) + 1,
+                    len(shard.instances),
+                    shard.name,
+                    " (elected)" if shard.is_elected else "",
+                ))
+
             for processor_list in self.config['processors']:
                 lead_proc = processor_list[0]
                 if issubclass(lead_proc, monitor_processors.NetworkProcessor):
+                    if shard is not None and lead_proc.elected and not shard.is_elected:
+                        logger.info("Skipping network processor %s as it runs on the elected instance." % lead_proc.__name__)
+                        continue
+
                     # Network processors run serially and may modify the nodes list
                     logger.info("Running network processor %s..." % lead_proc.__name__)
 
+                    if shard is not None and lead_proc.sharded:
+                        nodes = shard.filter(nodes)
+
                     try:
                         if lead_proc.requires_transaction:
                             with transaction.atomic():
@@ -136,11 +185,38 @@ class MonitorRun(object):
                     for p in processor_list:
                         logger.info("  - %s" % p.__name__)
 
+                    local_nodes = nodes
+                    if shard is not None:
+                        local_nodes = shard.filter(nodes)
+                        logger.info("Processing %d of %d nodes in the local shard." % (len(local_nodes), len(nodes)))
+
                     if self.config['process_only_node'] is not None:
                         logger.info("Limiting only to the following node: %s" % self.config['process_only_node'])
-                        self.workers.map_async(stage_worker, ((context, node.pk, processor_list) for node in nodes if node.pk == self.config['process_only_node'])).get(0xFFFF)
-                    else:
-                        self.workers.map_async(stage_worker, ((context, node.pk, processor_list) for node in nodes)).get(0xFFFF)
+                        local_nodes = set([node for node in local_nodes if node.pk == self.config['process_only_node']])
+
+                    ordered, age = scheduler.order_by_staleness(self.name, local_nodes)
+                    max_node_age = max(max_node_age, age)
+                    stage_scheduler = scheduler.StageScheduler(
+                        self.workers,
+                        2 * self.config['workers'],
+                        deadline,
+                    )
+                    stage_start = time.time()
+                    stage_processed, stage_carried_over = stage_scheduler.run(
+                        stage_worker,
+                        ordered,
+                        lambda node: (context, node.pk, processor_list, self.name),
+                    )
+                    busy += stage_scheduler.busy
+                    capacity += (time.time() - stage_start) * self.config['workers']
+
+                    scheduler.mark_processed(self.name, [node.pk for node in stage_processed])
+                    processed.update(stage_processed)
+                    if stage_carried_over:
+                        logger.warning("Cycle time budget exceeded, carrying over %d nodes to the next cycle." % len(stage_carried_over))
+                        # Nodes that have not been processed are skipped by any further processors
+                        carried_over.update(stage_carried_over)
+                        nodes = nodes.difference(stage_carried_over)
                 else:
                     logger.warning("Ignoring unkown type of processor '%s'!" % lead_proc.__name__)
 
@@ -152,17 +228,54 @@ class MonitorRun(object):
                 logger.info("Stopping worker processes...")
                 self.workers.terminate()
 
+        # The cycle has missed its deadline when it had to leave nodes unprocessed or when it
+        # did not finish before the next cycle should have started
+        end = time.time()
+        missed = bool(carried_over)
+        if self.config.get('interval', None):
+            missed = missed or end > scheduled + self.config['interval']
+
+        batch = metrics.Batch()
+        batch.increment('nodewatcher_monitor_cycles_total', run=self.name)
+        batch.set('nodewatcher_monitor_cycle_duration_seconds', end - start, run=self.name)
+        batch.set('nodewatcher_monitor_cycle_lag_seconds', start - scheduled, run=self.name)
+        batch.increment('nodewatcher_monitor_nodes_processed_total', len(processed), run=self.name)
+        batch.set('nodewatcher_monitor_nodes_carried_over', len(carried_over), run=self.name)
+        if missed:
+            batch.increment('nodewatcher_monitor_deadlines_missed_total', run=self.name)
+        if max_node_age is not None:
+            batch.set('nodewatcher_monitor_node_data_age_seconds', max_node_age, run=self.name)
+        if capacity:
+            batch.set('nodewatcher_monitor_worker_utilisation', busy / capacity, run=self.name)
+        batch.send()
+
+        try:
+            scheduler.record_cycle(
+                self.name,
+                self.config.get('shard', None) or '',
+                duration=end - start,
+                lag=start - scheduled,
+                processed=len(processed),
+                carried_over=len(carried_over),
+                max_node_age=max_node_age,
+                missed=missed,
+            )
+        except db.DatabaseError:
+            logger.warning("Failed to record cycle statistics:")
+            logger.warning(traceback.format_exc())
+
         logger.info("All done.")
 
     def start(self):
         logger.info("Run '%s' entering monitoring cycle..." % self.name)
         try:
             cycle = 0
+            scheduled = time.time()
             while True:
                 start = time.time()
 
                 # Spawn monitoring cycle in its own process to isolate potential leaks
-                p = multiprocessing.Process(target=cycle_worker, args=(self,))
+                p = multiprocessing.Process(target=cycle_worker, args=(self, scheduled))
                 p.start()
                 p.join()
                 del p
@@ -179,9 +292,16 @@ class MonitorRun(object):
                         logger.info("Reached %d cycles." % cycle)
                         break
 
-                # Sleep for the right amount of time that cycles will be triggered
-                # on every "interval" seconds (but no less then 30 seconds apart)
-                time.sleep(max(30, self.config['interval'] - cycle_duration))
+                # Cycles are triggered on every "interval" seconds. When a cycle overruns, the
+                # next one starts immediately, but later cycles keep to the schedule instead
+                # of slipping.
+                scheduled += self.config['interval']
+                now = time.time()
+                if scheduled < now:
+                    logger.warning("Run '%s' is %.1f seconds behind schedule." % (self.name, now - scheduled))
+                    scheduled = now
+
+                time.sleep(scheduled - now)
         except KeyboardInterrupt:
             logger.info("Aborted by user.")
 
@@ -191,11 +311,12 @@ class Worker(object):
     Monitoring daemon.
     """
 
-    def start_run(self, run, cycles=None, process_only_node=None):
+    def start_run(self, run, cycles=None, process_only_node=None, shard=None):
         # Create a run descriptor.
         run_info = run.copy()
         run_info['cycles'] = cycles
         run_info['process_only_node'] = process_only_node
+        run_info['shard'] = shard
         rd = MonitorRun(run_info)
 
         # Fork a process for this run
@@ -203,9 +324,15 @@ class Worker(object):
         p.start()
         return p
 
-    def run(self, cycles=None, process_only_node=None, filter_run=None):
+    def run(self, cycles=None, process_only_node=None, filter_run=None, shard=None):
         """
         Runs the monitoring process.
+
+        :param cycles: Optional number of cycles of each run
+        :param process_only_node: Optional primary key of the only node to process
+        :param filter_run: Optional name of the only run to start
+        :param shard: Optional instance name, which enables sharded monitoring where
+          nodes are distributed between all instances with a recent heartbeat
         """
 
         logger.info("Starting the nodewatcher monitoring system.")
@@ -219,6 +346,16 @@ class Worker(object):
             logger.error("Failed to establish a database connection, exiting.")
             return
 
+        # Load modules before forking, so that run and cycle processes inherit them
+        loader.warmup()
+
+        if shard is not None:
+            # Register the instance before the runs start, so that it is immediately
+            # assigned a part of the network
+            logger.info("Joining sharded monitoring as instance '%s'." % shard)
+            sharding.heartbeat(shard)
+            connection.close()
+
         logger.info("Starting monitoring runs...")
         runs = []
         for run in monitor_config.get_runs():
@@ -229,7 +366,60 @@ class Worker(object):
             if run['on_demand']:
                 continue
 
-            runs.append(self.start_run(run, cycles, process_only_node))
+            runs.append(self.start_run(run, cycles, process_only_node, shard))
+
+        # The collector is started after the runs have been forked, so that they do not
+        # inherit its sockets and threads
+        collector = None
+        if metrics.is_enabled():
+            collector = metrics.Collector()
+            try:
+                collector.start()
+            except socket.error:
+                logger.error("Failed to start the metrics collector:")
+                logger.error(traceback.format_exc())
+                collector = None
+
+        try:
+            self.wait(runs, shard)
+        finally:
+            if collector is not None:
+                collector.stop()
 
-        for p in runs:
-            p.join()
+    def wait(self, runs, shard=None):
+        """
+        Waits for monitoring runs to finish, sending heartbeats when monitoring
+        is sharded.
+
+        :param runs: A list of run processes
+        :param shard: Optional instance name
+        """
+
+        if shard is None:
+            for p in runs:
+                p.join()
+            return
+
+        try:
+            while True:
+                alive = [p for p in runs if p.is_alive()]
+                if not alive:
+                    break
+
+                alive[0].join(sharding.HEARTBEAT_INTERVAL)
+
+                try:
+                    sharding.heartbeat(shard)
+                except db.DatabaseError:
+                    logger.warning("Failed to record heartbeat:")
+                    logger.warning(traceback.format_exc())
+                    connection.close()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Leave immediately, so that other instances take over our nodes without waiting
+            # for the heartbeat to time out
+            try:
+                sharding.unregister(shard)
+            except db.DatabaseError:
+                pass
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.contrib.auth import models as auth_models
+from django.contrib.contenttypes import models as contenttypes_models
+from django.core.cache import cache
+
+from guardian import utils as guardian_utils
+
+from . import cache as core_cache, models as core_models
+
+
+def _get_node_index_key(user_pk, generation):
+    return 'nodewatcher.user.nodes.%s.%s' % (user_pk, generation)
+
+
+def _get_object_pk_field(permission_model):
+    if permission_model.objects.is_generic():
+        return 'object_pk'
+    else:
+        return 'content_object__pk'
+
+
+def compute_node_pks_for_user(user):
+    """
+    Returns the set of primary keys of nodes on which a user has any object
+    permission, either directly or through one of its groups.
+
+    :param user: User instance
+    """
+
+    content_type = contenttypes_models.ContentType.objects.get_for_model(core_models.Node)
+
+    user_model = guardian_utils.get_user_obj_perms_model(core_models.Node)
+    node_pks = set(user_model.objects.filter(
+        user=user,
+        permission__content_type=content_type,
+    ).values_list(_get_object_pk_field(user_model), flat=True))
+
+    group_model = guardian_utils.get_group_obj_perms_model(core_models.Node)
+    node_pks.update(group_model.objects.filter(
+        group__in=user.groups.all(),
+        permission__content_type=content_type,
+    ).values_list(_get_object_pk_field(group_model), flat=True))
+
+    return node_pks
+
+
+def get_node_pks_for_user(user):
+    """
+    Returns the set of primary keys of nodes on which a user has any object
+    permission. The set is cached until object permissions of the user or any
+    of its groups change.
+
+    :param user: User instance
+    """
+
+    key = _get_node_index_key(user.pk, core_cache.get_user_permissions_generation(user.pk))
+    node_pks = cache.get(key)
+    if node_pks is None:
+        node_pks = compute_node_pks_for_user(user)
+        cache.set(key, node_pks, getattr(settings, 'PERMISSIONS_NODE_INDEX_CACHE_TIMEOUT', 600))
+
+    return node_pks
+
+
+def filter_nodes_for_user(user, queryset):
+    """
+    Filters a node queryset to nodes on which a user has any object permission.
+    Superuser status is not taken into account.
+
+    :param user: User instance
+    :param queryset: Node queryset
+    """
+
+    return queryset.filter(pk__in=list(get_node_pks_for_user(user)))
+
+
+def invalidate_users(user_pks):
+    """
+    Invalidates cached node permission sets of the given users.
+
+    :param user_pks: An iterable of user primary keys
+    """
+
+    for user_pk in set(user_pks):
+        core_cache.bump_user_permissions_generation(user_pk)
+
+
+def invalidate_groups(group_pks):
+    """
+    Invalidates cached node permission sets of all members of the given groups.
+
+    :param group_pks: An iterable of group primary keys
+    """
+
+    invalidate_users(auth_models.User.objects.filter(groups__in=list(group_pks)).values_list('pk', flat=True))
@@ -0,0 +1,248 @@
+import itertools
+
+from django.contrib.auth import models as auth_models
+from django.contrib.contenttypes import models as contenttypes_models
+from django.db import transaction
+
+from guardian import utils as guardian_utils
+
+from . import models as core_models, permissions as core_permissions
+
+# Default number of nodes provisioned in a single transaction
+CHUNK_SIZE = 100
+
+
+class ProvisioningError(Exception):
+    pass
+
+
+class Ref(object):
+    """
+    A reference to a registry item or an allocation created earlier for the same
+    node, which may be used as a value when creating further registry items.
+    """
+
+    def __init__(self, name):
+        """
+        Class constructor.
+
+        :param name: Name of the referenced item
+        """
+
+        self.name = name
+
+
+class NodeSpec(object):
+    """
+    Specification of a node that should be provisioned.
+    """
+
+    def __init__(self, uuid):
+        """
+        Class constructor.
+
+        :param uuid: Node UUID
+        """
+
+        self.uuid = uuid
+        self.allocations = []
+        self.items = []
+        self.permissions = []
+
+    def reserve_subnet(self, name, pool, network, prefix_length):
+        """
+        Requests a specific subnet to be reserved from a pool.
+
+        :param name: Name under which the allocation can be referenced
+        :param pool: Top-level IP pool instance
+        :param network: Subnet address
+        :param prefix_length: Subnet prefix length
+        """
+
+        self.allocations.append((name, pool, str(network), int(prefix_length)))
+        return Ref(name)
+
+    def add_item(self, item_class, ref=None, **kwargs):
+        """
+        Requests a registry item to be created. Items are created in the order
+        in which they have been added.
+
+        :param item_class: Registry item class
+        :param ref: Optional name under which the item can be referenced
+        """
+
+        self.items.append((ref, item_class, kwargs))
+        return Ref(ref) if ref is not None else None
+
+    def add_permissions(self, user, *codenames):
+        """
+        Requests object permissions to be granted to a user.
+
+        :param user: User instance
+        :param codenames: Permission codenames
+        """
+
+        for codename in codenames:
+            self.permissions.append((user, codename))
+
+
+class Provisioner(object):
+    """
+    Creates nodes together with their registry items, IP allocations and object
+    permissions in chunks, each chunk in its own transaction.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, progress=None):
+        """
+        Class constructor.
+
+        :param chunk_size: Number of nodes provisioned in a single transaction
+        :param progress: Optional callable, which is called with the number of
+          processed specifications after each committed chunk
+        """
+
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._permissions = {}
+
+    def ensure_nodes(self, uuids):
+        """
+        Creates node instances that do not yet exist. Call this before provisioning
+        when registry items of some nodes reference other nodes.
+
+        :param uuids: An iterable of node UUIDs
+        :return: Number of created nodes
+        """
+
+        created = 0
+        uuids = iter(uuids)
+        while True:
+            chunk = list(itertools.islice(uuids, self.chunk_size))
+            if not chunk:
+                break
+
+            with transaction.atomic():
+                existing = set(core_models.Node.objects.filter(uuid__in=chunk).values_list('uuid', flat=True))
+                missing = [core_models.Node(uuid=uuid) for uuid in set(chunk) - existing]
+                core_models.Node.objects.bulk_create(missing)
+                created += len(missing)
+
+        return created
+
+    def get_permission(self, codename):
+        """
+        Returns a node permission instance.
+
+        :param codename: Permission codename
+        """
+
+        try:
+            return self._permissions[codename]
+        except KeyError:
+            permission = self._permissions[codename] = auth_models.Permission.objects.get(
+                content_type=contenttypes_models.ContentType.objects.get_for_model(core_models.Node),
+                codename=codename,
+            )
+            return permission
+
+    def provision(self, specs, start=0):
+        """
+        Provisions nodes.
+
+        :param specs: An iterable of node specifications
+        :param start: Number of specifications that have already been provisioned
+          by a previous invocation and should be skipped
+        :return: Number of processed specifications
+        """
+
+        processed = 0
+        specs = iter(specs)
+        if start:
+            processed = sum([1 for spec in itertools.islice(specs, start)])
+
+        while True:
+            chunk = list(itertools.islice(specs, self.chunk_size))
+            if not chunk:
+                break
+
+            with transaction.atomic():
+                self._provision_chunk(chunk)
+
+            processed += len(chunk)
+            if self.progress is not None:
+                self.progress(processed)
+
+        return processed
+
+    def _provision_chunk(self, chunk):
+        # Create missing node instances at once
+        uuids = [spec.uuid for spec in chunk]
+        nodes = core_models.Node.objects.in_bulk(uuids)
+        missing = [core_models.Node(uuid=uuid) for uuid in uuids if uuid not in nodes]
+        core_models.Node.objects.bulk_create(missing)
+        nodes.update(dict([(node.uuid, node) for node in missing]))
+
+        # Reserve subnets, reclaiming held down pools only once per pool
+        reclaimed = set()
+        references = {}
+        for spec in chunk:
+            refs = references[spec.uuid] = {}
+            for name, pool, network, prefix_length in spec.allocations:
+                if pool.pk not in reclaimed:
+                    pool.reclaim_held_down()
+                    reclaimed.add(pool.pk)
+
+                allocation = pool.reserve_subnet(network, prefix_length, reclaim=False)
+                if allocation is None:
+                    raise ProvisioningError("Failed to allocate subnet '%s/%d' for node %s!" % (network, prefix_length, spec.uuid))
+                refs[name] = allocation
+
+        # Create registry items
+        for spec in chunk:
+            node = nodes[spec.uuid]
+            refs = references[spec.uuid]
+            for ref, item_class, kwargs in spec.items:
+                kwargs = kwargs.copy()
+                for key, value in kwargs.items():
+                    if isinstance(value, Ref):
+                        kwargs[key] = refs[value.name]
+
+                item = item_class(root=node, **kwargs)
+                item.save()
+                if ref is not None:
+                    refs[ref] = item
+
+        # Grant object permissions in bulk
+        permission_model = guardian_utils.get_user_obj_perms_model(core_models.Node)
+        if permission_model.objects.is_generic():
+            content_type = contenttypes_models.ContentType.objects.get_for_model(core_models.Node)
+            target = lambda node: {'content_type': content_type, 'object_pk': node.pk}
+        else:
+            target = lambda node: {'content_object': node}
+
+        permissions = []
+        for spec in chunk:
+            node = nodes[spec.uuid]
+            for user, codename in spec.permissions:
+                permissions.append(permission_model(user=user, permission=self.get_permission(codename), **target(node)))
+
+        permission_model.objects.bulk_create(permissions)
+        # Bulk creation does not send signals, so cached permission sets are invalidated here
+        core_permissions.invalidate_users([permission.user.pk for permission in permissions])
+
+
+def provision_nodes(specs, chunk_size=CHUNK_SIZE, start=0, progress=None):
+    """
+    Provisions nodes in bulk. This is meant for onboarding many nodes at once; each
+    chunk of nodes is provisioned in its own transaction, so an interrupted run can
+    be resumed by passing the number of already processed specifications.
+
+    :param specs: An iterable of `NodeSpec` instances
+    :param chunk_size: Number of nodes provisioned in a single transaction
+    :param start: Number of specifications to skip
+    :param progress: Optional callable, which is called with the number of
+      processed specifications after each committed chunk
+    :return: Number of processed specifications
+    """
+
+    return Provisioner(chunk_size, progress).provision(specs, start=start)
@@ -1,7 +1,17 @@
+import copy
+import datetime
+import decimal
+
 from django import forms
+from django.db.models import signals as django_signals
 
 import polymorphic
 
+# Values of these types are stored in the loaded state without copying
+IMMUTABLE_TYPES = (type(None), basestring, bool, int, long, float, decimal.Decimal, datetime.date, datetime.time, datetime.timedelta)
+
+_MISSING = object()
+
 
 class RegistryItemBase(polymorphic.PolymorphicModel):
     """
@@ -18,6 +28,58 @@ class RegistryItemBase(polymorphic.PolymorphicModel):
         abstract = True
         ordering = ['id']
 
+    def __init__(self, *args, **kwargs):
+        """
+        Class constructor.
+        """
+
+        super(RegistryItemBase, self).__init__(*args, **kwargs)
+        self._registry_loaded_state = self._get_registry_state()
+
+    def _get_registry_state(self, fields=None):
+        state = {}
+        for field in self._meta.concrete_fields:
+            if fields is not None and field.attname not in fields and field.name not in fields:
+                continue
+
+            # Deferred fields have not been loaded
+            value = self.__dict__.get(field.attname, _MISSING)
+            if value is _MISSING:
+                continue
+
+            if not isinstance(value, IMMUTABLE_TYPES):
+                value = copy.deepcopy(value)
+            state[field.attname] = value
+
+        return state
+
+    def get_registry_dirty_fields(self):
+        """
+        Returns a list of names of fields that have been modified since the item
+        has been loaded or last saved.
+        """
+
+        dirty = []
+        for field in self._meta.concrete_fields:
+            if field.primary_key or getattr(field.rel, 'parent_link', False):
+                continue
+
+            value = self.__dict__.get(field.attname, _MISSING)
+            if value is _MISSING:
+                continue
+
+            loaded = self._registry_loaded_state.get(field.attname, _MISSING)
+            try:
+                changed = loaded is _MISSING or loaded != value
+            except TypeError:
+                # For example comparison of naive and aware datetimes
+                changed = True
+
+            if changed:
+                dirty.append(field.attname)
+
+        return dirty
+
     @classmethod
     def get_registry_regpoint(self):
         """
@@ -135,13 +197,50 @@ class RegistryItemBase(polymorphic.PolymorphicModel):
 
     def save(self, *args, **kwargs):
         """
-        Sets up and saves the configuration item.
-        """
-
-        super(RegistryItemBase, self).save(*args, **kwargs)
-
-        # If only one configuration instance should be allowed, we
-        # should delete existing ones
-        if not getattr(self.RegistryMeta, 'multiple', False) and self.root:
-            cfg, _ = self._registry_regpoint.get_top_level_queryset(self.root, self.RegistryMeta.registry_id)
-            cfg.exclude(pk=self.pk).delete()
+        Sets up and saves the configuration item. When an item that has been loaded
+        from the database is saved, only modified fields are written and a save of
+        an unmodified item is skipped. In the latter case, `post_save` is still sent
+        with empty `update_fields`, so that receivers may track saved items.
+        """
+
+        if kwargs.get('update_fields', None) is not None:
+            super(RegistryItemBase, self).save(*args, **kwargs)
+            self._registry_loaded_state.update(self._get_registry_state(kwargs['update_fields']))
+            return
+
+        tracked = not args and not (set(kwargs) - set(['using'])) and not self._state.adding and \
+            self._registry_loaded_state.get(self._meta.pk.attname, _MISSING) == self.pk
+        if not tracked:
+            super(RegistryItemBase, self).save(*args, **kwargs)
+            self._registry_loaded_state = self._get_registry_state()
+
+            # If only one configuration instance should be allowed, we
+            # should delete existing ones
+            if not getattr(self.RegistryMeta, 'multiple', False) and self.root:
+                cfg, _ = self._registry_regpoint.get_top_level_queryset(self.root, self.RegistryMeta.registry_id)
+                cfg.exclude(pk=self.pk).delete()
+            return
+
+        dirty = self.get_registry_dirty_fields()
+        if not dirty:
+            cls = self.__class__
+            if cls._deferred:
+                cls = cls._meta.proxy_for_model
+
+            django_signals.post_save.send(
+                sender=cls,
+                instance=self,
+                created=False,
+                update_fields=frozenset(),
+                raw=False,
+                using=kwargs.get('using', None) or self._state.db,
+            )
+            return
+
+        # Fields that are updated on every save must also be written
+        for field in self._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) and field.attname not in dirty:
+                dirty.append(field.attname)
+
+        super(RegistryItemBase, self).save(update_fields=dirty, **kwargs)
+        self._registry_loaded_state.update(self._get_registry_state(dirty))
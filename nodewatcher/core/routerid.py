@@ -0,0 +1,186 @@
+import bisect
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from nodewatcher.utils import ipaddr
+
+from . import cache as core_cache, models as core_models
+
+FAMILIES = ('ipv4', 'ipv6')
+
+# Index last used by this process together with its generation and build time
+_local_index = None
+
+
+def _get_index_key(generation):
+    return 'nodewatcher.routerid.index.%s' % generation
+
+
+class RouterIdIndex(object):
+    """
+    An index of node router identifiers, split by address family.
+    """
+
+    def __init__(self, entries):
+        """
+        Class constructor.
+
+        :param entries: An iterable of (node primary key, family, router ID) tuples;
+          when a node has multiple router IDs of the same family, the first one
+          is considered its primary router ID
+        """
+
+        self._nodes = dict([(family, {}) for family in FAMILIES])
+        self._router_ids = dict([(family, {}) for family in FAMILIES])
+        addresses = dict([(family, []) for family in FAMILIES])
+
+        for node_pk, family, router_id in entries:
+            if family not in self._nodes:
+                continue
+
+            router_id = str(router_id)
+            self._nodes[family][router_id] = node_pk
+            self._router_ids[family].setdefault(node_pk, router_id)
+
+            try:
+                addresses[family].append((int(ipaddr.IPAddress(router_id)), router_id))
+            except ValueError:
+                pass
+
+        # Sorted addresses are used for subnet containment lookups
+        self._addresses = {}
+        for family, values in addresses.items():
+            values.sort()
+            self._addresses[family] = ([value for value, name in values], [name for value, name in values])
+
+    def __len__(self):
+        return sum([len(nodes) for nodes in self._nodes.values()])
+
+    def lookup(self, router_id, family=None):
+        """
+        Returns the primary key of the node with the given router ID or None if
+        no such node exists.
+
+        :param router_id: Router ID
+        :param family: Optional address family
+        """
+
+        router_id = str(router_id)
+        for name in ([family] if family else FAMILIES):
+            try:
+                return self._nodes[name][router_id]
+            except KeyError:
+                pass
+
+        return None
+
+    def lookup_many(self, router_ids, family=None):
+        """
+        Returns a dictionary mapping router IDs to primary keys of their nodes.
+        Unknown router IDs are omitted.
+
+        :param router_ids: An iterable of router IDs
+        :param family: Optional address family
+        """
+
+        result = {}
+        for router_id in router_ids:
+            node_pk = self.lookup(router_id, family)
+            if node_pk is not None:
+                result[router_id] = node_pk
+
+        return result
+
+    def lookup_subnet(self, network):
+        """
+        Returns a dictionary mapping router IDs contained in a subnet to primary
+        keys of their nodes.
+
+        :param network: Subnet address or instance
+        """
+
+        if not isinstance(network, ipaddr._BaseNet):
+            network = ipaddr.IPNetwork(network)
+
+        family = 'ipv%d' % network.version
+        values, router_ids = self._addresses[family]
+        start = bisect.bisect_left(values, int(network.network))
+        end = bisect.bisect_right(values, int(network.broadcast))
+
+        return dict([(router_id, self._nodes[family][router_id]) for router_id in router_ids[start:end]])
+
+    def get_router_id(self, node_pk, family='ipv4'):
+        """
+        Returns the primary router ID of a node or None if the node has no router ID
+        of the given family.
+
+        :param node_pk: Node primary key
+        :param family: Address family
+        """
+
+        return self._router_ids[family].get(node_pk, None)
+
+
+def build_index():
+    """
+    Builds a router ID index from the database.
+    """
+
+    return RouterIdIndex(
+        core_models.RouterIdConfig.objects.order_by('pk').values_list('root_id', 'rid_family', 'router_id').iterator()
+    )
+
+
+def get_index():
+    """
+    Returns the current router ID index. The index is shared between processes
+    through the cache and is rebuilt after any router ID is saved or deleted.
+    """
+
+    global _local_index
+
+    timeout = getattr(settings, 'ROUTER_ID_INDEX_CACHE_TIMEOUT', 600)
+    generation = core_cache.get_router_id_index_generation()
+    if _local_index is not None:
+        local_generation, built, index = _local_index
+        if local_generation == generation and time.time() - built < timeout:
+            return index
+
+    key = _get_index_key(generation)
+    cached = cache.get(key)
+    if cached is None:
+        cached = (time.time(), build_index())
+        cache.set(key, cached, timeout)
+
+    built, index = cached
+    _local_index = (generation, built, index)
+    return index
+
+
+def invalidate():
+    """
+    Invalidates the router ID index.
+    """
+
+    global _local_index
+
+    _local_index = None
+    core_cache.bump_router_id_index_generation()
+
+
+def get_router_id(node_pk, family='ipv4'):
+    """
+    Returns the primary router ID of a node.
+
+    :param node_pk: Node primary key
+    :param family: Address family
+    :raises RouterIdConfig.DoesNotExist: When the node has no router ID of the given family
+    """
+
+    router_id = get_index().get_router_id(node_pk, family)
+    if router_id is None:
+        raise core_models.RouterIdConfig.DoesNotExist("Node '%s' has no %s router ID." % (node_pk, family))
+
+    return router_id
@@ -0,0 +1,145 @@
+import json
+import StringIO
+import unittest
+import uuid
+
+from django import test as django_test
+from django.contrib.auth import models as auth_models
+
+from guardian import shortcuts
+
+from nodewatcher.core.allocation.ip import models as pool_models
+from nodewatcher.core.generator.cgm import models as cgm_models
+from nodewatcher.modules.importer.nw2.management.commands import import_nw2
+
+from . import models as core_models, permissions as core_permissions, provisioning, routerid as core_routerid
+
+
+class RouterIdIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = core_routerid.RouterIdIndex([
+            ('node-a', 'ipv4', '10.0.0.1'),
+            ('node-a', 'ipv4', '10.0.1.1'),
+            ('node-a', 'ipv6', '2001:db8::1'),
+            ('node-b', 'ipv4', '10.0.0.2'),
+            ('node-c', 'ipv4', '10.1.0.1'),
+            ('node-d', 'ipv6', '2001:db8:1::1'),
+        ])
+
+    def test_lookup(self):
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual(self.index.lookup('10.0.0.2'), 'node-b')
+        self.assertEqual(self.index.lookup('10.0.1.1', family='ipv4'), 'node-a')
+        self.assertEqual(self.index.lookup('2001:db8::1'), 'node-a')
+        self.assertEqual(self.index.lookup('2001:db8::1', family='ipv4'), None)
+        self.assertEqual(self.index.lookup('10.9.9.9'), None)
+
+        self.assertEqual(
+            self.index.lookup_many(['10.0.0.1', '10.0.0.2', '10.9.9.9'], family='ipv4'),
+            {'10.0.0.1': 'node-a', '10.0.0.2': 'node-b'},
+        )
+
+    def test_router_ids(self):
+        # The first router ID of each family is the primary one
+        self.assertEqual(self.index.get_router_id('node-a'), '10.0.0.1')
+        self.assertEqual(self.index.get_router_id('node-a', 'ipv6'), '2001:db8::1')
+        self.assertEqual(self.index.get_router_id('node-d'), None)
+
+    def test_subnets(self):
+        self.assertEqual(
+            self.index.lookup_subnet('10.0.0.0/16'),
+            {'10.0.0.1': 'node-a', '10.0.0.2': 'node-b', '10.0.1.1': 'node-a'},
+        )
+        self.assertEqual(self.index.lookup_subnet('10.1.0.1/32'), {'10.1.0.1': 'node-c'})
+        self.assertEqual(self.index.lookup_subnet('10.2.0.0/16'), {})
+        self.assertEqual(self.index.lookup_subnet('2001:db8:1::/48'), {'2001:db8:1::1': 'node-d'})
+
+
+class ProvisioningTestCase(django_test.TestCase):
+    def setUp(self):
+        self.pool = pool_models.IpPool.objects.create(
+            family='ipv4',
+            network='10.20.0.0',
+            prefix_length=16,
+        )
+        self.user = auth_models.User.objects.create_user(username='maintainer')
+
+    def get_specs(self, count):
+        specs = []
+        for i in xrange(count):
+            spec = provisioning.NodeSpec(str(uuid.UUID(int=i + 1, version=1)))
+            spec.add_item(core_models.GeneralConfig, name='Node %d' % i)
+            iface = spec.add_item(cgm_models.EthernetInterfaceConfig, ref='iface_lan', eth_port='lan0')
+            spec.add_item(
+                cgm_models.AllocatedNetworkConfig,
+                interface=iface,
+                description='LAN',
+                family='ipv4',
+                pool=self.pool,
+                prefix_length=27,
+                allocation=spec.reserve_subnet('subnet_lan', self.pool, '10.20.%d.0' % i, 27),
+            )
+            spec.add_permissions(self.user, 'change_node', 'delete_node')
+            specs.append(spec)
+
+        return specs
+
+    def test_provision(self):
+        progress = []
+        processed = provisioning.provision_nodes(self.get_specs(3), chunk_size=2, progress=progress.append)
+        self.assertEqual(processed, 3)
+        self.assertEqual(progress, [2, 3])
+
+        nodes = core_models.Node.objects.order_by('uuid')
+        self.assertEqual(nodes.count(), 3)
+        for i, node in enumerate(nodes):
+            self.assertEqual(node.config.core.general().name, 'Node %d' % i)
+
+            iface = cgm_models.EthernetInterfaceConfig.objects.get(root=node)
+            network = cgm_models.AllocatedNetworkConfig.objects.get(root=node)
+            self.assertEqual(network.interface.pk, iface.pk)
+            self.assertEqual(network.allocation.network, '10.20.%d.0' % i)
+            self.assertEqual(network.allocation.prefix_length, 27)
+            self.assertEqual(network.allocation.top_level().pk, self.pool.pk)
+
+            self.assertEqual(sorted(shortcuts.get_perms(self.user, node)), ['change_node', 'delete_node'])
+
+        self.assertEqual(core_permissions.get_node_pks_for_user(self.user), set([node.pk for node in nodes]))
+
+    def test_resume(self):
+        # An interrupted run has provisioned the first two nodes
+        provisioning.provision_nodes(self.get_specs(2))
+
+        processed = provisioning.provision_nodes(self.get_specs(3), start=2)
+        self.assertEqual(processed, 3)
+        self.assertEqual(core_models.Node.objects.count(), 3)
+        self.assertEqual(core_models.GeneralConfig.objects.count(), 3)
+        self.assertEqual(pool_models.IpPool.objects.filter(status=pool_models.IpPoolStatus.Full, prefix_length=27).count(), 3)
+
+    def test_import_skipped_nodes(self):
+        imported = str(uuid.UUID(int=1, version=1))
+        skipped = str(uuid.UUID(int=2, version=1))
+
+        command = import_nw2.Command()
+        command.stdout = StringIO.StringIO()
+        command.input_file = StringIO.StringIO(json.dumps({
+            'nodes': {
+                '1': {
+                    'uuid': imported,
+                    'name': 'imported',
+                    'subnets': [{'gen_iface_type': 2, 'subnet': '10.20.0.0', 'cidr': 24}],
+                },
+                # Nodes without a mesh subnet have no router ID and are not imported
+                '2': {
+                    'uuid': skipped,
+                    'name': 'skipped',
+                    'subnets': [],
+                },
+            },
+        }))
+
+        data = {}
+        uuids = command.prepare_nodes(data, provisioning.Provisioner())
+        self.assertEqual(uuids, [imported])
+        self.assertEqual(data['node_names'], {'imported': imported})
+        self.assertEqual(list(core_models.Node.objects.values_list('uuid', flat=True)), [imported])
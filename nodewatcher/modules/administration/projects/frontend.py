@@ -4,6 +4,7 @@ from nodewatcher.core.frontend import components
 components.partials.get_partial('node_snippet_partial').add(components.PartialEntry(
     name='project',
     template='nodes/snippet/project.html',
+    cache_key=components.node_cache_key,
     extra_context=lambda context: {
         'node_project': getattr(context['node'].config.core.project(), 'project', None),
     }
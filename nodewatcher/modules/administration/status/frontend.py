@@ -6,6 +6,7 @@ from . import models
 components.partials.get_partial('node_snippet_partial').add(components.PartialEntry(
     name='status',
     template='nodes/snippet/status.html',
+    cache_key=components.node_cache_key,
     extra_context=lambda context: {
         'node_status': context['node'].monitoring.core.status(default=models.StatusMonitor),
     },
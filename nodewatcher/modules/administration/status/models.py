@@ -1,5 +1,7 @@
+from django.db import models
 from django.utils.translation import ugettext as _
 
+from nodewatcher.core import models as core_models
 from nodewatcher.core.registry import registration, fields as registry_fields
 # Following import needed for 'node.monitoring' registration point
 from nodewatcher.core.monitor import models as monitor_models
@@ -68,3 +70,20 @@ registration.point('node.monitoring').register_choice(
     'core.status#health',
     registration.Choice(None, _("Unknown"), help_text=_("The health status of the node is unknown.")),
 )
+
+
+class PollingSchedule(models.Model):
+    """
+    Per-node telemetry polling schedule.
+    """
+
+    node = models.OneToOneField(core_models.Node, related_name='polling_schedule')
+    # Time when the node should next be polled (null means as soon as possible)
+    next_poll = models.DateTimeField(null=True, db_index=True)
+    interval = models.PositiveIntegerField(default=0)
+    # Number of consecutive polls where the node was unreachable
+    failures = models.PositiveIntegerField(default=0)
+    # Exponentially decaying number of recent network status transitions
+    flap_score = models.FloatField(default=0.0)
+    last_network = models.CharField(max_length=20, null=True)
+    last_poll = models.DateTimeField(null=True)
@@ -0,0 +1,130 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import models
+
+# Polling interval for nodes that are reachable and stable
+POLLING_INTERVAL = getattr(settings, 'MONITOR_POLLING_INTERVAL', 300)
+# Polling interval for nodes that have recently been flapping
+POLLING_MIN_INTERVAL = getattr(settings, 'MONITOR_POLLING_MIN_INTERVAL', 60)
+# Upper bound for the polling interval of unreachable nodes
+POLLING_MAX_INTERVAL = getattr(settings, 'MONITOR_POLLING_MAX_INTERVAL', 3600)
+# Number of recent status transitions after which a node is considered to be flapping
+FLAP_THRESHOLD = getattr(settings, 'MONITOR_POLLING_FLAP_THRESHOLD', 3.0)
+# Time in seconds after which the contribution of a status transition is halved
+FLAP_HALF_LIFE = getattr(settings, 'MONITOR_POLLING_FLAP_HALF_LIFE', 3600)
+
+
+def is_reachable(network, monitored):
+    """
+    Returns true if the node should be considered reachable for the purpose of
+    telemetry polling.
+
+    :param network: Network status of the node
+    :param monitored: Monitored status of the node
+    """
+
+    return network not in ('down', None) and monitored is not False
+
+
+def get_flap_score(score, elapsed, transition):
+    """
+    Returns the updated flap score.
+
+    :param score: Previous flap score
+    :param elapsed: Number of seconds since the previous update
+    :param transition: True if the network status has changed since the previous update
+    """
+
+    score *= 0.5 ** (max(0, elapsed) / float(FLAP_HALF_LIFE))
+    if transition:
+        score += 1.0
+
+    return score
+
+
+def get_interval(failures, flap_score):
+    """
+    Returns the number of seconds until the next poll. Unreachable nodes are backed
+    off exponentially, while flapping nodes are polled more often.
+
+    :param failures: Number of consecutive polls where the node was unreachable
+    :param flap_score: Current flap score
+    """
+
+    if flap_score >= FLAP_THRESHOLD:
+        return POLLING_MIN_INTERVAL
+    elif failures:
+        return min(POLLING_MAX_INTERVAL, POLLING_INTERVAL * 2 ** min(failures - 1, 16))
+
+    return POLLING_INTERVAL
+
+
+def get_deferred_nodes(now=None):
+    """
+    Returns a queryset of primary keys of nodes that are not yet due to be polled. Nodes which
+    are due within half of the minimum polling interval are considered due, so that
+    small variations in cycle duration do not cause a node to skip a whole cycle.
+
+    :param now: Optional current time
+    """
+
+    if now is None:
+        now = timezone.now()
+
+    horizon = now + datetime.timedelta(seconds=POLLING_MIN_INTERVAL / 2)
+    return models.PollingSchedule.objects.filter(next_poll__gt=horizon).values_list('node', flat=True)
+
+
+def get_down_nodes():
+    """
+    Returns a queryset of primary keys of nodes that were down when they were last polled.
+    """
+
+    return models.PollingSchedule.objects.filter(last_network='down').values_list('node', flat=True)
+
+
+def update_schedule(node, network, monitored, now=None):
+    """
+    Updates the polling schedule of a node after it has been polled.
+
+    :param node: Node instance
+    :param network: Network status of the node
+    :param monitored: Monitored status of the node
+    :param now: Optional current time
+    :return: Updated schedule
+    """
+
+    if now is None:
+        now = timezone.now()
+
+    schedule, created = models.PollingSchedule.objects.get_or_create(node=node)
+
+    elapsed = (now - schedule.last_poll).total_seconds() if schedule.last_poll else 0
+    transition = not created and schedule.last_network != network
+    schedule.flap_score = get_flap_score(schedule.flap_score, elapsed, transition)
+
+    if is_reachable(network, monitored):
+        schedule.failures = 0
+    else:
+        schedule.failures += 1
+
+    schedule.interval = get_interval(schedule.failures, schedule.flap_score)
+    schedule.next_poll = now + datetime.timedelta(seconds=schedule.interval)
+    schedule.last_network = network
+    schedule.last_poll = now
+    schedule.save()
+
+    return schedule
+
+
+def reset_schedule(node):
+    """
+    Makes the node due for polling in the next cycle.
+
+    :param node: Node instance
+    """
+
+    models.PollingSchedule.objects.filter(node=node).update(next_poll=None)
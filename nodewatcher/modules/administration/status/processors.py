@@ -1,6 +1,7 @@
+from nodewatcher.core import models as core_models
 from nodewatcher.core.monitor import processors as monitor_processors
 
-from . import models, events
+from . import models, events, polling
 
 
 class NodeStatus(monitor_processors.NodeProcessor):
@@ -45,5 +46,67 @@ class NodeStatus(monitor_processors.NodeProcessor):
         # Emit event on node state transitions
         if prev_network != sm.network:
             events.NodeStatusChange(node, prev_network, sm.network).post()
+            # Poll the node in the next telemetry cycle, even when it is being backed off
+            polling.reset_schedule(node)
+
+        return context
+
+
+class GetDueNodes(monitor_processors.NetworkProcessor):
+    """
+    A processor that populates the nodes set with all nodes that are due to be
+    polled in this cycle and removes nodes that are not due from the set. Nodes
+    that were down and are again visible in the OLSR topology are always due.
+    """
+
+    def process(self, context, nodes):
+        """
+        Performs network-wide processing and selects the nodes that will be processed
+        in any following processors. Context is passed between network processors.
+
+        :param context: Current context
+        :param nodes: A set of nodes that are to be processed
+        :return: A (possibly) modified context and a (possibly) modified set of nodes
+        """
+
+        deferred = polling.get_deferred_nodes()
+        for node in core_models.Node.objects.exclude(pk__in=deferred):
+            nodes.add(node)
+
+        deferred = set(deferred)
+
+        # Nodes that have been down, but are visible in the routing topology again, are polled
+        # immediately, so that their status is updated even when they are being backed off
+        visible = set([node.pk for node in context.routing.olsr.get('router_id_map', {}).values()])
+        if visible and deferred:
+            recovered = deferred.intersection(visible).intersection(polling.get_down_nodes())
+            deferred.difference_update(recovered)
+
+        due = set([node for node in nodes if node.pk not in deferred])
+        self.logger.info("Selected %d nodes due for polling, %d deferred." % (len(due), len(nodes) - len(due)))
+
+        return context, due
+
+
+class UpdatePollingSchedule(monitor_processors.NodeProcessor):
+    """
+    A processor that schedules the next poll of the node based on its status. It
+    should be run after the NodeStatus processor.
+    """
+
+    def process(self, context, node):
+        """
+        Called for every processed node.
+
+        :param context: Current context
+        :param node: Node that is being processed
+        :return: A (possibly) modified context
+        """
+
+        sm = node.monitoring.core.status()
+        if sm is None:
+            return context
+
+        polling.update_schedule(node, sm.network, sm.monitored)
 
         return context
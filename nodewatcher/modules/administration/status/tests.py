@@ -0,0 +1,54 @@
+import unittest
+
+from django import test as django_test
+
+from nodewatcher.core import models as core_models
+
+from . import models, polling
+
+
+class PollingTestCase(unittest.TestCase):
+    def test_reachable(self):
+        self.assertTrue(polling.is_reachable('up', True))
+        self.assertTrue(polling.is_reachable('visible', None))
+        self.assertFalse(polling.is_reachable('visible', False))
+        self.assertFalse(polling.is_reachable('down', None))
+
+    def test_backoff(self):
+        self.assertEqual(polling.get_interval(0, 0.0), polling.POLLING_INTERVAL)
+        self.assertEqual(polling.get_interval(1, 0.0), polling.POLLING_INTERVAL)
+        self.assertEqual(polling.get_interval(2, 0.0), min(polling.POLLING_MAX_INTERVAL, 2 * polling.POLLING_INTERVAL))
+        self.assertEqual(polling.get_interval(1000, 0.0), polling.POLLING_MAX_INTERVAL)
+
+    def test_flapping(self):
+        score = 0.0
+        for i in xrange(int(polling.FLAP_THRESHOLD)):
+            score = polling.get_flap_score(score, 0, True)
+
+        self.assertEqual(polling.get_interval(5, score), polling.POLLING_MIN_INTERVAL)
+
+        # Flap score decays over time
+        score = polling.get_flap_score(score, polling.FLAP_HALF_LIFE, False)
+        self.assertAlmostEqual(score, polling.FLAP_THRESHOLD / 2.0)
+
+
+class StatusMonitorSaveTestCase(django_test.TestCase):
+    def test_dirty_fields(self):
+        node = core_models.Node.objects.create(uuid='0f7a9a4e-8c7e-4b8a-bd3f-35c0c8b5f1a2')
+        node.monitoring.core.status(create=models.StatusMonitor, network='up')
+
+        sm = node.monitoring.core.status()
+        self.assertEqual(sm.get_registry_dirty_fields(), [])
+
+        # Saving an unmodified item is skipped
+        with self.assertNumQueries(0):
+            sm.save()
+
+        # Only modified fields are written
+        sm.network = 'down'
+        self.assertEqual(sm.get_registry_dirty_fields(), ['network'])
+        with self.assertNumQueries(1):
+            sm.save()
+
+        self.assertEqual(sm.get_registry_dirty_fields(), [])
+        self.assertEqual(node.monitoring.core.status().network, 'down')
@@ -4,6 +4,7 @@ from nodewatcher.core.frontend import components
 components.partials.get_partial('node_snippet_partial').add(components.PartialEntry(
     name='type',
     template='nodes/snippet/type.html',
+    cache_key=components.node_cache_key,
     extra_context=lambda context: {
         'node_type': context['node'].config.core.type(),
     }
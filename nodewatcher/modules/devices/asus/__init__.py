@@ -1,2 +1 @@
 # Asus device modules
-from . import wl500gpv1
@@ -1,2 +1 @@
 # Buffalo device modules
-from . import whr_hp_g54
@@ -1,2 +1,43 @@
-# Load supported devices
-from . import fon, linksys, buffalo, mikrotik, asus, tplink, ubnt, siemens, glinet
+import os
+
+from django.utils import importlib
+
+from nodewatcher.core.generator.cgm import base as cgm_base
+
+# Supported device modules
+DEVICE_MODULES = (
+    'nodewatcher.modules.devices.fon.fon2100',
+    'nodewatcher.modules.devices.fon.fon2200',
+    'nodewatcher.modules.devices.linksys.wrt54gl',
+    'nodewatcher.modules.devices.linksys.wrt54gs',
+    'nodewatcher.modules.devices.buffalo.whr_hp_g54',
+    'nodewatcher.modules.devices.mikrotik.rb433ah',
+    'nodewatcher.modules.devices.asus.wl500gpv1',
+    'nodewatcher.modules.devices.tplink.wr703n',
+    'nodewatcher.modules.devices.tplink.wr740nd',
+    'nodewatcher.modules.devices.tplink.wr741nd',
+    'nodewatcher.modules.devices.tplink.wr743nd',
+    'nodewatcher.modules.devices.tplink.wr841nd',
+    'nodewatcher.modules.devices.tplink.wr842nd',
+    'nodewatcher.modules.devices.tplink.wr941nd',
+    'nodewatcher.modules.devices.tplink.wr1041nd',
+    'nodewatcher.modules.devices.tplink.wr1043nd',
+    'nodewatcher.modules.devices.tplink.mr3020',
+    'nodewatcher.modules.devices.tplink.mr3040',
+    'nodewatcher.modules.devices.tplink.wdr4300',
+    'nodewatcher.modules.devices.ubnt.nano',
+    'nodewatcher.modules.devices.ubnt.bullet',
+    'nodewatcher.modules.devices.ubnt.rocket',
+    'nodewatcher.modules.devices.siemens.sx763',
+    'nodewatcher.modules.devices.glinet.glinet',
+)
+
+# Location of the generated device manifest (see the device_manifest management command)
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), 'manifest.json')
+
+# Devices listed in an up-to-date manifest are registered without importing their
+# descriptor modules, which are then only imported when the device is first used
+lazy_modules = cgm_base.load_device_manifest(MANIFEST_PATH)
+for module in DEVICE_MODULES:
+    if module not in lazy_modules:
+        importlib.import_module(module)
@@ -1,2 +1 @@
 # Fon device modules
-from . import fon2100, fon2200
@@ -1,2 +1 @@
 # GL.iNet device modules.
-from . import glinet
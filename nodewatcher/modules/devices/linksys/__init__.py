@@ -1,2 +1 @@
 # Linksys device modules
-from . import wrt54gl, wrt54gs
@@ -0,0 +1,41 @@
+import json
+from optparse import make_option
+
+from django.core.management import base
+from django.utils import importlib
+
+from nodewatcher.core.generator.cgm import base as cgm_base
+from nodewatcher.utils import loader
+
+from ... import cgm as devices_cgm
+
+
+class Command(base.BaseCommand):
+    help = "Generates the device manifest, which enables lazy loading of device descriptors."
+    requires_model_validation = False
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--output',
+            dest='output',
+            default=devices_cgm.MANIFEST_PATH,
+            help='Manifest output filename',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        loader.load_modules('cgm')
+        for module in devices_cgm.DEVICE_MODULES:
+            importlib.import_module(module)
+
+        manifest = cgm_base.generate_device_manifest(devices_cgm.DEVICE_MODULES)
+
+        try:
+            with open(options['output'], 'w') as output_file:
+                json.dump(manifest, output_file, indent=2, sort_keys=True)
+        except IOError:
+            raise base.CommandError("Unable to write manifest to '%s'!" % options['output'])
+
+        self.stdout.write("Written manifest for %d devices to '%s'.\n" % (
+            sum([len(module['devices']) for module in manifest['modules'].values()]),
+            options['output'],
+        ))
@@ -1,2 +1 @@
 # Mikrotik device modules
-from . import rb433ah
@@ -1,2 +1 @@
 # Siemens device modules
-from . import sx763
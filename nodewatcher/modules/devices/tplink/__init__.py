@@ -1,2 +1 @@
 # TP-Link device modules
-from . import wr703n, wr740nd, wr741nd, wr743nd, wr841nd, wr842nd, wr941nd, wr1041nd, wr1043nd, mr3020, mr3040, wdr4300
@@ -1,2 +1 @@
 # UBNT device modules
-from . import nano, bullet, rocket
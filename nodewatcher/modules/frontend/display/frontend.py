@@ -29,6 +29,7 @@ components.partials.get_partial('node_snippet_partial').add(components.PartialEn
     name='name',
     template='nodes/snippet/name.html',
     weight=-1,
+    cache_key=lambda context: None if 'node_name' in context else components.node_cache_key(context),
     extra_context=lambda context: {} if 'node_name' in context else {
         'node_name': getattr(context['node'].config.core.general(), 'name', None) or _("unknown")
     },
@@ -86,6 +86,7 @@ class BuildResultResource(api.BaseResource):
     files = fields.ToManyField(BuildResultFileResource, 'files', full=True, use_in='detail')
     build_log = fields.CharField('build_log', use_in='detail')
     config = fields.DictField('config', use_in='detail')
+    queue_position = fields.IntegerField('get_queue_position', null=True, use_in='detail')
 
     class Meta:
         queryset = generator_models.BuildResult.objects.prefetch_related(
@@ -1,5 +1,6 @@
 from django import http
 from django.core import urlresolvers
+from django.utils import timezone
 from django.views import generic
 
 from guardian import mixins
@@ -63,6 +64,14 @@ class ViewBuild(generic.DetailView):
     model = generator_models.BuildResult
     context_object_name = 'result'
 
+    def get_context_data(self, **kwargs):
+        context = super(ViewBuild, self).get_context_data(**kwargs)
+
+        eta = self.object.get_eta()
+        context['queue_position'] = self.object.get_queue_position()
+        context['estimated_completion'] = timezone.now() + eta if eta is not None else None
+        return context
+
 
 class ListBuilds(generic.TemplateView):
     template_name = 'generator/list_builds.html'
@@ -1,8 +1,7 @@
 from django.contrib.auth import models as auth_models
 
-from nodewatcher.core import models as core_models
+from nodewatcher.core import models as core_models, permissions as core_permissions
 from nodewatcher.core.frontend import api
-from nodewatcher.utils import permissions
 
 from tastypie import resources
 
@@ -81,7 +80,7 @@ class NodeResource(api.BaseResource):
         if maintainer:
             try:
                 maintainer_user = auth_models.User.objects.get(username=maintainer)
-                queryset = permissions.get_objects_for_user(maintainer_user, [], queryset, use_superusers=False)
+                queryset = core_permissions.filter_nodes_for_user(maintainer_user, queryset)
             except auth_models.User.DoesNotExist:
                 queryset = queryset.none()
 
@@ -510,6 +510,36 @@ class NodeResourceTest(test_runner.ResourceTestCase):
                             ) if offset != 0 else None,
                         }, data['meta'])
 
+    def test_maintainer_permission_changes(self):
+        user = self.users[0]
+        node = self.nodes[1]
+
+        def maintained():
+            data = self.get_list('node', offset=0, limit=0, maintainer=user.username)
+            return [node['uuid'] for node in data['objects']]
+
+        self.assertNotIn(node.uuid, maintained())
+
+        # Cached node sets are invalidated when permissions are assigned and revoked
+        shortcuts.assign_perm('change_node', user, node)
+        try:
+            self.assertIn(node.uuid, maintained())
+        finally:
+            shortcuts.remove_perm('change_node', user, node)
+
+        self.assertNotIn(node.uuid, maintained())
+
+        group = auth_models.Group.objects.create(name='maintainers')
+        try:
+            shortcuts.assign_perm('change_node', group, node)
+            self.assertNotIn(node.uuid, maintained())
+            user.groups.add(group)
+            self.assertIn(node.uuid, maintained())
+            group.user_set.clear()
+            self.assertNotIn(node.uuid, maintained())
+        finally:
+            group.delete()
+
     def test_schema(self):
         with file(os.path.join(apps.get_app_config('frontend_list').path, 'tests', 'schema.json'), 'r') as f:
             schema = json.load(f)
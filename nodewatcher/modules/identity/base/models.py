@@ -41,6 +41,8 @@ class IdentityMechanismConfig(registration.bases.NodeConfigRegistryItem):
     automatically_added = models.BooleanField(default=False, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     last_seen = models.DateTimeField(null=True, blank=True, editable=False)
+    # Mechanism-dependent fingerprint used for fast identity lookups
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
 
     class RegistryMeta:
         form_weight = 7
@@ -61,6 +63,20 @@ class IdentityMechanismConfig(registration.bases.NodeConfigRegistryItem):
 
         raise NotImplementedError
 
+    @classmethod
+    def fingerprint_from_data(cls, data):
+        """
+        This method may be overriden by subclasses. It should return a fingerprint
+        of the mechanism-dependent data, which must be equal to the fingerprint
+        stored with matching identities. Mechanisms without fingerprints return
+        None, in which case identities are matched using `is_match`.
+
+        :param data: Mechanism-dependent data
+        :return: Fingerprint string or None
+        """
+
+        return None
+
     @classmethod
     def from_data(cls, data):
         """
@@ -1,8 +1,13 @@
-from django.db import transaction
+import datetime
+
+from django.db import models as django_models, transaction
 from django.utils import timezone
 
 from . import models
 
+# Minimum interval between updates of an identity's last seen timestamp.
+LAST_SEEN_UPDATE_INTERVAL = datetime.timedelta(minutes=5)
+
 
 @transaction.atomic(savepoint=False)
 def verify_identity(node, mechanism, data):
@@ -31,11 +36,25 @@ def verify_identity(node, mechanism, data):
     # Go through the list of trusted identities and try to match one to the passed data.
     matched_trusted = False
     matched_untrusted = False
-    for identity in node.config.core.identity.mechanisms(onlyclass=mechanism):
+    identities = node.config.core.identity.mechanisms(onlyclass=mechanism)
+    fingerprint = mechanism.fingerprint_from_data(data)
+    if fingerprint is not None:
+        # Only consider identities with a matching fingerprint; identities without a
+        # stored fingerprint are also checked, so their fingerprint gets computed.
+        identities = identities.filter(django_models.Q(fingerprint=fingerprint) | django_models.Q(fingerprint=''))
+
+    now = timezone.now()
+    for identity in identities:
+        missing_fingerprint = not identity.fingerprint
         if identity.is_match(data):
-            # Update last seen timestamp.
-            identity.last_seen = timezone.now()
-            identity.save()
+            # Update last seen timestamp, but do not write it on every verification.
+            updates = {}
+            if identity.last_seen is None or now - identity.last_seen >= LAST_SEEN_UPDATE_INTERVAL:
+                updates['last_seen'] = now
+            if missing_fingerprint and identity.fingerprint:
+                updates['fingerprint'] = identity.fingerprint
+            if updates:
+                models.IdentityMechanismConfig.objects.filter(pk=identity.pk).update(**updates)
 
             if identity.trusted:
                 matched_trusted = True
@@ -1,3 +1,5 @@
+import hashlib
+
 from cryptography import x509
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat import backends
@@ -8,10 +10,14 @@ from django.utils.translation import ugettext_lazy as _
 
 from nodewatcher.core.registry import registration
 from nodewatcher.modules.identity.base import models as base_models
+from nodewatcher.utils import datastructures
 
 # Ensure default cryptography backend is loaded.
 backends.default_backend()
 
+# Cache of fingerprints for recently seen certificates and public keys.
+fingerprint_cache = datastructures.LRUCache(1024)
+
 
 class PublicKeyIdentityConfig(base_models.IdentityMechanismConfig):
     """
@@ -51,24 +57,61 @@ class PublicKeyIdentityConfig(base_models.IdentityMechanismConfig):
             certificate = x509.load_pem_x509_certificate(data, backend)
             return certificate.public_key()
 
-    def is_match(self, data):
+    @classmethod
+    def _get_fingerprint(cls, key):
         """
-        Returns true if the passed in public key matches this identity.
+        Returns the SHA256 fingerprint of a public key.
         """
 
-        # Extract public key from source data.
+        return hashlib.sha256(key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)).hexdigest()
+
+    @classmethod
+    def fingerprint_from_data(cls, data):
+        """
+        Returns the fingerprint of the public key contained in the passed data. As
+        parsing is expensive, fingerprints of recently seen data are cached.
+        """
+
+        if data is None:
+            return None
+
+        if data in fingerprint_cache:
+            return fingerprint_cache.get(data)
+
         try:
-            key = self._extract_public_key(data)
+            fingerprint = cls._get_fingerprint(cls._extract_public_key(data))
         except ValueError:
-            return False
+            fingerprint = None
 
-        # Extract stored public key and compare.
-        stored_key = self._extract_public_key(self.public_key.encode('ascii'))
+        fingerprint_cache.set(data, fingerprint)
+        return fingerprint
+
+    def save(self, *args, **kwargs):
+        """
+        Stores the fingerprint of the public key together with the identity.
+        """
+
+        try:
+            self.fingerprint = self._get_fingerprint(self._extract_public_key(self.public_key.encode('ascii')))
+        except ValueError:
+            self.fingerprint = ''
+
+        super(PublicKeyIdentityConfig, self).save(*args, **kwargs)
+
+    def is_match(self, data):
+        """
+        Returns true if the passed in public key matches this identity.
+        """
+
+        fingerprint = self.fingerprint_from_data(data)
+        if fingerprint is None:
+            return False
 
-        encoded_a = key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
-        encoded_b = stored_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.PKCS1)
+        if not self.fingerprint:
+            # Fingerprint has not yet been computed for this identity.
+            self.fingerprint = self._get_fingerprint(self._extract_public_key(self.public_key.encode('ascii')))
 
-        return encoded_a == encoded_b
+        return fingerprint == self.fingerprint
 
     @classmethod
     def from_data(cls, data):
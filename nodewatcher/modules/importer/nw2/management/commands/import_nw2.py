@@ -1,16 +1,16 @@
 # coding: utf-8
 import datetime
-import json
+import ijson
+import os
 import pytz
+from optparse import make_option
 
 from django.apps import apps
 from django.core.management import base
 from django.contrib.auth import models as auth_models
 from django.db import transaction
 
-from guardian import shortcuts
-
-from nodewatcher.core import models as core_models
+from nodewatcher.core import models as core_models, provisioning
 from nodewatcher.core.allocation.ip import models as pool_models
 from nodewatcher.core.generator.cgm import models as cgm_models, devices as cgm_devices
 from nodewatcher.core.monitor import models as monitor_models
@@ -200,6 +200,21 @@ NODE_NOTES_METADATA = {
 class Command(base.BaseCommand):
     help = "Imports legacy nodewatcher v2 data."
     requires_model_validation = True
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--chunk-size',
+            dest='chunk_size',
+            default=provisioning.CHUNK_SIZE,
+            type=int,
+            help='Number of nodes imported in a single transaction',
+        ),
+        make_option(
+            '--checkpoint',
+            dest='checkpoint',
+            default=None,
+            help='File used to record import progress; an interrupted import is resumed from it',
+        ),
+    )
 
     def handle(self, *args, **options):
         if len(args) != 1:
@@ -212,12 +227,23 @@ class Command(base.BaseCommand):
 
         input_filename = args[0]
         try:
-            input_file = open(input_filename, 'r')
+            self.input_file = open(input_filename, 'r')
         except IOError:
             raise base.CommandError("Unable to open file '%s'!" % input_filename)
 
+        self.checkpoint_filename = options['checkpoint']
+        start = self.read_checkpoint()
+        if start:
+            self.stdout.write('Resuming import after node %d...\n' % start)
+
+        # Objects other than nodes are few, so they are kept in memory. Their import is
+        # idempotent, so existing objects are reused when resuming an import.
         self.stdout.write('Loading export file \'%s\'...\n' % input_filename)
-        data = json.load(input_file)
+        data = {
+            'users': dict(self.iter_section('users')),
+            'pools': dict(self.iter_section('pools')),
+            'projects': dict(self.iter_section('projects')),
+        }
 
         with transaction.atomic():
             self.import_users(data)
@@ -225,10 +251,58 @@ class Command(base.BaseCommand):
             self.import_projects(data)
             self.import_vpn_servers(data)
             self.import_dns_servers(data)
-            self.import_nodes(data)
+
+        self.import_nodes(data, options['chunk_size'], start)
 
         self.stdout.write('Import completed.\n')
 
+    def iter_section(self, section):
+        """
+        Streams (key, value) pairs of a top-level section of the export file, so that
+        the whole export never needs to be loaded into memory.
+
+        :param section: Section name
+        """
+
+        self.input_file.seek(0)
+        key = None
+        builder = None
+        inside = False
+        for prefix, event, value in ijson.parse(self.input_file):
+            if prefix == section:
+                if event == 'start_map':
+                    inside = True
+                elif event == 'map_key':
+                    if builder is not None:
+                        yield key, builder.value
+                    key = value
+                    builder = ijson.ObjectBuilder()
+                elif event == 'end_map':
+                    if builder is not None:
+                        yield key, builder.value
+                    return
+            elif inside and builder is not None:
+                builder.event(event, value)
+
+    def read_checkpoint(self):
+        if not self.checkpoint_filename:
+            return 0
+
+        try:
+            with open(self.checkpoint_filename, 'r') as checkpoint_file:
+                return int(checkpoint_file.read().strip() or 0)
+        except IOError:
+            return 0
+
+    def write_checkpoint(self, processed):
+        if not self.checkpoint_filename:
+            return
+
+        temporary = '%s.tmp' % self.checkpoint_filename
+        with open(temporary, 'w') as checkpoint_file:
+            checkpoint_file.write('%d\n' % processed)
+        os.rename(temporary, self.checkpoint_filename)
+
     def get_date(self, date):
         if date is None:
             return None
@@ -247,6 +321,12 @@ class Command(base.BaseCommand):
         self.stdout.write('Importing %d users...\n' % len(data['users']))
 
         for user in data['users'].values():
+            try:
+                user['_model'] = auth_models.User.objects.get(username=user['username'])
+                continue
+            except auth_models.User.DoesNotExist:
+                pass
+
             # Create user object
             user_mdl = auth_models.User(
                 username=user['username'],
@@ -274,22 +354,29 @@ class Command(base.BaseCommand):
         self.stdout.write('Importing %d top-level pools...\n' % len(data['pools']))
 
         for pool in data['pools'].values():
-            pool_mdl = pool_models.IpPool(
+            pool['_model'], created = pool_models.IpPool.objects.get_or_create(
                 family='ipv4',
                 network=pool['network'],
                 prefix_length=pool['cidr'],
-                description=pool['description'],
-                prefix_length_default=pool['default_prefix_len'],
-                prefix_length_minimum=pool['min_prefix_len'],
-                prefix_length_maximum=pool['max_prefix_len'],
+                parent=None,
+                defaults={
+                    'description': pool['description'],
+                    'prefix_length_default': pool['default_prefix_len'],
+                    'prefix_length_minimum': pool['min_prefix_len'],
+                    'prefix_length_maximum': pool['max_prefix_len'],
+                }
             )
-            pool_mdl.save()
-            pool['_model'] = pool_mdl
 
     def import_projects(self, data):
         self.stdout.write('Importing %d projects...\n' % len(data['projects']))
 
         for project in data['projects'].values():
+            try:
+                project['_model'] = project_models.Project.objects.get(name=project['name'])
+                continue
+            except project_models.Project.DoesNotExist:
+                pass
+
             project_mdl = project_models.Project(
                 name=project['name'],
                 description=project['description'],
@@ -326,12 +413,13 @@ class Command(base.BaseCommand):
 
         data['vpn_servers'] = []
         for address, server in VPN_SERVERS.items():
-            server = tunneldigger_models.TunneldiggerServer(
+            server, created = tunneldigger_models.TunneldiggerServer.objects.get_or_create(
                 name=server['name'],
-                address=address,
-                ports=server['ports'],
+                defaults={
+                    'address': address,
+                    'ports': server['ports'],
+                }
             )
-            server.save()
 
             data['vpn_servers'].append(server)
 
@@ -340,413 +428,453 @@ class Command(base.BaseCommand):
 
         data['dns_servers'] = []
         for address, server in DNS_SERVERS.items():
-            server = dns_models.DnsServer(
+            server, created = dns_models.DnsServer.objects.get_or_create(
                 name=server['name'],
-                address=address,
+                defaults={
+                    'address': address,
+                }
             )
-            server.save()
 
             data['dns_servers'].append(server)
 
-    def import_nodes(self, data):
-        self.stdout.write('Importing %d nodes...\n' % len(data['nodes']))
+    def get_pool(self, data, subnet):
+        try:
+            return [x['_model'] for x in data['pools'].values() if subnet in x['_model']][0]
+        except IndexError:
+            raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet)
 
-        # Preprocess nodes and create instances.
-        name_model_map = {}
-        for node in data['nodes'].values():
-            node_mdl = core_models.Node(uuid=node['uuid'])
-            node_mdl.save()
-            node['_model'] = node_mdl
+    def get_mesh_subnet(self, node):
+        """
+        Returns the subnet from which the router ID of a node is allocated or None
+        if the node has no such subnet.
+        """
 
-            name_model_map[node['name']] = node_mdl
+        try:
+            subnet_mesh = [x for x in node['subnets'] if x['gen_iface_type'] == 2][0]
+        except IndexError:
+            return None
 
-        for node in data['nodes'].values():
-            # Dead node flag, so we don't allocate any resources for it
-            dead_node = node['node_type'] == 6
+        try:
+            translated_subnets = SUBNET_SIZE_TRANSLATION[subnet_mesh['cidr']]
+        except KeyError:
+            raise base.CommandError('Unable to translate subnet for node %s.' % node['uuid'])
 
-            # Determine router ID
-            try:
-                subnet_mesh = [x for x in node['subnets'] if x['gen_iface_type'] == 2][0]
-            except IndexError:
-                self.stdout.write('  o Skipping node %s (unable to determine router ID).\n' % node['uuid'])
+        # Allocate Router-ID based on subnet translation
+        return ipaddr.IPNetwork('%s/%s' % (subnet_mesh['subnet'], translated_subnets['rid'])), translated_subnets
+
+    def iter_nodes(self, report=True):
+        """
+        Streams nodes that can be imported.
+
+        :param report: Should skipped nodes be reported
+        """
 
-                node['_model'].delete()
-                node['_model'] = None
+        for key, node in self.iter_section('nodes'):
+            if self.get_mesh_subnet(node) is None:
+                if report:
+                    self.stdout.write('  o Skipping node %s (unable to determine router ID).\n' % node['uuid'])
                 continue
 
-            try:
-                translated_subnets = SUBNET_SIZE_TRANSLATION[subnet_mesh['cidr']]
-            except KeyError:
-                raise base.CommandError('Unable to translate subnet for node %s.' % node['uuid'])
+            yield node
+
+    def prepare_nodes(self, data, provisioner):
+        """
+        Creates instances of all nodes that can be imported before any of them is
+        provisioned, as nodes may reference each other.
+
+        :return: A list of UUIDs of nodes that will be imported
+        """
+
+        data['node_names'] = {}
+        uuids = []
+        for node in self.iter_nodes():
+            data['node_names'][node['name']] = node['uuid']
+            uuids.append(node['uuid'])
+
+        with transaction.atomic():
+            provisioner.ensure_nodes(uuids)
+
+        return uuids
+
+    def import_nodes(self, data, chunk_size, start):
+        def progress(processed):
+            self.write_checkpoint(processed)
+            self.stdout.write('  o Imported %d nodes.\n' % processed)
+
+        provisioner = provisioning.Provisioner(chunk_size, progress=progress)
+        uuids = self.prepare_nodes(data, provisioner)
+        self.stdout.write('Importing %d nodes...\n' % len(uuids))
+
+        data['ssids'] = {}
+        data['antennas'] = {}
+        provisioner.provision((self.get_node_spec(data, node) for node in self.iter_nodes(report=False)), start=start)
+
+    def get_project_ssid(self, data, project, purpose):
+        key = (project.pk, purpose)
+        if key not in data['ssids']:
+            data['ssids'][key] = project.ssids.get(purpose=purpose)
 
-            # Allocate Router-ID based on subnet translation
-            subnet_mesh['cidr'] = translated_subnets['rid']
-            subnet_mesh = ipaddr.IPNetwork('%(subnet)s/%(cidr)s' % subnet_mesh)
+        return data['ssids'][key]
+
+    def get_internal_antenna(self, data, router):
+        if router not in data['antennas']:
             try:
-                pool_mesh = [x['_model'] for x in data['pools'].values() if subnet_mesh in x['_model']][0]
-            except IndexError:
-                raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet_mesh)
-
-            if not dead_node:
-                allocation = pool_mesh.reserve_subnet(str(subnet_mesh.ip), subnet_mesh.prefixlen)
-                if allocation is None:
-                    raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet_mesh)
-
-            node_mdl = node['_model']
-
-            # Router ID
-            if not dead_node:
-                node_mdl.config.core.routerid(
-                    create=pool_models.AllocatedIpRouterIdConfig,
-                    family='ipv4',
-                    pool=pool_mesh,
-                    prefix_length=subnet_mesh.prefixlen,
-                    allocation=allocation,
-                ).save()
-
-            # Assign default permissions
-            maintainer = data['users'][str(node['owner_id'])]['_model']
-            shortcuts.assign_perm('change_node', maintainer, node_mdl)
-            shortcuts.assign_perm('delete_node', maintainer, node_mdl)
-            shortcuts.assign_perm('reset_node', maintainer, node_mdl)
-            shortcuts.assign_perm('generate_firmware', maintainer, node_mdl)
-
-            # Last seen / first seen
-            node_mdl.monitoring.core.general(
-                create=monitor_models.GeneralMonitor,
-                first_seen=self.get_date(node['first_seen']),
-                last_seen=self.get_date(node['last_seen']),
-            )
+                data['antennas'][router] = antenna_models.Antenna.objects.get(
+                    internal_for=router,
+                    internal_id='a1'
+                )
+            except antenna_models.Antenna.DoesNotExist:
+                data['antennas'][router] = None
 
-            # Type config
-            node_mdl.config.core.type(
-                create=type_models.TypeConfig,
-                type=TYPE_MAP[node['node_type']],
-            )
+        return data['antennas'][router]
+
+    def get_node_spec(self, data, node):
+        """
+        Converts a nodewatcher v2 node into a node provisioning specification.
+        """
+
+        spec = provisioning.NodeSpec(node['uuid'])
 
-            # Project config
-            node_mdl.config.core.project(
-                create=project_models.ProjectConfig,
-                project=data['projects'][str(node['project_id'])]['_model'],
+        # Dead node flag, so we don't allocate any resources for it
+        dead_node = node['node_type'] == 6
+
+        # Determine router ID
+        subnet_mesh, translated_subnets = self.get_mesh_subnet(node)
+        pool_mesh = self.get_pool(data, subnet_mesh)
+
+        # Router ID
+        if not dead_node:
+            spec.add_item(
+                pool_models.AllocatedIpRouterIdConfig,
+                family='ipv4',
+                pool=pool_mesh,
+                prefix_length=subnet_mesh.prefixlen,
+                allocation=spec.reserve_subnet('routerid', pool_mesh, subnet_mesh.ip, subnet_mesh.prefixlen),
             )
 
-            # Location config
-            project = node_mdl.config.core.project().project
-            if project.name in [u'Števerjan']:
-                city = u'Števerjan'
-                country = 'IT'
-            elif project.name in [u'Maribor', u'Murska Sobota', u'Kranj', u'Sežana', u'Slovenska Bistrica', u'Haloze', u'Vipava']:
-                city = project.name
-                country = 'SI'
-            elif project.name in [u'London']:
-                city = project.name
-                country = 'GB'
-            elif project.name in [u'Croatia']:
-                city = ''
-                country = 'HR'
-            elif project.name in [u'Dolenjska']:
-                city = ''
-                country = 'SI'
-            else:
-                city = 'Ljubljana'
-                country = 'SI'
-
-            node_mdl.config.core.location(
-                create=location_models.LocationConfig,
-                address=node['location'] or '',
-                city=city,
-                country=country,
-                timezone='Europe/Ljubljana',
-                altitude=0,
-                geolocation='POINT(%f %f)' % (node['geo_long'], node['geo_lat']) if node['geo_lat'] else None,
+        # Assign default permissions
+        maintainer = data['users'][str(node['owner_id'])]['_model']
+        spec.add_permissions(maintainer, 'change_node', 'delete_node', 'reset_node', 'generate_firmware')
+
+        # Last seen / first seen
+        spec.add_item(
+            monitor_models.GeneralMonitor,
+            first_seen=self.get_date(node['first_seen']),
+            last_seen=self.get_date(node['last_seen']),
+        )
+
+        # Type config
+        spec.add_item(
+            type_models.TypeConfig,
+            type=TYPE_MAP[node['node_type']],
+        )
+
+        # Project config
+        project = data['projects'][str(node['project_id'])]['_model']
+        spec.add_item(
+            project_models.ProjectConfig,
+            project=project,
+        )
+
+        # Location config
+        if project.name in [u'Števerjan']:
+            city = u'Števerjan'
+            country = 'IT'
+        elif project.name in [u'Maribor', u'Murska Sobota', u'Kranj', u'Sežana', u'Slovenska Bistrica', u'Haloze', u'Vipava']:
+            city = project.name
+            country = 'SI'
+        elif project.name in [u'London']:
+            city = project.name
+            country = 'GB'
+        elif project.name in [u'Croatia']:
+            city = ''
+            country = 'HR'
+        elif project.name in [u'Dolenjska']:
+            city = ''
+            country = 'SI'
+        else:
+            city = 'Ljubljana'
+            country = 'SI'
+
+        spec.add_item(
+            location_models.LocationConfig,
+            address=node['location'] or '',
+            city=city,
+            country=country,
+            timezone='Europe/Ljubljana',
+            altitude=0,
+            geolocation='POINT(%f %f)' % (node['geo_long'], node['geo_lat']) if node['geo_lat'] else None,
+        )
+
+        # Description config
+        spec.add_item(
+            dsc_models.DescriptionConfig,
+            notes=node['notes'] or '',
+            url=node['url'] or ''
+        )
+
+        # Role config
+        spec.add_item(role_models.SystemRoleConfig, system=node['system_node'])
+        spec.add_item(role_models.BorderRouterRoleConfig, border_router=node['border_router'])
+        spec.add_item(role_models.VpnServerRoleConfig, vpn_server=node['vpn_server'])
+        spec.add_item(role_models.RedundantNodeRoleConfig, redundancy_required=node['redundancy_req'])
+
+        # HTTP telemetry source config.
+        spec.add_item(
+            telemetry_http_models.HttpTelemetrySourceConfig,
+            source='poll',
+        )
+
+        # Node identity config.
+        spec.add_item(
+            identity_base_models.IdentityConfig,
+            trust_policy='first',
+            store_unknown=True,
+        )
+
+        if node['profile'] and not dead_node:
+            general = cgm_models.CgmGeneralConfig(
+                name=node['name'],
+                platform='openwrt',
+                router=ROUTER_MAP[node['profile']['template']],
+            )
+            spec.add_item(
+                cgm_models.CgmGeneralConfig,
+                name=general.name,
+                platform=general.platform,
+                router=general.router,
             )
+            device = general.get_device()
 
-            # Description config
-            node_mdl.config.core.description(
-                create=dsc_models.DescriptionConfig,
-                notes=node['notes'] or '',
-                url=node['url'] or ''
+            # Password authentication config
+            spec.add_item(
+                cgm_models.PasswordAuthenticationConfig,
+                password=node['profile']['root_pass'],
             )
 
-            # Role config
-            node_mdl.config.core.roles(create=role_models.SystemRoleConfig, system=node['system_node']).save()
-            node_mdl.config.core.roles(create=role_models.BorderRouterRoleConfig, border_router=node['border_router']).save()
-            node_mdl.config.core.roles(create=role_models.VpnServerRoleConfig, vpn_server=node['vpn_server']).save()
-            node_mdl.config.core.roles(create=role_models.RedundantNodeRoleConfig, redundancy_required=node['redundancy_req']).save()
-
-            # HTTP telemetry source config.
-            node_mdl.config.core.telemetry.http(
-                create=telemetry_http_models.HttpTelemetrySourceConfig,
-                source='poll',
-            ).save()
-
-            # Node identity config.
-            node_mdl.config.core.identity(
-                create=identity_base_models.IdentityConfig,
-                trust_policy='first',
-                store_unknown=True,
-            ).save()
-
-            if node['profile'] and not dead_node:
-                general = node_mdl.config.core.general(
-                    create=cgm_models.CgmGeneralConfig,
-                    name=node['name'],
-                    platform='openwrt',
-                    router=ROUTER_MAP[node['profile']['template']],
+            # Bridge for clients.
+            iface_clients_bridge = None
+
+            # Parse any metadata contained in notes.
+            metadata = {}
+            for notes_line in node['notes'].split('\n'):
+                for key, meta_key in NODE_NOTES_METADATA.items():
+                    if notes_line.startswith('%s:' % key):
+                        metadata[meta_key] = notes_line.split(':')[1].strip()
+
+            # Determine whether the imported node should be configured as AP/STA.
+            if 'ap_ssid' in metadata or 'sta_ssid' in metadata:
+                # Backbone node.
+                radio_wifi = spec.add_item(
+                    cgm_models.WifiRadioDeviceConfig,
+                    ref='radio_wifi',
+                    wifi_radio='wifi0',
+                    protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
+                    channel_width='ht20',
+                    channel=('ch%d' % int(metadata['channel'])) if metadata['channel'] != 'auto' else None,
+                    antenna_connector=None,
+                    ack_distance=int(metadata['distance']) if 'distance' in metadata else None,
+                    tx_power=int(metadata['tx_power']) if 'tx_power' in metadata else None,
                 )
-                device = general.get_device()
-
-                # Password authentication config
-                node_mdl.config.core.authentication(
-                    create=cgm_models.PasswordAuthenticationConfig,
-                    password=node['profile']['root_pass'],
-                ).save()
-
-                # Bridge for clients.
-                iface_clients_bridge = None
-
-                # Parse any metadata contained in notes.
-                metadata = {}
-                for notes_line in node['notes'].split('\n'):
-                    for key, meta_key in NODE_NOTES_METADATA.items():
-                        if notes_line.startswith('%s:' % key):
-                            metadata[meta_key] = notes_line.split(':')[1].strip()
-
-                # Determine whether the imported node should be configured as AP/STA.
-                if 'ap_ssid' in metadata or 'sta_ssid' in metadata:
-                    # Backbone node.
-                    radio_wifi = node_mdl.config.core.interfaces(
-                        create=cgm_models.WifiRadioDeviceConfig,
-                        wifi_radio='wifi0',
-                        protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
-                        channel_width='ht20',
-                        channel=('ch%d' % int(metadata['channel'])) if metadata['channel'] != 'auto' else None,
-                        antenna_connector=None,
-                        ack_distance=int(metadata['distance']) if 'distance' in metadata else None,
-                        tx_power=int(metadata['tx_power']) if 'tx_power' in metadata else None,
+
+                if 'ap_ssid' in metadata:
+                    # AP interface.
+                    spec.add_item(
+                        cgm_models.WifiInterfaceConfig,
+                        device=radio_wifi,
+                        mode='ap',
+                        essid=metadata['ap_ssid'],
+                        routing_protocols=['olsr', 'babel'],
+                    )
+                elif 'sta_ssid' in metadata:
+                    # STA interface.
+                    spec.add_item(
+                        cgm_models.WifiInterfaceConfig,
+                        device=radio_wifi,
+                        mode='sta',
+                        essid=metadata['sta_ssid'],
+                        connect_to_id=data['node_names'].get(metadata['sta_link'], None),
+                        routing_protocols=['olsr', 'babel'],
                     )
-                    radio_wifi.save()
-
-                    if 'ap_ssid' in metadata:
-                        # AP interface.
-                        iface_ap = node_mdl.config.core.interfaces(
-                            create=cgm_models.WifiInterfaceConfig,
-                            device=radio_wifi,
-                            mode='ap',
-                            essid=metadata['ap_ssid'],
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_ap.save()
-                    elif 'sta_ssid' in metadata:
-                        # STA interface.
-                        iface_sta = node_mdl.config.core.interfaces(
-                            create=cgm_models.WifiInterfaceConfig,
-                            device=radio_wifi,
-                            mode='sta',
-                            essid=metadata['sta_ssid'],
-                            connect_to=name_model_map[metadata['sta_link']],
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_sta.save()
-                    else:
-                        assert False
                 else:
-                    # Wireless interface config
-                    radio_wifi = node_mdl.config.core.interfaces(
-                        create=cgm_models.WifiRadioDeviceConfig,
-                        wifi_radio='wifi0',
-                        protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
-                        channel_width='ht20',
-                        channel='ch%d' % node['profile']['channel'],
-                        antenna_connector=None,
+                    assert False
+            else:
+                # Wireless interface config
+                radio_wifi = spec.add_item(
+                    cgm_models.WifiRadioDeviceConfig,
+                    ref='radio_wifi',
+                    wifi_radio='wifi0',
+                    protocol=WIFI_PROTOCOL_MAP[node['profile']['template']],
+                    channel_width='ht20',
+                    channel='ch%d' % node['profile']['channel'],
+                    antenna_connector=None,
+                )
+
+                # Mesh interface
+                ssid = self.get_project_ssid(data, project, 'mesh')
+                spec.add_item(
+                    cgm_models.WifiInterfaceConfig,
+                    device=radio_wifi,
+                    mode='mesh',
+                    essid=ssid.essid,
+                    bssid=ssid.bssid,
+                    routing_protocols=['olsr', 'babel'],
+                )
+
+                # Client AP interface
+                dsc_radio = device.get_radio('wifi0')
+                if translated_subnets['clients'] is not None and dsc_radio.has_feature(cgm_devices.DeviceRadio.MultipleSSID):
+                    # In version 2 AP and LAN were bridged, so we also create a bridge on import.
+                    iface_clients_bridge = spec.add_item(
+                        cgm_models.BridgeInterfaceConfig,
+                        ref='iface_clients_bridge',
+                        name='clients0',
+                        routing_protocols=['olsr', 'babel'],
                     )
-                    radio_wifi.save()
 
-                    # Mesh interface
-                    ssid = project.ssids.get(purpose='mesh')
-                    iface_mesh = node_mdl.config.core.interfaces(
-                        create=cgm_models.WifiInterfaceConfig,
+                    subnet_ap = ipaddr.IPNetwork('%s/%s' % (subnet_mesh.ip, translated_subnets['clients'] - 1))
+                    subnet_ap = list(subnet_ap.iter_subnets())[1]
+                    pool_ap = self.get_pool(data, subnet_ap)
+
+                    spec.add_item(
+                        cgm_models.AllocatedNetworkConfig,
+                        interface=iface_clients_bridge,
+                        description='AP-LAN Client Access',
+                        routing_announces=['olsr', 'babel'],
+                        family='ipv4',
+                        pool=pool_ap,
+                        prefix_length=subnet_ap.prefixlen,
+                        allocation=spec.reserve_subnet('subnet_ap', pool_ap, subnet_ap.ip, subnet_ap.prefixlen),
+                        lease_type='dhcp',
+                        lease_duration='1h',
+                    )
+
+                    # Create the AP VIF and put it into the bridge.
+                    ssid = self.get_project_ssid(data, project, 'ap')
+                    iface_ap = spec.add_item(
+                        cgm_models.WifiInterfaceConfig,
+                        ref='iface_ap',
                         device=radio_wifi,
-                        mode='mesh',
+                        mode='ap',
                         essid=ssid.essid,
-                        bssid=ssid.bssid,
-                        routing_protocols=['olsr', 'babel'],
                     )
-                    iface_mesh.save()
-
-                    # Client AP interface
-                    dsc_radio = device.get_radio('wifi0')
-                    if translated_subnets['clients'] is not None and dsc_radio.has_feature(cgm_devices.DeviceRadio.MultipleSSID):
-                        # In version 2 AP and LAN were bridged, so we also create a bridge on import.
-                        iface_clients_bridge = node_mdl.config.core.interfaces(
-                            create=cgm_models.BridgeInterfaceConfig,
-                            name='clients0',
-                            routing_protocols=['olsr', 'babel'],
-                        )
-                        iface_clients_bridge.save()
-
-                        subnet_ap = ipaddr.IPNetwork('%s/%s' % (subnet_mesh.ip, translated_subnets['clients'] - 1))
-                        subnet_ap = list(subnet_ap.iter_subnets())[1]
-                        try:
-                            pool_ap = [x['_model'] for x in data['pools'].values() if subnet_ap in x['_model']][0]
-                        except IndexError:
-                            raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet_ap)
-
-                        allocation = pool_ap.reserve_subnet(str(subnet_ap.ip), subnet_ap.prefixlen)
-                        if allocation is None:
-                            raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet_ap)
-
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.AllocatedNetworkConfig,
-                            interface=iface_clients_bridge,
-                            description='AP-LAN Client Access',
-                            routing_announces=['olsr', 'babel'],
-                            family='ipv4',
-                            pool=pool_ap,
-                            prefix_length=subnet_ap.prefixlen,
-                            allocation=allocation,
-                            lease_type='dhcp',
-                            lease_duration='1h',
-                        ).save()
-
-                        # Create the AP VIF and put it into the bridge.
-                        ssid = project.ssids.get(purpose='ap')
-                        iface_ap = node_mdl.config.core.interfaces(
-                            create=cgm_models.WifiInterfaceConfig,
-                            device=radio_wifi,
-                            mode='ap',
-                            essid=ssid.essid,
-                        )
-                        iface_ap.save()
-
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.BridgedNetworkConfig,
-                            interface=iface_ap,
-                            description='',
-                            bridge=iface_clients_bridge,
-                        ).save()
-
-                # Antenna
-                try:
-                    node_mdl.config.core.equipment.antenna(
-                        create=antenna_models.AntennaEquipmentConfig,
-                        device=radio_wifi,
-                        antenna=antenna_models.Antenna.objects.get(
-                            internal_for=ROUTER_MAP[node['profile']['template']],
-                            internal_id='a1'
-                        ),
-                    ).save()
-                except antenna_models.Antenna.DoesNotExist:
-                    pass
-
-                # WAN uplink
-                uplink_configured = False
-                if device.get_port('wan0'):
-                    iface_wan = node_mdl.config.core.interfaces(
-                        create=cgm_models.EthernetInterfaceConfig,
-                        eth_port='wan0',
-                        uplink=True,
+
+                    spec.add_item(
+                        cgm_models.BridgedNetworkConfig,
+                        interface=iface_ap,
+                        description='',
+                        bridge=iface_clients_bridge,
                     )
-                    iface_wan.save()
-                    uplink_configured = True
-
-                    if node['profile']['wan_dhcp']:
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.DHCPNetworkConfig,
-                            interface=iface_wan,
-                            description='WAN',
-                        ).save()
-                    else:
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.StaticNetworkConfig,
-                            interface=iface_wan,
-                            description='WAN',
-                            family='ipv4',
-                            address='%(wan_ip)s/%(wan_cidr)s' % node['profile'],
-                            gateway=node['profile']['wan_gw']
-                        ).save()
-
-                # LAN subnets
-                if device.get_port('lan0'):
-                    iface_lan = node_mdl.config.core.interfaces(
-                        create=cgm_models.EthernetInterfaceConfig,
-                        eth_port='lan0',
+
+            # Antenna
+            antenna = self.get_internal_antenna(data, ROUTER_MAP[node['profile']['template']])
+            if antenna is not None:
+                spec.add_item(
+                    antenna_models.AntennaEquipmentConfig,
+                    device=radio_wifi,
+                    antenna=antenna,
+                )
+
+            # WAN uplink
+            uplink_configured = False
+            if device.get_port('wan0'):
+                iface_wan = spec.add_item(
+                    cgm_models.EthernetInterfaceConfig,
+                    ref='iface_wan',
+                    eth_port='wan0',
+                    uplink=True,
+                )
+                uplink_configured = True
+
+                if node['profile']['wan_dhcp']:
+                    spec.add_item(
+                        cgm_models.DHCPNetworkConfig,
+                        interface=iface_wan,
+                        description='WAN',
+                    )
+                else:
+                    spec.add_item(
+                        cgm_models.StaticNetworkConfig,
+                        interface=iface_wan,
+                        description='WAN',
+                        family='ipv4',
+                        address='%(wan_ip)s/%(wan_cidr)s' % node['profile'],
+                        gateway=node['profile']['wan_gw']
                     )
-                    iface_lan.save()
 
-                    if iface_clients_bridge is not None:
-                        # LAN interface should be a part of the clients bridge.
-                        node_mdl.config.core.interfaces.network(
-                            create=cgm_models.BridgedNetworkConfig,
+            # LAN subnets
+            if device.get_port('lan0'):
+                lan_subnets = []
+                if iface_clients_bridge is None:
+                    for subnet in node['subnets']:
+                        if subnet['gen_iface_type'] != 0:
+                            continue
+
+                        subnet_lan = ipaddr.IPNetwork('%(subnet)s/%(cidr)s' % subnet)
+                        lan_subnets.append((subnet_lan, self.get_pool(data, subnet_lan)))
+
+                # If no subnets are configured, designate the interface for routing
+                iface_lan = spec.add_item(
+                    cgm_models.EthernetInterfaceConfig,
+                    ref='iface_lan',
+                    eth_port='lan0',
+                    routing_protocols=['olsr', 'babel'] if iface_clients_bridge is None and not lan_subnets else [],
+                )
+
+                if iface_clients_bridge is not None:
+                    # LAN interface should be a part of the clients bridge.
+                    spec.add_item(
+                        cgm_models.BridgedNetworkConfig,
+                        interface=iface_lan,
+                        description='',
+                        bridge=iface_clients_bridge,
+                    )
+                else:
+                    for index, (subnet_lan, pool_lan) in enumerate(lan_subnets):
+                        spec.add_item(
+                            cgm_models.AllocatedNetworkConfig,
                             interface=iface_lan,
-                            description='',
-                            bridge=iface_clients_bridge,
-                        ).save()
-                    else:
-                        have_subnets = False
-                        for subnet in node['subnets']:
-                            if subnet['gen_iface_type'] != 0:
-                                continue
-
-                            subnet_lan = ipaddr.IPNetwork('%(subnet)s/%(cidr)s' % subnet)
-                            try:
-                                pool_lan = [x['_model'] for x in data['pools'].values() if subnet_lan in x['_model']][0]
-                            except IndexError:
-                                raise base.CommandError('Failed to find pool instance for subnet \'%s\'!' % subnet_lan)
-
-                            allocation = pool_lan.reserve_subnet(str(subnet_lan.ip), subnet_lan.prefixlen)
-                            if allocation is None:
-                                raise base.CommandError('Failed to allocate subnet \'%s\'!' % subnet_lan)
-
-                            subnet_lan = node_mdl.config.core.interfaces.network(
-                                create=cgm_models.AllocatedNetworkConfig,
-                                interface=iface_lan,
-                                description='LAN',
-                                family='ipv4',
-                                pool=pool_lan,
-                                prefix_length=subnet_lan.prefixlen,
-                                allocation=allocation,
-                            )
-                            subnet_lan.save()
-                            have_subnets = True
-
-                        if not have_subnets:
-                            # If no subnets are configured, designate the interface for routing
-                            iface_lan.routing_protocols = ['olsr', 'babel']
-                            iface_lan.save()
-
-                # VPN (only configure when an uplink exists)
-                if node['profile']['use_vpn'] and uplink_configured:
-                    for server in data['vpn_servers']:
-                        iface_vpn = node_mdl.config.core.interfaces(
-                            create=tunneldigger_models.TunneldiggerInterfaceConfig,
-                            server=server,
-                            routing_protocols=['olsr', 'babel'],
+                            description='LAN',
+                            family='ipv4',
+                            pool=pool_lan,
+                            prefix_length=subnet_lan.prefixlen,
+                            allocation=spec.reserve_subnet('subnet_lan_%d' % index, pool_lan, subnet_lan.ip, subnet_lan.prefixlen),
                         )
-                        iface_vpn.save()
-
-                        # Throughput limits
-                        if node['profile']['vpn_egress_limit'] or node['profile']['vpn_ingress_limit']:
-                            node_mdl.config.core.interfaces.limits(
-                                create=cgm_models.ThroughputInterfaceLimitConfig,
-                                interface=iface_vpn,
-                                limit_in=str(node['profile']['vpn_ingress_limit'] or ''),
-                                limit_out=str(node['profile']['vpn_egress_limit'] or ''),
-                            ).save()
-
-                # DNS servers.
-                for server in data['dns_servers']:
-                    node_mdl.config.core.servers.dns(
-                        create=dns_models.DnsServerConfig,
+
+            # VPN (only configure when an uplink exists)
+            if node['profile']['use_vpn'] and uplink_configured:
+                for index, server in enumerate(data['vpn_servers']):
+                    iface_vpn = spec.add_item(
+                        tunneldigger_models.TunneldiggerInterfaceConfig,
+                        ref='iface_vpn_%d' % index,
                         server=server,
-                    ).save()
+                        routing_protocols=['olsr', 'babel'],
+                    )
 
-                # Optional packages
-                if node['profile']['packages']:
-                    # TODO: Implement configuration for packages that were available in v2
-                    pass
-            else:
-                node_mdl.config.core.general(
-                    create=core_models.GeneralConfig,
-                    name=node['name'],
+                    # Throughput limits
+                    if node['profile']['vpn_egress_limit'] or node['profile']['vpn_ingress_limit']:
+                        spec.add_item(
+                            cgm_models.ThroughputInterfaceLimitConfig,
+                            interface=iface_vpn,
+                            limit_in=str(node['profile']['vpn_ingress_limit'] or ''),
+                            limit_out=str(node['profile']['vpn_egress_limit'] or ''),
+                        )
+
+            # DNS servers.
+            for server in data['dns_servers']:
+                spec.add_item(
+                    dns_models.DnsServerConfig,
+                    server=server,
                 )
+
+            # Optional packages
+            if node['profile']['packages']:
+                # TODO: Implement configuration for packages that were available in v2
+                pass
+        else:
+            spec.add_item(
+                core_models.GeneralConfig,
+                name=node['name'],
+            )
+
+        return spec
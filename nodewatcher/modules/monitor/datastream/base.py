@@ -65,13 +65,33 @@ class StreamsBase(object):
         """
 
         self._model = model
+        # Field descriptors are shared between all instances of a descriptor class
+        # and are only copied when they are accessed for modification
+        self._local_fields = {}
 
-        # Make a local copy of all field descriptors for this model
-        self._local_fields = datastructures.SortedDict()
-        for name, field in self._shared_fields.iteritems():
-            field = copy.deepcopy(field)
-            self._local_fields[name] = field
-            setattr(self, name, field)
+    def __getattr__(self, name):
+        """
+        Returns a local copy of a field descriptor, which may be modified without
+        affecting other instances.
+        """
+
+        if name.startswith('_') or name not in self._shared_fields:
+            raise AttributeError(name)
+
+        return self._get_local_field(name)
+
+    def _get_local_field(self, name):
+        """
+        Returns a local copy of a field descriptor, creating it when needed.
+
+        :param name: Field name
+        """
+
+        try:
+            return self._local_fields[name]
+        except KeyError:
+            field = self._local_fields[name] = self._shared_fields[name].copy()
+            return field
 
     def insert_to_stream(self, stream):
         """
@@ -80,8 +100,8 @@ class StreamsBase(object):
         :param stream: Instance of the datastream to insert into
         """
 
-        for field in self._local_fields.values():
-            field.to_stream(self, stream)
+        for name, field in self._shared_fields.iteritems():
+            self._local_fields.get(name, field).to_stream(self, stream)
 
     def get_model(self):
         """
@@ -92,20 +112,24 @@ class StreamsBase(object):
 
     def get_field(self, name):
         """
-        Returns a specific field descriptor.
+        Returns a specific field descriptor. The returned descriptor must not be
+        modified; use attribute access to obtain a modifiable field.
 
         :param name: Field name
         :return: Field descriptor or None
         """
 
-        return self._local_fields.get(name, None)
+        try:
+            return self._local_fields[name]
+        except KeyError:
+            return self._shared_fields.get(name, None)
 
     def get_fields(self):
         """
-        Returns a list of all field descriptors.
+        Returns a list of all (modifiable) field descriptors.
         """
 
-        return self._local_fields.values()
+        return [self._get_local_field(name) for name in self._shared_fields]
 
     def get_stream_query_tags(self):
         """
@@ -1,4 +1,5 @@
 import collections
+import copy
 
 from django.core import exceptions
 
@@ -31,17 +32,21 @@ class TagReference(object):
         self.tags = tag_or_iterable
         self.transform = transform
 
-    def resolve(self, descriptor):
+    def resolve(self, descriptor, stream_tags=None):
         """
         Resolves this field reference into an actual value.
 
         :param descriptor: Streams descriptor
+        :param stream_tags: Optional already computed stream tags of the descriptor
         :return: Value of the referenced field
         """
 
+        if stream_tags is None:
+            stream_tags = descriptor.get_stream_tags()
+
         # TODO: Dictionary comprehension in Python 2.7+
         tag_values = dict([
-            (ref, reduce(lambda x, y: x[y], ref.split('.'), descriptor.get_stream_tags()))
+            (ref, reduce(lambda x, y: x[y], ref.split('.'), stream_tags))
             for ref in self.tags
         ])
 
@@ -55,6 +60,23 @@ class TagReference(object):
             raise ValueError("Multiple tags specified without transform callable!")
 
 
+def contains_tag_reference(tags):
+    """
+    Returns true if the given tag value contains any tag references.
+
+    :param tags: Tag value
+    """
+
+    if isinstance(tags, TagReference):
+        return True
+    elif isinstance(tags, dict):
+        return any([contains_tag_reference(value) for value in tags.itervalues()])
+    elif isinstance(tags, list):
+        return any([contains_tag_reference(value) for value in tags])
+
+    return False
+
+
 class Field(object):
     """
     A datastream Field contains metadata on how to extract datapoints and create
@@ -95,6 +117,36 @@ class Field(object):
 
         self.value_downsamplers = value_downsamplers
         self.value_type = value_type
+        self._compiled = None
+
+    def copy(self):
+        """
+        Returns a copy of this field, which may be modified without affecting the
+        original. Metadata is shared until it is modified.
+        """
+
+        return copy.copy(self)
+
+    def compile(self):
+        """
+        Precomputes the tags of this field. Static tags are computed only once,
+        while tags containing tag references are resolved for each descriptor.
+
+        :return: A tuple (query_tags, static_tags, dynamic_tags)
+        """
+
+        if self._compiled is None:
+            static_tags = {}
+            dynamic_tags = {}
+            for key, value in self.prepare_tags().iteritems():
+                if contains_tag_reference(value):
+                    dynamic_tags[key] = value
+                else:
+                    static_tags[key] = value
+
+            self._compiled = (self.prepare_query_tags(), static_tags, dynamic_tags)
+
+        return self._compiled
 
     def prepare_value(self, value):
         """
@@ -133,12 +185,13 @@ class Field(object):
 
         return self.value_downsamplers
 
-    def _process_tag_references(self, tags, descriptor):
+    def _process_tag_references(self, tags, descriptor, stream_tags=None):
         """
         Processes tags and resolves all tag references.
 
         :param tags: A dictionary of tags
         :param descriptor: Streams descriptor
+        :param stream_tags: Optional already computed stream tags of the descriptor
         :return: Processed dictionary of tags
         """
 
@@ -146,13 +199,13 @@ class Field(object):
         if isinstance(tags, dict):
             output = {}
             for key, value in tags.iteritems():
-                output[key] = self._process_tag_references(value, descriptor)
+                output[key] = self._process_tag_references(value, descriptor, stream_tags)
         elif isinstance(tags, list):
             output = []
             for value in tags:
-                output.append(self._process_tag_references(value, descriptor))
+                output.append(self._process_tag_references(value, descriptor, stream_tags))
         elif isinstance(tags, TagReference):
-            output = tags.resolve(descriptor)
+            output = tags.resolve(descriptor, stream_tags)
         else:
             output = tags
 
@@ -160,13 +213,19 @@ class Field(object):
 
     def process_tags(self, descriptor):
         """
-        Returns a tuple (query_tags, tags) to be used by ensure_stream.
+        Returns a tuple (query_tags, tags) to be used by ensure_stream. Static tags
+        are shared between streams, so the returned tags must not be modified.
         """
 
+        field_query_tags, static_tags, dynamic_tags = self.compile()
+
         query_tags = descriptor.get_stream_query_tags()
-        query_tags.update(self.prepare_query_tags())
+        query_tags.update(field_query_tags)
         tags = descriptor.get_stream_tags()
-        tags.update(self._process_tag_references(self.prepare_tags(), descriptor))
+        stream_tags = tags.copy() if dynamic_tags else None
+        tags.update(static_tags)
+        if dynamic_tags:
+            tags.update(self._process_tag_references(dynamic_tags, descriptor, stream_tags))
         return query_tags, tags
 
     def ensure_stream(self, descriptor, stream):
@@ -219,7 +278,9 @@ class Field(object):
                     d[k] = u[k]
             return d
 
-        update(self.custom_tags, tags)
+        # Custom tags may be shared with the field this one was copied from
+        self.custom_tags = update(copy.deepcopy(self.custom_tags), tags)
+        self._compiled = None
 
 
 class IntegerField(Field):
@@ -439,6 +500,11 @@ class DynamicSumField(Field):
 
         super(DynamicSumField, self).__init__(**kwargs)
 
+    def copy(self):
+        field = super(DynamicSumField, self).copy()
+        field._fields = list(self._fields)
+        return field
+
     def clear_source_fields(self):
         """
         Clears all the source fields.
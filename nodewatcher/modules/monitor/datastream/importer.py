@@ -0,0 +1,363 @@
+import json
+import multiprocessing
+import os
+import Queue
+import traceback
+import zlib
+
+from django.db import connection
+
+from django_datastream import datastream
+
+DEFAULT_VALUE_DOWNSAMPLERS = [
+    'mean',
+    'sum',
+    'min',
+    'max',
+    'sum_squares',
+    'std_dev',
+    'count'
+]
+
+# Number of datapoints that are buffered for a stream before they are appended
+BATCH_SIZE = 500
+# Number of datapoints sent to a worker process in a single message
+DISPATCH_SIZE = 1000
+
+
+class ImportWorkerFailed(Exception):
+    pass
+
+
+def get_stream_key(stream):
+    """
+    Returns a key that identifies the stream a legacy datapoint belongs to. The
+    key is also sufficient to create the stream.
+
+    :param stream: Stream dictionary as generated by the import command
+    """
+
+    return json.dumps([stream['tags'], stream.get('value_downsamplers', DEFAULT_VALUE_DOWNSAMPLERS)], sort_keys=True)
+
+
+def get_stream_worker(key, workers):
+    """
+    Returns the worker that is responsible for the given stream.
+
+    :param key: Stream key
+    :param workers: Number of workers
+    """
+
+    return (zlib.crc32(key) & 0xffffffff) % workers
+
+
+class StreamWriter(object):
+    """
+    Appends datapoints to streams. Stream identifiers are cached by stream key and
+    datapoints are buffered per stream and appended in batches.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, report_error=None):
+        """
+        Class constructor.
+
+        :param batch_size: Number of datapoints buffered per stream
+        :param report_error: Optional callable, which is called with (stream key, value,
+          timestamp) for every datapoint that could not be appended
+        """
+
+        self.batch_size = batch_size
+        self.report_error = report_error
+        self.stream_ids = {}
+        self.pending = {}
+        self.appended = 0
+        self.errors = 0
+
+    def get_stream_id(self, key):
+        """
+        Returns the identifier of a stream, creating the stream if needed.
+
+        :param key: Stream key
+        """
+
+        try:
+            return self.stream_ids[key]
+        except KeyError:
+            tags, value_downsamplers = json.loads(key)
+            stream_id = self.stream_ids[key] = datastream.ensure_stream(
+                tags,
+                tags,
+                value_downsamplers,
+                datastream.Granularity.Minutes
+            )
+            return stream_id
+
+    def write(self, key, value, timestamp):
+        """
+        Queues a datapoint for insertion.
+
+        :param key: Stream key
+        :param value: Datapoint value
+        :param timestamp: Datapoint timestamp
+        """
+
+        pending = self.pending.setdefault(key, [])
+        pending.append((value, timestamp))
+        if len(pending) >= self.batch_size:
+            self.flush_stream(key)
+
+    def flush_stream(self, key):
+        """
+        Appends all buffered datapoints of a stream.
+
+        :param key: Stream key
+        """
+
+        datapoints = self.pending.pop(key, None)
+        if not datapoints:
+            return
+
+        stream_id = self.get_stream_id(key)
+        if hasattr(datastream, 'append_multiple'):
+            try:
+                datastream.append_multiple([
+                    {'stream_id': stream_id, 'value': value, 'timestamp': timestamp}
+                    for value, timestamp in datapoints
+                ])
+                self.appended += len(datapoints)
+                return
+            except KeyboardInterrupt:
+                raise
+            except:
+                # Fall back to appending datapoints one by one, so that only the invalid
+                # ones are skipped
+                pass
+
+        for value, timestamp in datapoints:
+            try:
+                datastream.append(stream_id, value, timestamp)
+                self.appended += 1
+            except KeyboardInterrupt:
+                raise
+            except:
+                self.errors += 1
+                if self.report_error is not None:
+                    self.report_error(key, value, timestamp)
+
+    def flush(self):
+        """
+        Appends all buffered datapoints.
+        """
+
+        for key in self.pending.keys():
+            self.flush_stream(key)
+
+
+def import_worker(index, tasks, results, batch_size):
+    """
+    Worker process, which appends datapoints of the streams assigned to it.
+
+    :param index: Worker index
+    :param tasks: Queue of incoming messages
+    :param results: Queue of outgoing messages
+    :param batch_size: Number of datapoints buffered per stream
+    """
+
+    try:
+        writer = StreamWriter(batch_size)
+        while True:
+            message, payload = tasks.get()
+            if message == 'data':
+                for key, value, timestamp in payload:
+                    writer.write(key, value, timestamp)
+            elif message == 'flush':
+                writer.flush()
+                results.put(('flushed', index, payload, writer.appended, writer.errors))
+            elif message == 'stop':
+                break
+    except KeyboardInterrupt:
+        pass
+    except:
+        results.put(('error', index, traceback.format_exc(), None, None))
+
+
+class ParallelImporter(object):
+    """
+    Distributes datapoints between worker processes by stream, so that datapoints of
+    any single stream are always appended in order by the same worker.
+    """
+
+    def __init__(self, workers, batch_size=BATCH_SIZE):
+        """
+        Class constructor.
+
+        :param workers: Number of worker processes
+        :param batch_size: Number of datapoints buffered per stream
+        """
+
+        self.workers = workers
+        self.batch_size = batch_size
+        self.outgoing = [[] for worker in xrange(workers)]
+        self.processes = []
+        self.tasks = []
+        self.results = multiprocessing.Queue()
+        self.acknowledged = {}
+        self.completed = None
+        self.appended = [0] * workers
+        self.errors = [0] * workers
+
+    def start(self):
+        """
+        Starts the worker processes.
+        """
+
+        # Close the connection before forking the workers as otherwise resources will be
+        # shared and chaos will ensue
+        connection.close()
+
+        for index in xrange(self.workers):
+            tasks = multiprocessing.Queue(maxsize=4)
+            process = multiprocessing.Process(target=import_worker, args=(index, tasks, self.results, self.batch_size))
+            process.daemon = True
+            process.start()
+
+            self.tasks.append(tasks)
+            self.processes.append(process)
+
+    def _send(self, index, message, payload):
+        # Queues are bounded, so a slow worker throttles the parser, but a failed worker
+        # must not block it forever
+        while True:
+            try:
+                self.tasks[index].put((message, payload), timeout=1)
+                return
+            except Queue.Full:
+                self.poll()
+
+                # A worker that has been killed never reports an error and never drains its queue
+                if not self.processes[index].is_alive():
+                    raise ImportWorkerFailed("Import worker process has terminated unexpectedly.")
+
+    def write(self, key, value, timestamp):
+        """
+        Queues a datapoint for insertion.
+
+        :param key: Stream key
+        :param value: Datapoint value
+        :param timestamp: Datapoint timestamp
+        """
+
+        index = get_stream_worker(key, self.workers)
+        outgoing = self.outgoing[index]
+        outgoing.append((key, value, timestamp))
+        if len(outgoing) >= DISPATCH_SIZE:
+            self._send(index, 'data', outgoing)
+            self.outgoing[index] = []
+
+    def flush(self, offset):
+        """
+        Requests all workers to append their buffered datapoints. The offset is
+        acknowledged once all workers have done so.
+
+        :param offset: Item offset to acknowledge
+        """
+
+        for index in xrange(self.workers):
+            if self.outgoing[index]:
+                self._send(index, 'data', self.outgoing[index])
+                self.outgoing[index] = []
+
+            self._send(index, 'flush', offset)
+
+    def poll(self, block=False):
+        """
+        Processes messages from the workers.
+
+        :param block: Should the call wait for at least one message
+        :return: The highest offset acknowledged by all workers or None
+        """
+
+        while True:
+            try:
+                message, index, payload, appended, errors = self.results.get(block=block, timeout=1 if block else None)
+            except Queue.Empty:
+                if block and not all([process.is_alive() for process in self.processes]):
+                    raise ImportWorkerFailed("Import worker process has terminated unexpectedly.")
+                if block:
+                    continue
+                break
+
+            block = False
+            if message == 'error':
+                raise ImportWorkerFailed(payload)
+
+            self.appended[index] = appended
+            self.errors[index] = errors
+            self.acknowledged[payload] = self.acknowledged.get(payload, 0) + 1
+            if self.acknowledged[payload] == self.workers:
+                del self.acknowledged[payload]
+                self.completed = max(self.completed, payload)
+
+        return self.completed
+
+    def finish(self, offset):
+        """
+        Flushes all datapoints and stops the workers.
+
+        :param offset: Final item offset
+        """
+
+        self.flush(offset)
+        while self.poll(block=True) != offset:
+            pass
+
+        for index in xrange(self.workers):
+            self._send(index, 'stop', None)
+        for process in self.processes:
+            process.join()
+
+    def terminate(self):
+        """
+        Stops the workers without flushing buffered datapoints.
+        """
+
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+
+    @property
+    def total_appended(self):
+        return sum(self.appended)
+
+    @property
+    def total_errors(self):
+        return sum(self.errors)
+
+
+def read_checkpoint(filename):
+    """
+    Returns the item offset stored in a checkpoint file or zero when there is no
+    checkpoint.
+
+    :param filename: Checkpoint filename
+    """
+
+    try:
+        with open(filename, 'r') as checkpoint_file:
+            return int(checkpoint_file.read().strip() or 0)
+    except IOError:
+        return 0
+
+
+def write_checkpoint(filename, offset):
+    """
+    Atomically stores an item offset into a checkpoint file.
+
+    :param filename: Checkpoint filename
+    :param offset: Number of items that have been completely imported
+    """
+
+    temporary = '%s.tmp' % filename
+    with open(temporary, 'w') as checkpoint_file:
+        checkpoint_file.write('%d\n' % offset)
+    os.rename(temporary, filename)
@@ -0,0 +1,195 @@
+import logging
+import time
+import zlib
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from django_datastream import datastream
+
+from . import models as ds_models
+
+# Logger instance
+logger = logging.getLogger('monitor.datastream.maintenance')
+
+# Number of processed streams after which the shard checkpoint is updated
+CHECKPOINT_INTERVAL = 500
+# Number of dirty stream records that are handled in a single query
+DIRTY_BATCH_SIZE = 500
+
+
+def get_stream_id(stream):
+    """
+    Returns the identifier of a stream as passed to stream filters by the
+    datastream backend.
+
+    :param stream: Stream instance or descriptor
+    """
+
+    if isinstance(stream, dict):
+        return str(stream.get('stream_id', stream.get('id')))
+
+    return str(stream.id)
+
+
+def get_stream_shard(stream_id, shards):
+    """
+    Returns the shard that a stream belongs to. Shard assignment is stable
+    between processes.
+
+    :param stream_id: Stream identifier
+    :param shards: Number of shards
+    """
+
+    return (zlib.crc32(stream_id) & 0xffffffff) % shards
+
+
+def downsample_shard(shard, shards):
+    """
+    Downsamples all streams belonging to the given shard. When the previous pass
+    over the shard has been interrupted, streams that have already been processed
+    by it are skipped. Streams are expected to be iterated in identifier order by
+    the backend; when they are not, any skipped streams are simply downsampled in
+    the next pass.
+
+    :param shard: Shard number
+    :param shards: Number of shards
+    :return: A dictionary with shard statistics
+    """
+
+    checkpoint, created = ds_models.DownsampleCheckpoint.objects.get_or_create(shard=shard, shards=shards)
+    resume_after = None
+    if checkpoint.finished is None and checkpoint.last_stream:
+        resume_after = checkpoint.last_stream
+        logger.info("Resuming downsampling of shard %d/%d after stream %s." % (shard, shards, resume_after))
+    else:
+        checkpoint.started = timezone.now()
+        checkpoint.finished = None
+        checkpoint.last_stream = ''
+        checkpoint.processed = 0
+        checkpoint.save()
+
+    state = {
+        'processed': checkpoint.processed,
+        'skipped': 0,
+        'last': None,
+    }
+    start = time.time()
+
+    def update_checkpoint():
+        ds_models.DownsampleCheckpoint.objects.filter(pk=checkpoint.pk).update(
+            last_stream=state['last'] or '',
+            processed=state['processed'],
+        )
+
+    def filter_stream(stream):
+        stream_id = get_stream_id(stream)
+        if get_stream_shard(stream_id, shards) != shard:
+            return False
+
+        if resume_after is not None and stream_id <= resume_after:
+            state['skipped'] += 1
+            return False
+
+        # Streams are downsampled one after another, so the previous one is done by now
+        if state['last'] is not None:
+            state['processed'] += 1
+            if state['processed'] % CHECKPOINT_INTERVAL == 0:
+                update_checkpoint()
+                logger.info("Shard %d/%d: downsampled %d streams (%.1f streams/s)." % (
+                    shard, shards, state['processed'], state['processed'] / max(time.time() - start, 0.001)
+                ))
+
+        state['last'] = stream_id
+        return True
+
+    datastream.downsample_streams(filter_stream=filter_stream)
+
+    if state['last'] is not None:
+        state['processed'] += 1
+
+    duration = time.time() - start
+    ds_models.DownsampleCheckpoint.objects.filter(pk=checkpoint.pk).update(
+        last_stream=state['last'] or checkpoint.last_stream,
+        processed=state['processed'],
+        finished=timezone.now(),
+        duration=duration,
+    )
+
+    return {
+        'shard': shard,
+        'shards': shards,
+        'processed': state['processed'],
+        'skipped': state['skipped'],
+        'duration': duration,
+    }
+
+
+def mark_dirty_streams(dirty):
+    """
+    Records derived streams that need to be backprocessed.
+
+    :param dirty: A dictionary mapping derived stream identifiers to (query tags, depth)
+      tuples as returned by `StreamTracker.get_dirty_streams`
+    """
+
+    dirty = dict([(str(stream_id), value) for stream_id, value in dirty.iteritems()])
+    stream_ids = dirty.keys()
+    for offset in xrange(0, len(stream_ids), DIRTY_BATCH_SIZE):
+        batch = stream_ids[offset:offset + DIRTY_BATCH_SIZE]
+        existing = ds_models.DirtyStream.objects.filter(stream_id__in=batch)
+        existing_ids = set(existing.values_list('stream_id', flat=True))
+        if existing_ids:
+            existing.update(marked=timezone.now())
+
+        missing = [
+            ds_models.DirtyStream(stream_id=stream_id, query_tags=dirty[stream_id][0], depth=dirty[stream_id][1])
+            for stream_id in batch if stream_id not in existing_ids
+        ]
+        if not missing:
+            continue
+
+        try:
+            with transaction.atomic():
+                ds_models.DirtyStream.objects.bulk_create(missing)
+        except IntegrityError:
+            # Another worker has marked some of the streams concurrently, so fall back
+            # to marking them one by one
+            for item in missing:
+                try:
+                    with transaction.atomic():
+                        item.save()
+                except IntegrityError:
+                    pass
+
+
+def get_dirty_streams():
+    """
+    Returns the derived streams that need to be backprocessed, grouped by depth.
+
+    :return: A tuple (snapshot time, levels), where levels is a list of lists of
+      (primary key, query tags) tuples in the order they need to be processed in
+    """
+
+    snapshot = timezone.now()
+    levels = {}
+    for item in ds_models.DirtyStream.objects.filter(marked__lte=snapshot).only('pk', 'depth', 'query_tags'):
+        levels.setdefault(item.depth, []).append((item.pk, item.query_tags))
+
+    return snapshot, [levels[depth] for depth in sorted(levels)]
+
+
+def clear_dirty_streams(pks, snapshot):
+    """
+    Removes the given dirty stream records unless they have been marked again
+    after the snapshot was taken.
+
+    :param pks: A list of primary keys
+    :param snapshot: Snapshot time as returned by `get_dirty_streams`
+    """
+
+    for offset in xrange(0, len(pks), DIRTY_BATCH_SIZE):
+        ds_models.DirtyStream.objects.filter(
+            pk__in=pks[offset:offset + DIRTY_BATCH_SIZE],
+            marked__lte=snapshot,
+        ).delete()
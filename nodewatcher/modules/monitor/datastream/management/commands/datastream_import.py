@@ -2,15 +2,49 @@ import datetime
 import ijson
 import traceback
 import math
+import time
+from optparse import make_option
 
 from django.core.management import base
 
-from django_datastream import datastream
+from ... import importer
+
+# Number of seconds between progress reports
+REPORT_INTERVAL = 30
 
 
 class Command(base.BaseCommand):
     help = "Imports legacy nodewatcher v2 data into datastream."
     requires_model_validation = True
+    option_list = base.BaseCommand.option_list + (
+        make_option(
+            '--workers',
+            dest='workers',
+            default=1,
+            type=int,
+            help='Number of worker processes appending datapoints',
+        ),
+        make_option(
+            '--batch-size',
+            dest='batch_size',
+            default=importer.BATCH_SIZE,
+            type=int,
+            help='Number of datapoints appended to a stream at once',
+        ),
+        make_option(
+            '--checkpoint',
+            dest='checkpoint',
+            default=None,
+            help='File used to record import progress; an interrupted import is resumed from it',
+        ),
+        make_option(
+            '--checkpoint-interval',
+            dest='checkpoint_interval',
+            default=10000,
+            type=int,
+            help='Number of items after which import progress is recorded',
+        ),
+    )
 
     def handle(self, *args, **options):
         if len(args) != 1:
@@ -22,54 +56,123 @@ class Command(base.BaseCommand):
         except IOError:
             raise base.CommandError("Unable to open file '%s'!" % input_filename)
 
+        self.checkpoint_filename = options['checkpoint']
+        resume_offset = 0
+        if self.checkpoint_filename:
+            resume_offset = importer.read_checkpoint(self.checkpoint_filename)
+            if resume_offset:
+                self.stdout.write("Resuming import after item %d...\n" % resume_offset)
+
+        if options['workers'] > 1:
+            self.parallel = importer.ParallelImporter(options['workers'], options['batch_size'])
+            self.parallel.start()
+            writer = self.parallel
+        else:
+            self.parallel = None
+            self.writer = importer.StreamWriter(options['batch_size'], report_error=self.report_datapoint_error)
+            writer = self.writer
+
         self.stdout.write("Starting import process...\n")
         item_index = 0
-        for item in ijson.items(input_file, 'items.item'):
-            timestamp = datetime.datetime.utcfromtimestamp(item['s'])
-            item_index += 1
-            try:
-                streams = self.import_data(item)
-            except:
-                self.stdout.write("=== ERROR: Exception ocurred while processing input stream!\n")
-                self.stdout.write("--- Exception:\n")
-                self.stdout.write(traceback.format_exc())
-                self.stdout.write("\n")
-                self.stdout.write("--- Item index:\n")
-                self.stdout.write("%s\n" % item_index)
-                self.stdout.write("--- Item data:\n")
-                self.stdout.write(repr(item))
-                self.stdout.write("\n\n")
-                raise base.CommandError("Exception ocurred, terminating import.")
-
-            for stream in streams:
-                stream_id = datastream.ensure_stream(
-                    stream['tags'],
-                    stream['tags'],
-                    stream.get('value_downsamplers', [
-                        'mean',
-                        'sum',
-                        'min',
-                        'max',
-                        'sum_squares',
-                        'std_dev',
-                        'count'
-                    ]),
-                    datastream.Granularity.Minutes
-                )
+        datapoints = 0
+        start = last_report = time.time()
+        try:
+            for item in ijson.items(input_file, 'items.item'):
+                item_index += 1
+                if item_index <= resume_offset:
+                    continue
 
+                timestamp = datetime.datetime.utcfromtimestamp(item['s'])
                 try:
-                    datastream.append(stream_id, stream['value'], timestamp)
+                    streams = self.import_data(item)
                 except:
-                    # Skip datapoints on errors
-                    self.stdout.write("=== WARNING: Skipping datapoint due to exception!\n")
+                    self.stdout.write("=== ERROR: Exception ocurred while processing input stream!\n")
                     self.stdout.write("--- Exception:\n")
                     self.stdout.write(traceback.format_exc())
                     self.stdout.write("\n")
-                    self.stdout.write("--- Datapoint:\n")
-                    self.stdout.write("%s\n" % item['s'])
-                    self.stdout.write(repr(stream['value']))
+                    self.stdout.write("--- Item index:\n")
+                    self.stdout.write("%s\n" % item_index)
+                    self.stdout.write("--- Item data:\n")
+                    self.stdout.write(repr(item))
                     self.stdout.write("\n\n")
-                    continue
+                    raise base.CommandError("Exception ocurred, terminating import.")
+
+                for stream in streams:
+                    writer.write(importer.get_stream_key(stream), stream['value'], timestamp)
+                    datapoints += 1
+
+                if item_index % options['checkpoint_interval'] == 0:
+                    self.checkpoint(item_index)
+
+                if time.time() - last_report >= REPORT_INTERVAL:
+                    last_report = time.time()
+                    self.report_progress(item_index - resume_offset, datapoints, last_report - start)
+
+            if self.parallel is not None:
+                self.parallel.finish(item_index)
+            else:
+                self.writer.flush()
+
+            if self.checkpoint_filename:
+                importer.write_checkpoint(self.checkpoint_filename, item_index)
+        except importer.ImportWorkerFailed, error:
+            self.stdout.write("=== ERROR: Import worker has failed!\n")
+            self.stdout.write("--- Exception:\n")
+            self.stdout.write("%s\n" % error)
+            raise base.CommandError("Exception ocurred, terminating import.")
+        finally:
+            if self.parallel is not None:
+                self.parallel.terminate()
+
+        self.report_progress(item_index - resume_offset, datapoints, time.time() - start)
+        self.stdout.write("Import completed.\n")
+
+    def checkpoint(self, item_index):
+        """
+        Records import progress. In parallel mode, progress is recorded once all
+        workers have appended datapoints up to the given item.
+
+        :param item_index: Index of the last processed item
+        """
+
+        if self.parallel is not None:
+            self.parallel.flush(item_index)
+            completed = self.parallel.poll()
+        else:
+            self.writer.flush()
+            completed = item_index
+
+        if completed and self.checkpoint_filename:
+            importer.write_checkpoint(self.checkpoint_filename, completed)
+
+    def report_progress(self, items, datapoints, duration):
+        """
+        Reports import throughput.
+        """
+
+        if self.parallel is not None:
+            appended, errors = self.parallel.total_appended, self.parallel.total_errors
+        else:
+            appended, errors = self.writer.appended, self.writer.errors
+
+        duration = max(duration, 0.001)
+        self.stdout.write("Processed %d items (%.1f items/s), queued %d datapoints (%.1f datapoints/s), appended %d, skipped %d.\n" % (
+            items, items / duration, datapoints, datapoints / duration, appended, errors,
+        ))
+
+    def report_datapoint_error(self, key, value, timestamp):
+        """
+        Reports a datapoint that has been skipped due to an exception.
+        """
+
+        self.stdout.write("=== WARNING: Skipping datapoint due to exception!\n")
+        self.stdout.write("--- Exception:\n")
+        self.stdout.write(traceback.format_exc())
+        self.stdout.write("\n")
+        self.stdout.write("--- Datapoint:\n")
+        self.stdout.write("%s %s\n" % (timestamp, key))
+        self.stdout.write(repr(value))
+        self.stdout.write("\n\n")
 
     def import_data(self, item):
         return {
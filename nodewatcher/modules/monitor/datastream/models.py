@@ -1,9 +1,12 @@
 from django import dispatch
+from django.db import models as django_models
 from django.db.models import signals as django_signals
 from django.utils.translation import gettext_noop
 
 from django_datastream import datastream
 
+import json_field
+
 # To create node.monitoring registration point
 import nodewatcher.core.monitor
 from nodewatcher.core import models as core_models
@@ -583,6 +586,38 @@ class WifiInterfaceMonitorStreams(InterfaceMonitorStreams):
 pool.register(models.WifiInterfaceMonitor, WifiInterfaceMonitorStreams)
 
 
+class DownsampleCheckpoint(django_models.Model):
+    """
+    Progress of downsampling a single shard of streams, so that an interrupted
+    downsampling pass can be resumed.
+    """
+
+    shard = django_models.PositiveIntegerField()
+    shards = django_models.PositiveIntegerField()
+    started = django_models.DateTimeField(null=True)
+    finished = django_models.DateTimeField(null=True)
+    # Identifier of the last stream that has been completely downsampled
+    last_stream = django_models.CharField(max_length=64, blank=True)
+    processed = django_models.PositiveIntegerField(default=0)
+    duration = django_models.FloatField(null=True)
+
+    class Meta:
+        unique_together = ('shard', 'shards')
+
+
+class DirtyStream(django_models.Model):
+    """
+    A derived stream whose source streams have received new datapoints since
+    it has last been backprocessed.
+    """
+
+    stream_id = django_models.CharField(max_length=64, unique=True)
+    query_tags = json_field.JSONField()
+    # Length of the longest chain of derived streams leading to this stream
+    depth = django_models.PositiveIntegerField(default=0)
+    marked = django_models.DateTimeField(auto_now=True)
+
+
 @dispatch.receiver(django_signals.post_delete, sender=core_models.Node)
 def datastream_node_removed(sender, instance, **kwargs):
     """
@@ -2,10 +2,10 @@ from django.db.models import signals as model_signals
 
 from django_datastream import datastream
 
-from nodewatcher.core.monitor import processors as monitor_processors
+from nodewatcher.core.monitor import metrics, processors as monitor_processors
 from nodewatcher.core.registry import registration
 
-from . import exceptions
+from . import exceptions, maintenance, tracking
 from .pool import pool
 
 
@@ -61,6 +61,7 @@ class DatastreamBase(object):
         :param context: Current context
         """
 
+        tracker = tracking.StreamTracker(datastream)
         processed_items = set()
         for items in context.datastream.values():
             if isinstance(items, dict):
@@ -77,11 +78,17 @@ class DatastreamBase(object):
 
                 try:
                     descriptor = pool.get_descriptor(item)
-                    descriptor.insert_to_stream(datastream)
+                    descriptor.insert_to_stream(tracker)
                     pool.clear_descriptor(item)
                 except exceptions.StreamDescriptorNotRegistered:
                     continue
 
+        # Record derived streams which need to be backprocessed because their sources have changed
+        maintenance.mark_dirty_streams(tracker.get_dirty_streams())
+
+        if tracker.datapoints:
+            metrics.increment('nodewatcher_datastream_writes_total', tracker.datapoints)
+
 
 class NodeDatastream(DatastreamBase, monitor_processors.NodeProcessor):
     """
@@ -106,6 +113,8 @@ class NetworkDatastream(DatastreamBase, monitor_processors.NetworkProcessor):
     A processor that stores all network-wide monitoring data into the datastream.
     """
 
+    elected = True
+
     def process(self, context, nodes):
         """
         Performs network-wide processing and selects the nodes that will be processed
@@ -120,12 +129,22 @@ class NetworkDatastream(DatastreamBase, monitor_processors.NetworkProcessor):
         return context, nodes
 
 
+def _maintenance_backprocess_worker(query_tags):
+    """
+    Helper function proxy that can be called by the worker pool.
+    """
+
+    datastream.backprocess_streams(query_tags)
+
+
 class MaintenanceBackprocess(monitor_processors.NetworkProcessor):
     """
-    Datastream backprocessing maintenance processor.
+    Datastream backprocessing maintenance processor. Only derived streams whose
+    sources have received new datapoints are backprocessed.
     """
 
     requires_transaction = False
+    elected = True
 
     def process(self, context, nodes):
         """
@@ -137,18 +156,38 @@ class MaintenanceBackprocess(monitor_processors.NetworkProcessor):
         :return: A (possibly) modified context and a (possibly) modified set of nodes
         """
 
-        self.logger.info("Backprocessing streams...")
-        datastream.backprocess_streams()
+        snapshot, levels = maintenance.get_dirty_streams()
+        self.logger.info("Backprocessing %d dirty streams..." % sum([len(level) for level in levels]))
+
+        # Derived streams may depend on other derived streams, so each level must be
+        # completed before the next one is started
+        workers = self.get_worker_pool()
+        processed = []
+        for level in levels:
+            results = []
+            for pk, query_tags in level:
+                results.append((pk, workers.apply_async(_maintenance_backprocess_worker, (query_tags,))))
+
+            for pk, result in results:
+                try:
+                    result.get()
+                    processed.append(pk)
+                except KeyboardInterrupt:
+                    raise
+                except:
+                    self.report_exception("Backprocessing of a stream has failed with exception:")
+
+        maintenance.clear_dirty_streams(processed, snapshot)
 
         return context, nodes
 
 
-def _maintenance_downsample_worker():
+def _maintenance_downsample_worker(shard, shards):
     """
     Helper function proxy that can be called by the worker pool.
     """
 
-    datastream.downsample_streams()
+    return maintenance.downsample_shard(shard, shards)
 
 
 class MaintenanceDownsample(monitor_processors.NetworkProcessor):
@@ -157,6 +196,7 @@ class MaintenanceDownsample(monitor_processors.NetworkProcessor):
     """
 
     requires_transaction = False
+    elected = True
 
     def process(self, context, nodes):
         """
@@ -168,14 +208,24 @@ class MaintenanceDownsample(monitor_processors.NetworkProcessor):
         :return: A (possibly) modified context and a (possibly) modified set of nodes
         """
 
-        # Downsample streams using multiple workers in parallel
+        # Downsample streams using multiple workers in parallel, each handling its own shard
+        # of streams
         results = []
         workers = self.get_worker_pool()
-        self.logger.info("Downsampling streams with %d workers..." % workers._processes)
-        for worker in xrange(workers._processes):
-            results.append(workers.apply_async(_maintenance_downsample_worker))
+        shards = workers._processes
+        self.logger.info("Downsampling streams with %d workers..." % shards)
+        for shard in xrange(shards):
+            results.append(workers.apply_async(_maintenance_downsample_worker, (shard, shards)))
 
-        for result in results:
-            result.get()
+        for shard, result in enumerate(results):
+            try:
+                summary = result.get()
+            except KeyboardInterrupt:
+                raise
+            except:
+                self.report_exception("Downsampling of shard %d/%d has failed with exception:" % (shard, shards))
+                continue
+
+            self.logger.info("Shard %(shard)d/%(shards)d: downsampled %(processed)d streams in %(duration).1f seconds (%(skipped)d skipped as already done)." % summary)
 
         return context, nodes
@@ -2,11 +2,18 @@ from celery import task
 
 from django_datastream import datastream
 
+from . import maintenance
+
 
 @task.task()
-def run_downsampling():
+def run_downsampling(shard=None, shards=None):
     """
     Executes the `downsample_streams` API method on the datastream backend
-    as some backends need this to be executed periodically.
+    as some backends need this to be executed periodically. When a shard is
+    given, only streams belonging to that shard are downsampled.
     """
+
+    if shards:
+        return maintenance.downsample_shard(shard, shards)
+
     datastream.downsample_streams()
@@ -1,9 +1,11 @@
+import unittest
+
 from django import test as django_test
 from django.conf import settings
 
 import django_datastream
 
-from . import base, exceptions, fields
+from . import base, exceptions, fields, importer, tracking
 from .pool import pool
 
 
@@ -104,3 +106,85 @@ class RegistryTestCase(django_test.TestCase):
         pool.unregister(DummyModel)
         with self.assertRaises(exceptions.StreamDescriptorNotRegistered):
             pool.unregister(DummyModel)
+
+
+class DescriptorTestCase(unittest.TestCase):
+    def test_field_copy_on_write(self):
+        item_a = DummyModel()
+        item_a.uuid = 'a'
+        item_b = DummyModel()
+        item_b.uuid = 'b'
+
+        descriptor_a = TestStreams(item_a)
+        descriptor_b = TestStreams(item_b)
+
+        # Fields are shared until they are modified
+        self.assertIs(descriptor_a.get_field('uptime'), descriptor_b.get_field('uptime'))
+
+        descriptor_a.uptime.set_tags(visualization={'hidden': False})
+        self.assertIsNot(descriptor_a.get_field('uptime'), descriptor_b.get_field('uptime'))
+
+        query_tags, tags = descriptor_a.get_field('uptime').process_tags(descriptor_a)
+        self.assertEqual(query_tags, {'uuid': 'a', 'name': 'uptime'})
+        self.assertFalse(tags['visualization']['hidden'])
+        self.assertEqual(tags['visualization']['type'], 'line')
+
+        query_tags, tags = descriptor_b.get_field('uptime').process_tags(descriptor_b)
+        self.assertTrue(tags['visualization']['hidden'])
+        self.assertTrue(TestStreams._shared_fields['uptime'].custom_tags['visualization']['hidden'])
+
+    def test_tag_references(self):
+        item = DummyModel()
+        item.uuid = 'a'
+
+        query_tags, tags = TestStreams(item).get_field('reboots').process_tags(TestStreams(item))
+        self.assertEqual(tags['visualization']['with'], {'uuid': 'a'})
+        self.assertEqual(tags['uuid'], 'a')
+        self.assertEqual(tags['name'], 'reboots')
+
+
+class DummyStreamAPI(object):
+    def __init__(self):
+        self.streams = {}
+
+    def ensure_stream(self, query_tags, tags, *args, **kwargs):
+        return self.streams.setdefault(query_tags['name'], len(self.streams) + 1)
+
+    def append(self, stream_id, value):
+        pass
+
+
+class TrackerTestCase(unittest.TestCase):
+    def test_dirty_streams(self):
+        tracker = tracking.StreamTracker(DummyStreamAPI())
+
+        uptime = tracker.ensure_stream({'name': 'uptime'}, {})
+        counter = tracker.ensure_stream({'name': 'counter'}, {})
+        idle = tracker.ensure_stream({'name': 'idle'}, {})
+        reboots = tracker.ensure_stream({'name': 'reboots'}, {}, derive_from=[{'name': 'reset', 'stream': uptime}])
+        rate = tracker.ensure_stream({'name': 'rate'}, {}, derive_from=[
+            {'name': 'reset', 'stream': reboots},
+            {'name': None, 'stream': counter},
+        ])
+        tracker.ensure_stream({'name': 'idle_sum'}, {}, derive_from=[{'stream': idle}])
+
+        self.assertEqual(tracker.get_dirty_streams(), {})
+
+        tracker.append(uptime, 10)
+        self.assertEqual(tracker.get_dirty_streams(), {
+            reboots: ({'name': 'reboots'}, 0),
+            rate: ({'name': 'rate'}, 1),
+        })
+
+
+class ParallelImporterTestCase(unittest.TestCase):
+    def test_killed_worker(self):
+        parallel = importer.ParallelImporter(1)
+        parallel.start()
+        parallel.processes[0].terminate()
+        parallel.processes[0].join()
+
+        # Sending to a dead worker must fail once its queue is full instead of blocking forever
+        with self.assertRaises(importer.ImportWorkerFailed):
+            for i in xrange(10):
+                parallel._send(0, 'data', [])
@@ -0,0 +1,73 @@
+class StreamTracker(object):
+    """
+    A proxy for the datastream API, which records the streams that have received
+    new datapoints and the derived streams that depend on them, so that only the
+    affected derived streams need to be backprocessed.
+    """
+
+    def __init__(self, stream):
+        """
+        Class constructor.
+
+        :param stream: Datastream API instance
+        """
+
+        self._stream = stream
+        self.appended = set()
+        self.datapoints = 0
+        # Mapping of derived stream identifiers to (query tags, source stream identifiers)
+        self.derived = {}
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def append(self, stream_id, *args, **kwargs):
+        """
+        Appends a datapoint to a stream and records the stream as touched.
+        """
+
+        result = self._stream.append(stream_id, *args, **kwargs)
+        self.appended.add(stream_id)
+        self.datapoints += 1
+        return result
+
+    def ensure_stream(self, query_tags, tags, *args, **kwargs):
+        """
+        Ensures that a stream exists and records its sources when it is a
+        derived stream.
+        """
+
+        stream_id = self._stream.ensure_stream(query_tags, tags, *args, **kwargs)
+        derive_from = kwargs.get('derive_from', None)
+        if stream_id is not None and derive_from:
+            self.derived[stream_id] = (query_tags, [source['stream'] for source in derive_from])
+
+        return stream_id
+
+    def get_dirty_streams(self):
+        """
+        Returns the derived streams that (directly or through other derived streams)
+        depend on streams which have received new datapoints.
+
+        :return: A dictionary mapping derived stream identifiers to (query tags, depth)
+          tuples, where depth is the length of the longest chain of derived streams
+          leading to the stream; streams must be backprocessed in order of depth
+        """
+
+        dirty = {}
+        changed = True
+        while changed:
+            changed = False
+            for stream_id, (query_tags, sources) in self.derived.iteritems():
+                depth = None
+                for source in sources:
+                    if source in self.appended and source not in self.derived:
+                        depth = max(depth, 0)
+                    elif source in dirty:
+                        depth = max(depth, dirty[source][1] + 1)
+
+                if depth is not None and dirty.get(stream_id, (None, None))[1] != depth:
+                    dirty[stream_id] = (query_tags, depth)
+                    changed = True
+
+        return dirty
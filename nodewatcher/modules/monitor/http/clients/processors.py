@@ -13,6 +13,7 @@ class ClientInfo(monitor_processors.NodeProcessor):
     """
 
     @monitor_processors.depends_on_context("http", http_processors.HTTPTelemetryContext)
+    @http_processors.skip_if_unchanged("core.clients")
     def process(self, context, node):
         """
         Called for every processed node.
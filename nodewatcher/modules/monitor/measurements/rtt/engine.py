@@ -0,0 +1,364 @@
+import array
+import errno
+import heapq
+import math
+import select
+import socket
+import struct
+import time
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+
+# ICMP header: type, code, checksum, identifier, sequence number
+ICMP_HEADER = struct.Struct('!BBHHH')
+# Payload header: target index, packet size index, round, send timestamp
+PAYLOAD_HEADER = struct.Struct('!IHHd')
+
+
+class BackendError(Exception):
+    pass
+
+
+def checksum(data):
+    """
+    Computes the internet checksum of the given data. The result is in native
+    byte order.
+
+    :param data: Data to compute the checksum over
+    """
+
+    if len(data) % 2:
+        data += '\x00'
+
+    total = sum(array.array('H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def build_echo_request(identifier, sequence, payload):
+    """
+    Builds an ICMP echo request message.
+
+    :param identifier: Echo identifier
+    :param sequence: Echo sequence number
+    :param payload: Echo payload
+    """
+
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, identifier, sequence)
+    return header[:2] + struct.pack('H', checksum(header + payload)) + header[4:] + payload
+
+
+class BackendBase(object):
+    """
+    Interface for ICMP backends used by the measurement engine.
+    """
+
+    def open(self):
+        """
+        Prepares the backend for sending packets.
+        """
+
+        pass
+
+    def close(self):
+        """
+        Releases any resources held by the backend.
+        """
+
+        pass
+
+    def time(self):
+        """
+        Returns the current time in seconds.
+        """
+
+        raise NotImplementedError
+
+    def send(self, address, packet):
+        """
+        Sends an ICMP message to the given address.
+
+        :param address: Destination IPv4 address
+        :param packet: ICMP message
+        """
+
+        raise NotImplementedError
+
+    def receive(self, timeout):
+        """
+        Waits up to the given number of seconds for ICMP messages to arrive.
+
+        :param timeout: Timeout in seconds
+        :return: A list of (address, message, receive time) tuples
+        """
+
+        raise NotImplementedError
+
+
+class IcmpSocketBackend(BackendBase):
+    """
+    Backend which uses an unprivileged ICMP datagram socket when the system allows
+    it and a raw socket otherwise.
+    """
+
+    RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+
+    def __init__(self):
+        """
+        Class constructor.
+        """
+
+        self.socket = None
+        self.raw = False
+
+    def open(self):
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            self.raw = False
+        except socket.error:
+            try:
+                self.socket = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+                self.raw = True
+            except socket.error, error:
+                raise BackendError("Unable to open an ICMP socket: %s" % error)
+
+        self.socket.setblocking(False)
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECEIVE_BUFFER_SIZE)
+        except socket.error:
+            pass
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def time(self):
+        return time.time()
+
+    def send(self, address, packet):
+        self.socket.sendto(packet, (address, 0))
+
+    def receive(self, timeout):
+        replies = []
+        if not select.select([self.socket], [], [], max(0, timeout))[0]:
+            return replies
+
+        while True:
+            try:
+                data, (address, port) = self.socket.recvfrom(65535)
+            except socket.error, error:
+                if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+
+            received = time.time()
+            if self.raw:
+                # Raw sockets also return the IP header
+                data = data[(ord(data[0]) & 0x0f) * 4:]
+
+            replies.append((address, data, received))
+
+        return replies
+
+
+class FakeBackend(BackendBase):
+    """
+    Backend which simulates replies without using the network. Time is simulated
+    as well, so measurements complete immediately.
+    """
+
+    def __init__(self, responder):
+        """
+        Class constructor.
+
+        :param responder: A callable, which receives the destination address and the
+          payload size and returns the round-trip time in seconds or None when the
+          packet should be lost
+        """
+
+        self.responder = responder
+        self.clock = 0.0
+        self.pending = []
+        self.sent = 0
+
+    def time(self):
+        return self.clock
+
+    def send(self, address, packet):
+        self.sent += 1
+        rtt = self.responder(address, len(packet) - ICMP_HEADER.size)
+        if rtt is None:
+            return
+
+        reply = struct.pack('!B', ICMP_ECHO_REPLY) + packet[1:]
+        heapq.heappush(self.pending, (self.clock + rtt, address, reply))
+
+    def receive(self, timeout):
+        deadline = self.clock + max(0, timeout)
+        replies = []
+        while self.pending and self.pending[0][0] <= deadline:
+            received, address, reply = heapq.heappop(self.pending)
+            replies.append((address, reply, received))
+
+        self.clock = deadline
+        return replies
+
+
+class RttEngine(object):
+    """
+    Measures round-trip times to many targets at once. Echo requests of all packet
+    sizes are interleaved and sent at a limited rate, while replies are processed
+    as they arrive. Statistics are accumulated in flat arrays indexed by packet size
+    and target.
+    """
+
+    def __init__(self, backend, sizes, count, rate=1000, timeout=1.0, identifier=0):
+        """
+        Class constructor.
+
+        :param backend: ICMP backend instance
+        :param sizes: A list of payload sizes in bytes
+        :param count: Number of packets of each size sent to each target
+        :param rate: Maximum number of packets sent per second
+        :param timeout: Number of seconds after which a packet is considered lost
+        :param identifier: ICMP echo identifier
+        """
+
+        self.backend = backend
+        self.sizes = list(sizes)
+        self.count = count
+        self.interval = 1.0 / rate
+        self.timeout = timeout
+        self.identifier = identifier & 0xffff
+
+    def measure(self, addresses):
+        """
+        Performs measurements to the given targets.
+
+        :param addresses: A list of IPv4 addresses (as strings)
+        :return: A tuple (results, start, end), where results is a dictionary mapping
+          addresses to dictionaries of per-size statistics
+        """
+
+        self.addresses = list(addresses)
+        slots = len(self.sizes) * len(self.addresses)
+        self.counts = array.array('I', [0]) * slots
+        self.sums = array.array('d', [0.0]) * slots
+        self.squares = array.array('d', [0.0]) * slots
+        self.minimums = array.array('d', [float('inf')]) * slots
+        self.maximums = array.array('d', [0.0]) * slots
+        self.received = bytearray(slots * self.count)
+
+        self.backend.open()
+        try:
+            start = self.backend.time()
+            next_send = start
+            sequence = 0
+            for round in xrange(self.count):
+                for size_index, size in enumerate(self.sizes):
+                    for target_index, address in enumerate(self.addresses):
+                        # Process replies while waiting for the next send slot
+                        now = self.backend.time()
+                        if next_send > now:
+                            self._process_replies(self.backend.receive(next_send - now))
+                        else:
+                            next_send = now
+
+                        payload = PAYLOAD_HEADER.pack(target_index, size_index, round, self.backend.time())
+                        payload += '\x00' * max(0, size - len(payload))
+                        try:
+                            self.backend.send(address, build_echo_request(self.identifier, sequence & 0xffff, payload))
+                        except socket.error:
+                            # Unreachable targets are accounted for as lost packets
+                            pass
+
+                        sequence += 1
+                        next_send += self.interval
+
+            # Wait for the remaining replies
+            deadline = self.backend.time() + self.timeout
+            now = self.backend.time()
+            while now < deadline:
+                self._process_replies(self.backend.receive(deadline - now))
+                now = self.backend.time()
+
+            end = self.backend.time()
+        finally:
+            self.backend.close()
+
+        return self._get_results(), start, end
+
+    def _process_replies(self, replies):
+        """
+        Accumulates statistics for received echo replies.
+
+        :param replies: A list of (address, message, receive time) tuples
+        """
+
+        targets = len(self.addresses)
+        for address, message, received in replies:
+            if len(message) < ICMP_HEADER.size + PAYLOAD_HEADER.size or ord(message[0]) != ICMP_ECHO_REPLY:
+                continue
+
+            target_index, size_index, round, sent = PAYLOAD_HEADER.unpack_from(message, ICMP_HEADER.size)
+            if target_index >= targets or size_index >= len(self.sizes) or round >= self.count:
+                continue
+            if self.addresses[target_index] != address:
+                # Reply from an unexpected source (or for another measurement)
+                continue
+
+            rtt = received - sent
+            if rtt < 0 or rtt > self.timeout:
+                continue
+
+            slot = size_index * targets + target_index
+            # Ignore duplicate replies
+            seen = slot * self.count + round
+            if self.received[seen]:
+                continue
+            self.received[seen] = 1
+
+            rtt *= 1000.0
+            self.counts[slot] += 1
+            self.sums[slot] += rtt
+            self.squares[slot] += rtt ** 2
+            if rtt < self.minimums[slot]:
+                self.minimums[slot] = rtt
+            if rtt > self.maximums[slot]:
+                self.maximums[slot] = rtt
+
+    def _get_results(self):
+        """
+        Computes per-target statistics from the accumulated arrays.
+        """
+
+        results = {}
+        targets = len(self.addresses)
+        for size_index, size in enumerate(self.sizes):
+            offset = size_index * targets
+            for target_index, address in enumerate(self.addresses):
+                slot = offset + target_index
+                n = int(self.counts[slot])
+                s = self.sums[slot]
+
+                if n == 0:
+                    std = None
+                elif n == 1:
+                    std = 0.0
+                else:
+                    std = math.sqrt(max(0.0, (float(n) * self.squares[slot] - s ** 2) / (n * (n - 1))))
+
+                results.setdefault(address, {})[size] = {
+                    'sent': self.count,
+                    'successful': n,
+                    'failed': max(0, self.count - n),
+                    'rtt_min': self.minimums[slot] if n else None,
+                    'rtt_max': self.maximums[slot] if n else None,
+                    'rtt_avg': (s / n) if n else None,
+                    'rtt_std': std,
+                }
+
+        return results
@@ -1,14 +1,12 @@
-import subprocess
-import threading
-import collections
-import math
+import os
 
 from django.conf import settings
-from django.utils import timezone
+from django.utils import importlib, timezone
 
-from nodewatcher.core import models as core_models
+from nodewatcher.core import models as core_models, routerid as core_routerid
 from nodewatcher.core.monitor import models as monitor_models, processors as monitor_processors
-from nodewatcher.utils import which, ipaddr
+
+from . import engine as rtt_engine
 
 
 class RttMeasurement(monitor_processors.NetworkProcessor):
@@ -16,9 +14,21 @@ class RttMeasurement(monitor_processors.NetworkProcessor):
     Performs RTT measurements to nodes using different packet sizes.
     """
 
+    sharded = True
+
     PACKET_SIZES = (56, 100, 500, 1000, 1480)
     PACKET_COUNT = 10
 
+    def get_backend(self):
+        """
+        Returns an instance of the configured ICMP backend.
+        """
+
+        backend = getattr(settings, 'MEASUREMENT_RTT_BACKEND', 'nodewatcher.modules.monitor.measurements.rtt.engine.IcmpSocketBackend')
+        i = backend.rfind('.')
+        module, attr = backend[:i], backend[i + 1:]
+        return getattr(importlib.import_module(module), attr)()
+
     def process(self, context, nodes):
         """
         Performs network-wide processing and selects the nodes that will be processed
@@ -29,12 +39,6 @@ class RttMeasurement(monitor_processors.NetworkProcessor):
         :return: A (possibly) modified context and a (possibly) modified set of nodes
         """
 
-        # Detect the location of fping binary
-        fping = which.which('fping')
-        if not fping:
-            self.logger.error("Unable to find 'fping' binary!")
-            return context, nodes
-
         # Check if source node for measurements is configured and valid
         source_node_id = getattr(settings, 'MEASUREMENT_SOURCE_NODE', None)
         try:
@@ -44,105 +48,43 @@ class RttMeasurement(monitor_processors.NetworkProcessor):
             return context, nodes
 
         # Prepare a list of node IPv4 addresses
-        node_ips = [
-            str(node.config.core.routerid(queryset=True).get(rid_family='ipv4').router_id)
-            for node in nodes
-        ]
+        index = core_routerid.get_index()
+        node_ips = [index.get_router_id(node.pk, 'ipv4') for node in nodes]
+        node_ips = [router_id for router_id in node_ips if router_id is not None]
 
         # If there are no node IPs skip the measurement procedure
         if not node_ips:
             self.logger.warning("No nodes selected for measurement. Skipping RTT measurement.")
             return context, nodes
 
-        # Perform ping tests of different sizes
-        processes = []
-        threads = []
-        outputs = collections.deque()
-        metadata = collections.deque()
-        for size in self.PACKET_SIZES:
-            args = [
-                fping,
-                '-q',
-                '-p', '20',
-                '-b', str(size),
-                '-C', str(self.PACKET_COUNT),
-            ]
-
-            self.logger.info("Performing ICMP ECHO RTT measurements with %d byte packets to %d nodes." % (size, len(node_ips)))
-            process = subprocess.Popen(
-                args,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                close_fds=True,
-            )
-            processes.append(process)
-
-            def communicator(node_ips, size, process):
-                t0 = timezone.now()
-                data = process.communicate(("\n".join(node_ips)) + '\n')[0]
-                t1 = timezone.now()
-                outputs.append((size, [x.split() for x in data.strip().split('\n')]))
-                metadata.append((size, t0, t1))
-
-            thread = threading.Thread(target=communicator, args=(node_ips, size, process))
-            thread.daemon = True
-            threads.append(thread)
-            thread.start()
-
-        for t in threads:
-            t.join()
-        for p in processes:
-            try:
-                p.kill()
-            except OSError:
-                pass
+        engine = rtt_engine.RttEngine(
+            self.get_backend(),
+            self.PACKET_SIZES,
+            self.PACKET_COUNT,
+            rate=getattr(settings, 'MEASUREMENT_RTT_RATE', 1000),
+            timeout=getattr(settings, 'MEASUREMENT_RTT_TIMEOUT', 1.0),
+            identifier=os.getpid(),
+        )
+
+        self.logger.info("Performing ICMP ECHO RTT measurements with %d packet sizes to %d nodes." % (len(self.PACKET_SIZES), len(node_ips)))
+        start = timezone.now()
+        try:
+            context.rtt.results, _, _ = engine.measure(sorted(set(node_ips)))
+        except rtt_engine.BackendError, error:
+            self.logger.error("Unable to perform RTT measurements: %s" % error)
+            return context, nodes
+        end = timezone.now()
 
         self.logger.info("All ICMP ECHO RTT measurements completed.")
 
+        # Packets of all sizes are interleaved, so all measurements share the same interval
         context.rtt.meta = {}
-        for size, start, end in metadata:
+        for size in self.PACKET_SIZES:
             context.rtt.meta[size] = {
                 'start': start,
                 'end': end,
             }
 
-        context.rtt.results = {}
-        for size, results in outputs:
-            for result in results:
-                try:
-                    node_ip = ipaddr.IPAddress(result[0])
-                except ValueError:
-                    # fping error message for a specific packet
-                    continue
-
-                try:
-                    rtt = [float(x) for x in result[2:] if x != '-']
-                except ValueError:
-                    # TODO: Handle output for duplicate packets
-                    continue
-
-                n = len(rtt)
-                s = sum(rtt)
-                ss = sum([x ** 2 for x in rtt])
-
-                if n == 0:
-                    std = None
-                elif n == 1:
-                    std = 0.0
-                else:
-                    std = math.sqrt((float(n) * ss - s ** 2) / (n * (n - 1)))
-
-                context.rtt.results.setdefault(str(node_ip), {})[size] = {
-                    'sent': self.PACKET_COUNT,
-                    'successful': n,
-                    'failed': max(0, self.PACKET_COUNT - n),
-                    'rtt_min': min(rtt) if rtt else None,
-                    'rtt_max': max(rtt) if rtt else None,
-                    'rtt_avg': (float(s) / n) if rtt else None,
-                    'rtt_std': std,
-                }
-
         return context, nodes
 
 
@@ -161,7 +103,7 @@ class StoreNode(monitor_processors.NodeProcessor):
         """
 
         try:
-            router_id = node.config.core.routerid(queryset=True).get(rid_family='ipv4').router_id
+            router_id = core_routerid.get_router_id(node.pk, 'ipv4')
             results = context.rtt.results.get(router_id, None)
             context.node_available = False
             context.node_responds = False
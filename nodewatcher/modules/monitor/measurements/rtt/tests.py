@@ -0,0 +1,52 @@
+import unittest
+
+from . import engine
+
+
+class RttEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lost = []
+
+        def responder(address, size):
+            if address == '10.0.0.3':
+                return None
+            elif address == '10.0.0.2':
+                # Lose every other packet
+                self.lost.append(address)
+                if len(self.lost) % 2:
+                    return None
+
+            return 0.001 * int(address.split('.')[-1]) + size / 100000.0
+
+        self.backend = engine.FakeBackend(responder)
+
+    def test_measure(self):
+        addresses = ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+        rtt = engine.RttEngine(self.backend, (56, 1000), 4, rate=100, timeout=0.5)
+        results, start, end = rtt.measure(addresses)
+
+        self.assertEqual(self.backend.sent, 3 * 2 * 4)
+        self.assertEqual(sorted(results.keys()), addresses)
+        self.assertGreater(end, start)
+
+        result = results['10.0.0.1'][56]
+        self.assertEqual(result['sent'], 4)
+        self.assertEqual(result['successful'], 4)
+        self.assertEqual(result['failed'], 0)
+        self.assertAlmostEqual(result['rtt_avg'], 1.56)
+        self.assertAlmostEqual(result['rtt_min'], 1.56)
+        self.assertAlmostEqual(result['rtt_max'], 1.56)
+        self.assertAlmostEqual(result['rtt_std'], 0.0)
+        self.assertAlmostEqual(results['10.0.0.1'][1000]['rtt_avg'], 11.0)
+
+        self.assertEqual(results['10.0.0.2'][56]['successful'] + results['10.0.0.2'][1000]['successful'], 4)
+
+        result = results['10.0.0.3'][56]
+        self.assertEqual(result['successful'], 0)
+        self.assertEqual(result['failed'], 4)
+        self.assertIsNone(result['rtt_avg'])
+        self.assertIsNone(result['rtt_std'])
+
+    def test_checksum(self):
+        packet = engine.build_echo_request(1, 2, 'payload!')
+        self.assertEqual(engine.checksum(packet), 0)
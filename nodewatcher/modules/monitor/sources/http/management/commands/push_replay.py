@@ -0,0 +1,108 @@
+import itertools
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import replay
+
+
+class Command(BaseCommand):
+    args = "<archive>"
+    help = "Replays HTTP push requests captured via MONITOR_HTTP_PUSH_RECORD and reports latency " \
+        "percentiles and backlog growth."
+    requires_model_validation = True
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--target',
+            dest='target',
+            default='pipeline',
+            type='choice',
+            choices=['endpoint', 'pipeline', 'queue'],
+            help='Replay against the push endpoint (endpoint), directly into the push run (pipeline) '
+                 'or into the push run via Celery workers (queue)',
+        ),
+        make_option(
+            '--url',
+            dest='url',
+            default=None,
+            help='Base URL of the push endpoint, for example http://localhost:8000/push/http/',
+        ),
+        make_option(
+            '--rate',
+            dest='rate',
+            default=None,
+            type=float,
+            help='Number of requests per second (by default, original request timing is used)',
+        ),
+        make_option(
+            '--speed',
+            dest='speed',
+            default=1.0,
+            type=float,
+            help='Speed-up factor applied to original request timing',
+        ),
+        make_option(
+            '--concurrency',
+            dest='concurrency',
+            default=10,
+            type=int,
+            help='Number of concurrent requests',
+        ),
+        make_option(
+            '--limit',
+            dest='limit',
+            default=None,
+            type=int,
+            help='Only replay the given number of requests',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Missing archive filename argument!")
+
+        if options['target'] == 'endpoint':
+            if not options['url']:
+                raise CommandError("Replaying against the push endpoint requires --url!")
+            target = replay.EndpointTarget(options['url'])
+        else:
+            target = replay.PipelineTarget(queue=options['target'] == 'queue')
+
+        records = replay.read_archive(args[0])
+        if options['limit'] is not None:
+            records = itertools.islice(records, options['limit'])
+
+        replayer = replay.Replayer(
+            target,
+            concurrency=options['concurrency'],
+            rate=options['rate'],
+            speed=options['speed'],
+            report=self.report,
+        )
+
+        try:
+            statistics = replayer.replay(records)
+        except IOError, error:
+            raise CommandError("Unable to read archive: %s" % error)
+
+        self.stdout.write("Replay completed.\n")
+        self.report(None, statistics)
+        self.stdout.write("Backlog samples (seconds, queued requests): %s\n" % ", ".join([
+            "%.0f: %d" % sample for sample in replayer.backlog
+        ]))
+
+    def report(self, elapsed, statistics):
+        def format_latency(value):
+            return "%.3f s" % value if value is not None else "-"
+
+        self.stdout.write("%s%d completed, %d failed, latency p50 %s, p90 %s, p99 %s, max %s, backlog %d (max %d)\n" % (
+            "[%.0f s] " % elapsed if elapsed is not None else "",
+            statistics['completed'],
+            statistics['failures'],
+            format_latency(statistics['p50']),
+            format_latency(statistics['p90']),
+            format_latency(statistics['p99']),
+            format_latency(statistics['max']),
+            statistics['backlog'],
+            statistics['max_backlog'],
+        ))
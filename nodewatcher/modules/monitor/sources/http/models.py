@@ -1,5 +1,8 @@
+from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
+import json_field
+
 # Import required for node.config registration point.
 from nodewatcher.core import models as core_models
 from nodewatcher.core.registry import registration, fields as registry_fields
@@ -25,3 +28,16 @@ class HttpTelemetrySourceConfig(registration.bases.NodeConfigRegistryItem):
 registration.point('node.config').register_choice('core.telemetry.http#source', registration.Choice('poll', _("Periodic Poll")))
 registration.point('node.config').register_choice('core.telemetry.http#source', registration.Choice('push', _("Push From Node")))
 registration.point('node.config').register_item(HttpTelemetrySourceConfig)
+
+
+class HttpTelemetryState(models.Model):
+    """
+    Per-node HTTP telemetry state that is kept between monitoring cycles.
+    """
+
+    node = models.OneToOneField(core_models.Node, related_name='+')
+    # Telemetry format version that the node has last used
+    version = models.PositiveIntegerField(null=True)
+    # Digests of telemetry subtrees that have last been successfully processed by
+    # each processor, used to skip processing of unchanged telemetry
+    digests = json_field.JSONField(null=True)
@@ -7,11 +7,26 @@ class HttpTelemetryParseFailed(Exception):
     pass
 
 
+class HttpTelemetryFetchFailed(HttpTelemetryParseFailed):
+    """
+    Raised when telemetry could not be fetched from the node at all, in which
+    case other telemetry feeds should not be tried either.
+    """
+
+    pass
+
+
 class HttpTelemetryParser(object):
     """
     A simple class for obtaining nodewatcher telemetry in HTTP format.
     """
 
+    # URLs of telemetry feeds for each supported format version
+    FEED_URLS = {
+        3: '/nodewatcher/feed',
+        2: '/cgi-bin/nodewatcher',
+    }
+
     def __init__(self, host=None, port=None, data=None):
         """
         Class constructor.
@@ -25,24 +40,68 @@ class HttpTelemetryParser(object):
         self.port = port
         self.data = data
         self.node_responds = False
+        self.version = None
+        self._connection = None
 
-    def parse_into(self, tree=None):
+    def parse_into(self, tree=None, version=None):
         """
-        Fetches and parses data from the daemon via HTTP.
+        Fetches and parses data from the daemon via HTTP. The feed of the given
+        version is tried first and the other feed is only tried when the node
+        responds, but does not provide a valid feed. The format of the feed is
+        determined from the fetched data.
 
         :param tree: Target dictionary where data should be parsed into
+        :param version: Optional format version that the node has last used
         :return: Dictionary with parsed data
         """
 
+        if self.data is not None:
+            return self.parse_data(self.data, tree)
+
+        versions = [3, 2]
+        if version in versions:
+            versions.remove(version)
+            versions.insert(0, version)
+
         try:
-            return self.parse_into_v3(tree)
-        except:
-            # We should also try to parse the legacy (v2) format
-            return self.parse_into_v2(tree)
+            for index, version in enumerate(versions):
+                try:
+                    return self.parse_data(self.fetch_data(self.FEED_URLS[version]), tree)
+                except HttpTelemetryFetchFailed:
+                    raise
+                except HttpTelemetryParseFailed:
+                    if index == len(versions) - 1:
+                        raise
+        finally:
+            self.close()
+
+    def parse_data(self, data, tree=None):
+        """
+        Parses already fetched data, detecting its format.
+
+        :param data: Raw telemetry data
+        :param tree: Target dictionary where data should be parsed into
+        :return: Dictionary with parsed data
+        """
+
+        if data.lstrip().startswith('{'):
+            return self.parse_into_v3(tree, data)
+        else:
+            return self.parse_into_v2(tree, data)
+
+    def close(self):
+        """
+        Closes the HTTP connection to the node.
+        """
+
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
 
     def fetch_data(self, url):
         """
-        Fetches data from the specified URL.
+        Fetches data from the specified URL. The connection is kept open, so that
+        further requests may reuse it.
 
         :param url: URL template
         :return: Fetched data
@@ -52,49 +111,63 @@ class HttpTelemetryParser(object):
             self.node_responds = True
             return self.data
 
-        # Create our own HTTP connection so we can use a successful TCP connection as
-        # a signal that the node is up.
-        connection = httplib.HTTPConnection(self.host, self.port, timeout=15)
-        try:
+        if self._connection is None:
+            # Create our own HTTP connection so we can use a successful TCP connection as
+            # a signal that the node is up.
+            self._connection = httplib.HTTPConnection(self.host, self.port, timeout=15)
             try:
-                connection.connect()
+                self._connection.connect()
                 self.node_responds = True
             except IOError, error:
                 # Receiving a TCP RST is also a response.
                 if error.errno in (errno.ECONNREFUSED, errno.ECONNRESET):
                     self.node_responds = True
 
-                raise HttpTelemetryParseFailed
+                self.close()
+                raise HttpTelemetryFetchFailed
 
-            try:
-                connection.request('GET', url)
-                return connection.getresponse().read()
-            except (httplib.HTTPException, IOError):
-                raise HttpTelemetryParseFailed
-        finally:
-            connection.close()
+        try:
+            self._connection.request('GET', url)
+            response = self._connection.getresponse()
+            data = response.read()
+        except (httplib.HTTPException, IOError):
+            self.close()
+            raise HttpTelemetryFetchFailed
+
+        if response.status != httplib.OK:
+            raise HttpTelemetryParseFailed
 
-    def parse_into_v3(self, tree=None):
+        return data
+
+    def parse_into_v3(self, tree=None, data=None):
         """
-        Fetches and parses data from the daemon via HTTP (legacy feed).
+        Fetches and parses data from the daemon via HTTP (JSON feed). When the target
+        tree supports lazy conversion, nested dictionaries are only converted into
+        tree instances once they are accessed.
 
         :param tree: Target dictionary where data should be parsed into
+        :param data: Optional already fetched data
         :return: Dictionary with parsed data
         """
 
-        data = self.fetch_data('/nodewatcher/feed')
+        if data is None:
+            data = self.fetch_data(self.FEED_URLS[3])
 
         try:
             data = json.loads(data)
         except ValueError:
             raise HttpTelemetryParseFailed
 
+        if not isinstance(data, dict):
+            raise HttpTelemetryParseFailed
+
         if tree is None:
             tree = {}
 
         # Set version metadata to JSON (v3) format
         tree['_meta'] = tree.__class__()
         tree['_meta']['version'] = 3
+        self.version = 3
 
         # Convert data to nodewatcher context format
         def convert_to_context(data):
@@ -107,22 +180,29 @@ class HttpTelemetryParser(object):
 
             return result
 
-        for key, value in data.iteritems():
-            key = key.split('.')
-            value = convert_to_context(value)
-            reduce(lambda x, y: x.setdefault(y, x.__class__()), key[:-1], tree)[key[-1]] = value
+        lazy = getattr(tree, 'lazy_conversion', False)
+        try:
+            for key, value in data.iteritems():
+                key = key.split('.')
+                if not lazy and isinstance(value, dict):
+                    value = convert_to_context(value)
+                reduce(lambda x, y: x.setdefault(y, x.__class__()), key[:-1], tree)[key[-1]] = value
+        except (AttributeError, TypeError):
+            raise HttpTelemetryParseFailed
 
         return tree
 
-    def parse_into_v2(self, tree=None):
+    def parse_into_v2(self, tree=None, data=None):
         """
         Fetches and parses data from the daemon via HTTP (legacy feed).
 
         :param tree: Target dictionary where data should be parsed into
+        :param data: Optional already fetched data
         :return: Dictionary with parsed data
         """
 
-        data = self.fetch_data('/cgi-bin/nodewatcher')
+        if data is None:
+            data = self.fetch_data(self.FEED_URLS[2])
 
         if tree is None:
             tree = {}
@@ -130,6 +210,7 @@ class HttpTelemetryParser(object):
         # Set version metadata to legacy (v2) format
         tree['_meta'] = tree.__class__()
         tree['_meta']['version'] = 2
+        self.version = 2
 
         for line in data.strip().split('\n'):
             # Skip all non machine-parsable comments
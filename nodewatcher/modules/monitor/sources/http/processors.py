@@ -1,10 +1,20 @@
-from nodewatcher.core import models as core_models
+import hashlib
+import json
+import time
+
+from django.conf import settings
+
+from nodewatcher.core import models as core_models, routerid as core_routerid
 from nodewatcher.core.monitor import processors as monitor_processors, events as monitor_events
 
-from . import parser as telemetry_parser
+from . import models as telemetry_models, parser as telemetry_parser
 
+# Number of seconds after which unchanged telemetry is processed again in any case, so that
+# any external modifications of monitoring data are eventually corrected
+DIGEST_MAX_AGE = getattr(settings, 'MONITOR_HTTP_DIGEST_MAX_AGE', 3600)
 
-class HTTPTelemetryContext(monitor_processors.ProcessorContext):
+
+class HTTPTelemetryContext(monitor_processors.LazyProcessorContext):
     """
     Augmented context for HTTP telemetry information that can be used
     by store/analyze modules for some common functionality like checking
@@ -54,6 +64,113 @@ class HTTPTelemetryContext(monitor_processors.ProcessorContext):
 
         return 0
 
+    def get_subtree(self, path):
+        """
+        Returns the telemetry subtree under the given path without creating any
+        missing intermediate contexts.
+
+        :param path: Subtree path (dot-separated namespace)
+        :return: Subtree or None if it does not exist
+        """
+
+        tree = self
+        for part in path.split('.'):
+            try:
+                tree = dict.__getitem__(tree, part)
+            except (KeyError, TypeError):
+                return None
+
+        return tree
+
+    def get_digest(self, path):
+        """
+        Returns a digest of the telemetry subtree under the given path.
+
+        :param path: Subtree path (dot-separated namespace)
+        :return: Hex digest or None if telemetry is not available
+        """
+
+        if self.get_version() != 3:
+            return None
+
+        digests = getattr(self, '_digests', None)
+        if digests is None:
+            digests = self._digests = {}
+
+        if path not in digests:
+            data = json.dumps(self.get_subtree(path), sort_keys=True, separators=(',', ':'))
+            digests[path] = hashlib.sha1(data).hexdigest()
+
+        return digests[path]
+
+    def is_unchanged(self, consumer, path):
+        """
+        Returns true if the telemetry subtree under the given path is the same as
+        when it was last successfully processed by the given consumer.
+
+        :param consumer: Consumer identifier (usually the processor name)
+        :param path: Subtree path (dot-separated namespace)
+        """
+
+        stored = getattr(self, '_stored_digests', None)
+        if not stored:
+            return False
+
+        try:
+            digest, timestamp = stored[consumer][path]
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        if time.time() - timestamp > DIGEST_MAX_AGE:
+            return False
+
+        return digest is not None and digest == self.get_digest(path)
+
+    def mark_processed(self, consumer, path):
+        """
+        Records that the telemetry subtree under the given path has been successfully
+        processed by the given consumer. Digests are stored when the HTTP telemetry
+        processor is cleaned up.
+
+        :param consumer: Consumer identifier (usually the processor name)
+        :param path: Subtree path (dot-separated namespace)
+        """
+
+        processed = getattr(self, '_processed', None)
+        if processed is None:
+            return
+
+        digest = self.get_digest(path)
+        if digest is not None:
+            processed.setdefault(consumer, {})[path] = digest
+
+
+def skip_if_unchanged(*paths):
+    """
+    A decorator for node processor methods, which skips the processor when all the
+    given telemetry subtrees are the same as when they were last processed by it.
+    It should be applied after `depends_on_context` for the HTTP telemetry context.
+
+    :param paths: Paths of telemetry subtrees consumed by the processor
+    """
+
+    def decorator(f):
+        def wrapper(self, context, *args, **kwargs):
+            consumer = self.__class__.__name__
+            if all([context.http.is_unchanged(consumer, path) for path in paths]):
+                return context
+
+            context = f(self, context, *args, **kwargs)
+
+            for path in paths:
+                context.http.mark_processed(consumer, path)
+
+            return context
+
+        return wrapper
+
+    return decorator
+
 
 class HTTPTelemetry(monitor_processors.NodeProcessor):
     """
@@ -94,18 +211,34 @@ class HTTPTelemetry(monitor_processors.NodeProcessor):
                     return context
 
                 if not push:
-                    router_id = node.config.core.routerid(queryset=True).get(rid_family='ipv4').router_id
-                    parser = telemetry_parser.HttpTelemetryParser(router_id, 80)
+                    router_id = core_routerid.get_router_id(node.pk, 'ipv4')
+                    parser = telemetry_parser.HttpTelemetryParser(router_id, getattr(settings, 'MONITOR_HTTP_PORT', 80))
                 else:
                     parser = telemetry_parser.HttpTelemetryParser(data=context.push.data)
 
-                # Fetch information from the router and merge it into local context
                 try:
-                    parser.parse_into(http_context)
+                    state = telemetry_models.HttpTelemetryState.objects.get(node=node)
+                except telemetry_models.HttpTelemetryState.DoesNotExist:
+                    state = None
+
+                # Fetch information from the router and merge it into local context, starting
+                # with the feed version that the node has last used
+                try:
+                    parser.parse_into(http_context, version=state.version if state else None)
                     if http_context._meta.version == 2:
                         # TODO: Add a warning that the node is using a legacy feed
                         pass
                     http_context.successfully_parsed = True
+
+                    if state is None or state.version != parser.version:
+                        telemetry_models.HttpTelemetryState.objects.update_or_create(
+                            node=node,
+                            defaults={'version': parser.version},
+                        )
+
+                    # Digests of previously processed telemetry
+                    http_context._stored_digests = (state.digests if state else None) or {}
+                    http_context._processed = {}
                     context.node_responds = True
 
                     # Remove the warning if it is present.
@@ -126,6 +259,31 @@ class HTTPTelemetry(monitor_processors.NodeProcessor):
 
         return context
 
+    def cleanup(self, context, node):
+        """
+        Stores digests of telemetry subtrees that have been successfully processed.
+
+        :param context: Current context
+        :param node: Node that is being processed
+        """
+
+        if not isinstance(context.get('http'), HTTPTelemetryContext):
+            return
+
+        processed = getattr(context.http, '_processed', None)
+        if not processed:
+            return
+
+        digests = dict(context.http._stored_digests)
+        timestamp = time.time()
+        for consumer, paths in processed.items():
+            consumer_digests = dict(digests.get(consumer, {}))
+            for path, digest in paths.items():
+                consumer_digests[path] = [digest, timestamp]
+            digests[consumer] = consumer_digests
+
+        telemetry_models.HttpTelemetryState.objects.update_or_create(node=node, defaults={'digests': digests})
+
 
 class HTTPGetPushedNode(monitor_processors.NetworkProcessor):
     """
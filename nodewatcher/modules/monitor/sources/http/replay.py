@@ -0,0 +1,356 @@
+import fcntl
+import httplib
+import Queue
+import struct
+import threading
+import time
+import urlparse
+import zlib
+
+from django.conf import settings
+from django.db import connection
+
+from nodewatcher.core.monitor import tasks as monitor_tasks
+
+# Record header: timestamp, UUID length, certificate length, body length
+RECORD_HEADER = struct.Struct('!dIII')
+# Length of a compressed record
+RECORD_LENGTH = struct.Struct('!I')
+
+
+class PushRecord(object):
+    """
+    A captured HTTP push request.
+    """
+
+    __slots__ = ('timestamp', 'uuid', 'certificate', 'body')
+
+    def __init__(self, timestamp, uuid, certificate, body):
+        """
+        Class constructor.
+
+        :param timestamp: Time when the request has been received
+        :param uuid: Node UUID
+        :param certificate: PEM-encoded client certificate or None
+        :param body: Request body
+        """
+
+        self.timestamp = timestamp
+        self.uuid = uuid
+        self.certificate = certificate
+        self.body = body
+
+    def encode(self):
+        """
+        Returns a compressed representation of this record.
+        """
+
+        uuid = self.uuid.encode('utf8')
+        certificate = (self.certificate or '').encode('utf8')
+        payload = zlib.compress(
+            RECORD_HEADER.pack(self.timestamp, len(uuid), len(certificate), len(self.body)) + uuid + certificate + self.body
+        )
+        return RECORD_LENGTH.pack(len(payload)) + payload
+
+    @classmethod
+    def decode(cls, payload):
+        """
+        Creates a record from its compressed representation.
+
+        :param payload: Compressed record (without the length prefix)
+        """
+
+        payload = zlib.decompress(payload)
+        timestamp, uuid_length, certificate_length, body_length = RECORD_HEADER.unpack_from(payload)
+        offset = RECORD_HEADER.size
+        uuid = payload[offset:offset + uuid_length].decode('utf8')
+        offset += uuid_length
+        certificate = payload[offset:offset + certificate_length].decode('utf8') or None
+        offset += certificate_length
+        body = payload[offset:offset + body_length]
+
+        return cls(timestamp, uuid, certificate, body)
+
+
+def record_push(filename, uuid, body, certificate):
+    """
+    Appends a push request to an archive. Multiple processes may append to the
+    same archive concurrently.
+
+    :param filename: Archive filename
+    :param uuid: Node UUID
+    :param body: Request body
+    :param certificate: PEM-encoded client certificate or None
+    """
+
+    data = PushRecord(time.time(), uuid, certificate, body).encode()
+    with open(filename, 'ab') as archive:
+        fcntl.flock(archive, fcntl.LOCK_EX)
+        try:
+            archive.write(data)
+        finally:
+            fcntl.flock(archive, fcntl.LOCK_UN)
+
+
+def read_archive(filename):
+    """
+    Iterates over push requests stored in an archive.
+
+    :param filename: Archive filename
+    """
+
+    with open(filename, 'rb') as archive:
+        while True:
+            header = archive.read(RECORD_LENGTH.size)
+            if len(header) < RECORD_LENGTH.size:
+                break
+
+            length, = RECORD_LENGTH.unpack(header)
+            payload = archive.read(length)
+            if len(payload) < length:
+                # Truncated record at the end of an archive that is still being written
+                break
+
+            yield PushRecord.decode(payload)
+
+
+class EndpointTarget(object):
+    """
+    Replays push requests against the HTTP push endpoint.
+    """
+
+    def __init__(self, url):
+        """
+        Class constructor.
+
+        :param url: Base URL of the push endpoint (the node UUID is appended to it)
+        """
+
+        self.url = urlparse.urlparse(url)
+        self._local = threading.local()
+
+    def _get_connection(self):
+        if getattr(self._local, 'connection', None) is None:
+            if self.url.scheme == 'https':
+                self._local.connection = httplib.HTTPSConnection(self.url.netloc, timeout=60)
+            else:
+                self._local.connection = httplib.HTTPConnection(self.url.netloc, timeout=60)
+
+        return self._local.connection
+
+    def send(self, record):
+        headers = {'Content-Type': 'application/json'}
+        if record.certificate:
+            # Certificates are recorded as received from the HTTP server, which already
+            # replaces line breaks, but a header can never contain them
+            headers['X-SSL-Certificate'] = record.certificate.replace('\n', '\t')
+
+        path = '%s/%s' % (self.url.path.rstrip('/'), record.uuid)
+        try:
+            conn = self._get_connection()
+            conn.request('POST', path, record.body, headers)
+            response = conn.getresponse()
+            response.read()
+        except (httplib.HTTPException, IOError):
+            self._local.connection = None
+            raise
+
+        if response.status != 200:
+            raise IOError("Push endpoint responded with status %d." % response.status)
+
+    def close(self):
+        if getattr(self._local, 'connection', None) is not None:
+            self._local.connection.close()
+            self._local.connection = None
+
+
+class PipelineTarget(object):
+    """
+    Replays push requests directly into the push monitoring run. Requests are either
+    processed in-process or queued to Celery workers, in which case a result backend
+    is required to measure latency.
+    """
+
+    def __init__(self, queue=False):
+        """
+        Class constructor.
+
+        :param queue: Should requests be queued to Celery workers
+        """
+
+        self.queue = queue
+
+    def send(self, record):
+        kwargs = {
+            'run_id': settings.MONITOR_HTTP_PUSH_RUN,
+            'base_context': {
+                'push': {
+                    'source': record.uuid,
+                    'data': record.body,
+                },
+                'identity': {
+                    'certificate': record.certificate,
+                },
+            },
+        }
+
+        if self.queue:
+            monitor_tasks.run_pipeline.apply_async(kwargs=kwargs).get(propagate=True)
+        else:
+            monitor_tasks.run_pipeline.apply(kwargs=kwargs).get(propagate=True)
+
+    def close(self):
+        if not self.queue:
+            connection.close()
+
+
+def percentile(values, fraction):
+    """
+    Returns a percentile of sorted values.
+
+    :param values: Sorted list of values
+    :param fraction: Percentile as a fraction between 0 and 1
+    """
+
+    if not values:
+        return None
+
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+class Replayer(object):
+    """
+    Replays push requests at a configurable rate and concurrency. Latency of each
+    request is measured from the time it should have been sent, so it includes any
+    time the request has spent waiting for a free worker.
+    """
+
+    def __init__(self, target, concurrency=10, rate=None, speed=1.0, report=None, report_interval=10):
+        """
+        Class constructor.
+
+        :param target: Replay target
+        :param concurrency: Number of concurrent requests
+        :param rate: Number of requests per second; when not set, original request
+          timing is used
+        :param speed: Speed-up factor applied to original request timing
+        :param report: Optional callable, which is called periodically with the current
+          statistics
+        :param report_interval: Number of seconds between reports
+        """
+
+        self.target = target
+        self.concurrency = concurrency
+        self.rate = rate
+        self.speed = speed
+        self.report = report
+        self.report_interval = report_interval
+
+        self.latencies = []
+        self.failures = 0
+        self.backlog = []
+        self._queue = Queue.Queue()
+        self._lock = threading.Lock()
+        self._started = 0
+
+    def _worker(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                scheduled, record = item
+                with self._lock:
+                    self._started += 1
+
+                try:
+                    self.target.send(record)
+                    failed = False
+                except KeyboardInterrupt:
+                    raise
+                except:
+                    failed = True
+
+                latency = time.time() - scheduled
+                with self._lock:
+                    if failed:
+                        self.failures += 1
+                    else:
+                        self.latencies.append(latency)
+        finally:
+            self.target.close()
+
+    def get_statistics(self):
+        """
+        Returns current replay statistics.
+        """
+
+        with self._lock:
+            latencies = sorted(self.latencies)
+            failures = self.failures
+
+        return {
+            'completed': len(latencies),
+            'failures': failures,
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p99': percentile(latencies, 0.99),
+            'max': latencies[-1] if latencies else None,
+            'backlog': self.backlog[-1][1] if self.backlog else 0,
+            'max_backlog': max([backlog for elapsed, backlog in self.backlog] or [0]),
+        }
+
+    def _sample_backlog(self, start, submitted):
+        with self._lock:
+            backlog = submitted - self._started
+
+        self.backlog.append((time.time() - start, backlog))
+
+    def replay(self, records):
+        """
+        Replays the given records.
+
+        :param records: An iterable of push records
+        :return: Final statistics
+        """
+
+        workers = []
+        for index in xrange(self.concurrency):
+            thread = threading.Thread(target=self._worker)
+            thread.daemon = True
+            thread.start()
+            workers.append(thread)
+
+        start = last_report = time.time()
+        first_timestamp = None
+        submitted = 0
+        for index, record in enumerate(records):
+            if self.rate:
+                offset = index / float(self.rate)
+            else:
+                if first_timestamp is None:
+                    first_timestamp = record.timestamp
+                offset = (record.timestamp - first_timestamp) / self.speed
+
+            scheduled = start + offset
+            delay = scheduled - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            self._queue.put((scheduled, record))
+            submitted += 1
+
+            if time.time() - last_report >= self.report_interval:
+                last_report = time.time()
+                self._sample_backlog(start, submitted)
+                if self.report is not None:
+                    self.report(last_report - start, self.get_statistics())
+
+        for thread in workers:
+            self._queue.put(None)
+        for thread in workers:
+            thread.join()
+
+        self._sample_backlog(start, submitted)
+        return self.get_statistics()
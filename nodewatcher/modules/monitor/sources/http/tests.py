@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
 
-from . import parser
+from nodewatcher.core.monitor import processors as monitor_processors
+
+from . import parser, replay
 
 
 class TestContext(dict):
@@ -70,3 +74,44 @@ general.buffers: 1788
         self.assertEquals(tree['core']['general']['uuid'], '64840ad9-aac1-4494-b4d1-9de5d8cbedd9')
 
         self.assertEquals(tree['_meta']['version'], 3)
+
+    def test_parser_v3_lazy(self):
+        p = parser.HttpTelemetryParser(data='{ "core.general": { "uuid": "64840ad9-aac1-4494-b4d1-9de5d8cbedd9", "hardware": { "board": "tl-wr741nd-v4" }, "_meta": { "version": 4 } } }')
+        tree = monitor_processors.LazyProcessorContext()
+        p.parse_into(tree)
+
+        self.assertEquals(p.version, 3)
+        self.assertIsInstance(tree['core'], monitor_processors.LazyProcessorContext)
+        # Subtrees are only converted on access
+        self.assertIs(type(dict.__getitem__(tree['core'], 'general')), dict)
+        self.assertEquals(tree.core.general.hardware.board, 'tl-wr741nd-v4')
+        self.assertIsInstance(dict.__getitem__(tree['core'], 'general'), monitor_processors.LazyProcessorContext)
+        self.assertEquals(tree.core.general._meta.version, 4)
+
+    def test_parser_invalid(self):
+        p = parser.HttpTelemetryParser(data='{ "core.general": ')
+        self.assertRaises(parser.HttpTelemetryParseFailed, p.parse_into)
+
+
+class PushArchiveTestCase(unittest.TestCase):
+    def test_archive(self):
+        fd, filename = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            replay.record_push(filename, u'64840ad9-aac1-4494-b4d1-9de5d8cbedd9', '{ "core.general": {} }', None)
+            replay.record_push(filename, u'64840ad9-aac1-4494-b4d1-9de5d8cbedd9', '{}', u'-----BEGIN CERTIFICATE-----')
+
+            records = list(replay.read_archive(filename))
+            self.assertEqual(len(records), 2)
+            self.assertEqual(records[0].uuid, u'64840ad9-aac1-4494-b4d1-9de5d8cbedd9')
+            self.assertEqual(records[0].body, '{ "core.general": {} }')
+            self.assertIsNone(records[0].certificate)
+            self.assertEqual(records[1].certificate, u'-----BEGIN CERTIFICATE-----')
+            self.assertLessEqual(records[0].timestamp, records[1].timestamp)
+        finally:
+            os.remove(filename)
+
+    def test_percentile(self):
+        self.assertIsNone(replay.percentile([], 0.5))
+        self.assertEqual(replay.percentile([1, 2, 3, 4, 5], 0.5), 3)
+        self.assertEqual(replay.percentile([1, 2, 3, 4, 5], 0.99), 5)
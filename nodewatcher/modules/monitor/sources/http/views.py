@@ -1,3 +1,5 @@
+import logging
+
 from django import http
 from django.conf import settings
 from django.views import generic
@@ -6,6 +8,11 @@ from django.utils import decorators
 
 from nodewatcher.core.monitor import tasks as monitor_tasks
 
+from . import replay
+
+# Logger instance
+logger = logging.getLogger('monitor.sources.http')
+
 
 class HttpPushEndpoint(generic.View):
     @decorators.method_decorator(csrf.csrf_exempt)
@@ -17,6 +24,19 @@ class HttpPushEndpoint(generic.View):
         Handles HTTP push requests from nodewatcher-agent.
         """
 
+        # We assume that the HTTP server is configured so that it populates
+        # the X-SSL-Certificate header with the PEM-encoded certificate.
+        certificate = request.META.get('HTTP_X_SSL_CERTIFICATE', None)
+
+        # Capture the request for later replay when configured.
+        record_filename = getattr(settings, 'MONITOR_HTTP_PUSH_RECORD', None)
+        if record_filename:
+            try:
+                replay.record_push(record_filename, uuid, request.body, certificate)
+            except (IOError, OSError), error:
+                # Recording is best-effort and must never cause a push to be dropped
+                logger.warning("Failed to record push request from '%s': %s" % (uuid, error))
+
         # Schedule a new push task.
         monitor_tasks.run_pipeline.delay(
             run_id=settings.MONITOR_HTTP_PUSH_RUN,
@@ -26,9 +46,7 @@ class HttpPushEndpoint(generic.View):
                     'data': request.body,
                 },
                 'identity': {
-                    # We assume that the HTTP server is configured so that it populates
-                    # the X-SSL-Certificate header with the PEM-encoded certificate.
-                    'certificate': request.META.get('HTTP_X_SSL_CERTIFICATE', None),
+                    'certificate': certificate,
                 }
             }
         )
@@ -46,6 +46,8 @@ class Topology(monitor_processors.NetworkProcessor):
     into datastream.
     """
 
+    elected = True
+
     def process(self, context, nodes):
         """
         Performs network-wide processing and selects the nodes that will be processed
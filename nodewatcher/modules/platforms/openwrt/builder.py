@@ -83,7 +83,7 @@ def build_image(result, profile):
         for fw_file in profile['files']:
             try:
                 fw_files.append(
-                    (fw_file, builder.read_result_file(os.path.join('bin', result.builder.architecture, fw_file)))
+                    (fw_file, builder.fetch_result_file(os.path.join('bin', result.builder.architecture, fw_file)))
                 )
             except IOError:
                 raise cgm_exceptions.BuildError('Output file \'%s\' not found!' % fw_file)
@@ -1,5 +1,6 @@
 from django.utils import timezone
 
+from nodewatcher.core import models as core_models
 from nodewatcher.core.monitor import processors as monitor_processors, events as monitor_events
 from nodewatcher.modules.monitor.sources.http import processors as http_processors
 from nodewatcher.utils import ipaddr
@@ -7,6 +8,64 @@ from nodewatcher.utils import ipaddr
 from . import models as babel_models
 
 
+def get_address_key(address):
+    """
+    Returns a normalized representation of a link-local address, which is used
+    as a key in link-local address maps.
+
+    :param address: Address string or instance
+    """
+
+    if isinstance(address, ipaddr._BaseNet):
+        address = address.ip
+    elif not isinstance(address, ipaddr._IPAddrBase):
+        address = ipaddr.IPAddress(address.split('%')[0])
+
+    return str(address)
+
+
+def get_link_local_map(addresses=None):
+    """
+    Returns a dictionary mapping link-local addresses to primary keys of nodes
+    that own them.
+
+    :param addresses: Optional list of addresses to resolve; when not given, all
+      known addresses are returned
+    """
+
+    queryset = babel_models.LinkLocalAddress.objects.all()
+    if addresses is not None:
+        queryset = queryset.filter(address__in=addresses)
+
+    return dict([
+        (get_address_key(address), node_pk)
+        for address, node_pk in queryset.values_list('address', 'router__root_id')
+    ])
+
+
+class BabelLinkLocalIndex(monitor_processors.NetworkProcessor):
+    """
+    Loads the map of Babel link-local addresses to nodes once per cycle, so that
+    node processors can resolve neighbours without querying the database.
+    """
+
+    def process(self, context, nodes):
+        """
+        Performs network-wide processing and selects the nodes that will be processed
+        in any following processors.
+
+        :param context: Current context
+        :param nodes: A set of nodes that are to be processed
+        :return: A (possibly) modified context and a (possibly) modified set of nodes
+        """
+
+        with context.create('routing.babel') as babel_context:
+            babel_context.link_local_map = get_link_local_map()
+            self.logger.info("Mapped %d Babel link-local addresses." % len(babel_context.link_local_map))
+
+        return context, nodes
+
+
 class BabelTopology(monitor_processors.NodeProcessor):
     """
     Stores Babel topology data into the database. Will only run if HTTP monitor
@@ -44,46 +103,91 @@ class BabelTopology(monitor_processors.NodeProcessor):
             # Router ID.
             rtm.router_id = context.http.core.routing.babel.router_id
             # A list of link-local addresses of Babel interfaces. This is required in order to be
-            # able to generate a combined topology.
-            visible_lladdr = []
-            for address in context.http.core.routing.babel.link_local:
+            # able to generate a combined topology. Addresses rarely change, so they are only
+            # updated when the reported list differs from the last processed one.
+            if not context.http.is_unchanged(self.__class__.__name__, 'core.routing.babel.link_local'):
+                existing_lladdr = dict([
+                    (get_address_key(lladdr.address), lladdr) for lladdr in rtm.link_local.all()
+                ])
+                visible_lladdr = set()
+                new_lladdr = []
+                for address in context.http.core.routing.babel.link_local:
+                    try:
+                        address, interface = address.split('%')
+                    except ValueError:
+                        interface = None
+
+                    address = ipaddr.IPv6Address(address)
+                    lladdr_key = get_address_key(address)
+                    if lladdr_key in visible_lladdr:
+                        continue
+                    visible_lladdr.add(lladdr_key)
+
+                    lladdr = existing_lladdr.get(lladdr_key, None)
+                    if lladdr is None:
+                        new_lladdr.append(babel_models.LinkLocalAddress(router=rtm, address=address, interface=interface))
+                    elif lladdr.interface != interface:
+                        babel_models.LinkLocalAddress.objects.filter(pk=lladdr.pk).update(interface=interface)
+
+                babel_models.LinkLocalAddress.objects.bulk_create(new_lladdr)
+
+                # Remove all link-local addresses that do not exist anymore.
+                stale_lladdr = [existing_lladdr[stale_key].pk for stale_key in set(existing_lladdr).difference(visible_lladdr)]
+                if stale_lladdr:
+                    babel_models.LinkLocalAddress.objects.filter(pk__in=stale_lladdr).delete()
+                context.http.mark_processed(self.__class__.__name__, 'core.routing.babel.link_local')
+
+            # Neighbours. Destination nodes are resolved using the link-local address map
+            # prepared by BabelLinkLocalIndex; addresses missing from the map (for example
+            # when the map has not been prepared by this run) are resolved at once.
+            neighbours = []
+            for neighbour in context.http.core.routing.babel.neighbours:
                 try:
-                    address, interface = address.split('%')
+                    neighbours.append((get_address_key(neighbour['address']), neighbour))
                 except ValueError:
-                    interface = None
+                    continue
 
-                lladdr, created = rtm.link_local.get_or_create(address=ipaddr.IPv6Address(address))
-                lladdr.interface = interface
-                lladdr.save()
-                visible_lladdr.append(lladdr)
+            link_local_map = context.routing.babel.get('link_local_map', {})
+            unresolved = [key for key, neighbour in neighbours if key not in link_local_map]
+            if unresolved:
+                link_local_map = dict(link_local_map)
+                link_local_map.update(get_link_local_map(unresolved))
 
-            # Remove all link-local addresses that do not exist anymore.
-            rtm.link_local.exclude(pk__in=[x.pk for x in visible_lladdr]).delete()
+            existing_links = dict([
+                (link.peer_id, link)
+                for link in babel_models.BabelTopologyLink.objects.filter(monitor=rtm).select_related('peer')
+            ])
+            new_peers = set([link_local_map[key] for key, neighbour in neighbours if key in link_local_map])
+            new_peers = core_models.Node.objects.in_bulk(list(new_peers.difference(existing_links)))
 
-            # Neighbours.
             visible_links = []
-            for neighbour in context.http.core.routing.babel.neighbours:
-                # Attempt to resolve destination node.
-                try:
-                    lladdr = babel_models.LinkLocalAddress.objects.get(address=neighbour['address'])
-                except babel_models.LinkLocalAddress.DoesNotExist:
-                    # Skip unknown neighbour.
+            for key, neighbour in neighbours:
+                # Skip unknown neighbour.
+                dst_node_pk = link_local_map.get(key, None)
+                if dst_node_pk is None:
                     continue
 
-                dst_node = lladdr.router.root
+                elink = existing_links.get(dst_node_pk, None)
+                created = elink is None
+                if created:
+                    dst_node = new_peers.get(dst_node_pk, None)
+                    if dst_node is None:
+                        continue
+
+                    elink = existing_links[dst_node_pk] = babel_models.BabelTopologyLink(monitor=rtm, peer=dst_node)
 
-                elink, created = babel_models.BabelTopologyLink.objects.get_or_create(monitor=rtm, peer=dst_node)
                 elink.interface = neighbour['interface']
                 elink.rxcost = neighbour['rxcost']
                 elink.txcost = neighbour['txcost']
                 elink.cost = neighbour['cost']
                 elink.last_seen = timezone.now()
                 elink.save()
-                visible_links.append(elink)
+                if elink not in visible_links:
+                    visible_links.append(elink)
 
                 if created:
                     # TODO: This will still create one event for each end of the link.
-                    monitor_events.TopologyLinkEstablished(node, dst_node, babel_models.BABEL_PROTOCOL_NAME).post()
+                    monitor_events.TopologyLinkEstablished(node, elink.peer, babel_models.BABEL_PROTOCOL_NAME).post()
 
             # Compute average values.
             if visible_links:
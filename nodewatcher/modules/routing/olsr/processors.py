@@ -3,7 +3,7 @@ import uuid
 from django.conf import settings
 from django.utils import timezone
 
-from nodewatcher.core import models as core_models
+from nodewatcher.core import models as core_models, routerid as core_routerid
 from nodewatcher.core.monitor import models as monitor_models, processors as monitor_processors, events as monitor_events
 
 from . import models as olsr_models, parser as olsr_parser
@@ -42,17 +42,27 @@ class Topology(monitor_processors.NetworkProcessor):
             # Create a mapping from router ids to nodes
             self.logger.info("Mapping router IDs to node instances...")
             visible_routers = set(olsr_context.topology.keys())
-            registered_routers = set()
+            router_nodes = core_routerid.get_index().lookup_many(visible_routers, family='ipv4')
+            node_map = core_models.Node.objects.in_bulk(list(set(router_nodes.values())))
             olsr_context.router_id_map = {}
-            for node in core_models.Node.objects.regpoint('config').registry_fields(
-                router_id='core.routerid#router_id'
-            ).registry_filter(
-                core_routerid__rid_family='ipv4',
-                core_routerid__router_id__in=visible_routers,
-            ):
-                olsr_context.router_id_map[node.router_id[0]] = node
-                registered_routers.add(node.router_id[0])
-                nodes.add(node)
+            for router_id, node_pk in router_nodes.items():
+                if node_pk in node_map:
+                    olsr_context.router_id_map[router_id] = node_map[node_pk]
+
+            # Router IDs missing from the index are looked up in the database before they are
+            # considered unknown, in case the index has not yet been updated
+            unresolved = visible_routers.difference(olsr_context.router_id_map)
+            if unresolved:
+                for node in core_models.Node.objects.regpoint('config').registry_fields(
+                    router_id='core.routerid#router_id'
+                ).registry_filter(
+                    core_routerid__rid_family='ipv4',
+                    core_routerid__router_id__in=unresolved,
+                ):
+                    olsr_context.router_id_map[node.router_id[0]] = node
+
+            registered_routers = set(olsr_context.router_id_map)
+            nodes.update(olsr_context.router_id_map.values())
 
             self.logger.info("Creating unknown node instances...")
             for router_id in visible_routers.difference(registered_routers):
@@ -88,7 +98,7 @@ class NodePostprocess(monitor_processors.NodeProcessor):
         """
 
         try:
-            router_id = node.config.core.routerid(queryset=True).get(rid_family='ipv4').router_id
+            router_id = core_routerid.get_router_id(node.pk, 'ipv4')
             topology = context.routing.olsr.topology.get(router_id, [])
             announces = context.routing.olsr.announces.get(router_id, [])
             aliases = context.routing.olsr.aliases.get(router_id, [])
@@ -1,3 +1,5 @@
+from django.utils import timezone
+
 from nodewatcher.core.monitor import processors as monitor_processors
 from nodewatcher.modules.monitor.sources.http import processors as http_processors
 
@@ -21,6 +23,13 @@ class GenericSensors(monitor_processors.NodeProcessor):
         version = context.http.get_module_version('sensors.generic')
 
         if version >= 1:
+            if context.http.is_unchanged(self.__class__.__name__, 'sensors.generic'):
+                # Sensor values have not changed since they were last stored, so only
+                # refresh the timestamps and feed the existing models into the datastream
+                node.monitoring.sensors.generic(queryset=True).update(last_updated=timezone.now())
+                context.datastream.generic_sensors = list(node.monitoring.sensors.generic())
+                return context
+
             for sensor_id, data in context.http.sensors.generic.items():
                 node.monitoring.sensors.generic(queryset=True).update_or_create(
                     sensor_id=sensor_id,
@@ -31,4 +40,6 @@ class GenericSensors(monitor_processors.NodeProcessor):
                     }
                 )
 
+            context.http.mark_processed(self.__class__.__name__, 'sensors.generic')
+
         return context
@@ -469,6 +469,8 @@ TELEMETRY_PROCESSOR_PIPELINE = (
     'nodewatcher.modules.monitor.datastream.processors.NodeDatastream',
 )
 
+# Each run may also define a 'budget', the number of seconds a cycle may spend processing nodes
+# before the remaining nodes are carried over to the next cycle (see MONITOR_CYCLE_BUDGET).
 MONITOR_RUNS = {
     'latency': {
         'workers': 10,
@@ -485,14 +487,18 @@ MONITOR_RUNS = {
 
     'telemetry': {
         'workers': 30,
-        'interval': 300,
+        # Nodes are polled according to their own polling schedule (see MONITOR_POLLING_* settings),
+        # so the run interval only determines the shortest possible polling interval.
+        'interval': 60,
         'max_tasks_per_child': 50,
         'processors': (
-            'nodewatcher.core.monitor.processors.GetAllNodes',
             'nodewatcher.modules.routing.olsr.processors.Topology',
+            'nodewatcher.modules.administration.status.processors.GetDueNodes',
+            'nodewatcher.modules.routing.babel.processors.BabelLinkLocalIndex',
             'nodewatcher.modules.monitor.datastream.processors.TrackRegistryModels',
             'nodewatcher.modules.routing.olsr.processors.NodePostprocess',
             TELEMETRY_PROCESSOR_PIPELINE,
+            'nodewatcher.modules.administration.status.processors.UpdatePollingSchedule',
             'nodewatcher.modules.monitor.datastream.processors.MaintenanceBackprocess',
         ),
     },
@@ -529,10 +535,54 @@ MONITOR_RUNS = {
     },
 }
 
+# When set, monitoring is sharded between multiple monitoring daemon instances, each with its
+# own unique name (can also be set using the --shard option of monitord). Nodes are distributed
+# between instances by consistent hashing and network-wide maintenance runs on a single instance.
+MONITOR_SHARD_NAME = None
+# Number of seconds between heartbeats of a sharded instance.
+MONITOR_SHARD_HEARTBEAT_INTERVAL = 30
+# Number of seconds after the last heartbeat when an instance is considered gone and its nodes
+# are taken over by the remaining instances.
+MONITOR_SHARD_TIMEOUT = 120
+
+# Default cycle time budget of monitoring runs as a fraction of their interval. Nodes are processed
+# in the order of the age of their data and nodes left when the budget is spent are carried over.
+MONITOR_CYCLE_BUDGET = 0.9
+
+# When set, monitord collects metrics of monitoring processes on this UDP port and serves them
+# in the Prometheus text format at http://MONITOR_METRICS_HOST:MONITOR_METRICS_PORT/metrics.
+# Celery workers processing push telemetry report to the same address.
+MONITOR_METRICS_HOST = '127.0.0.1'
+MONITOR_METRICS_PORT = None
+
+# Per-application module types (for example 'cgm') that monitoring and Celery worker processes
+# load eagerly on startup instead of on first use.
+LOADER_WARMUP_MODULES = ()
+
+# Telemetry polling interval (in seconds) for reachable nodes.
+MONITOR_POLLING_INTERVAL = 300
+# Polling interval for nodes that have been flapping recently. Should not be lower than the
+# interval of the telemetry run.
+MONITOR_POLLING_MIN_INTERVAL = 60
+# Unreachable nodes are backed off exponentially up to this polling interval.
+MONITOR_POLLING_MAX_INTERVAL = 3600
+# Number of recent status transitions after which a node is considered to be flapping, with
+# each transition counting half as much after MONITOR_POLLING_FLAP_HALF_LIFE seconds.
+MONITOR_POLLING_FLAP_THRESHOLD = 3
+MONITOR_POLLING_FLAP_HALF_LIFE = 3600
+
+# Port on which nodes serve HTTP telemetry.
+MONITOR_HTTP_PORT = 80
 # Identifier of the run that should be used to handle HTTP pushes.
 MONITOR_HTTP_PUSH_RUN = 'telemetry-push'
+# When set, all HTTP push requests are also appended to this archive file, so that they can
+# later be replayed with the push_replay management command.
+MONITOR_HTTP_PUSH_RECORD = None
 # Base host that should be used for HTTP push. Must be reachable from nodes.
 MONITOR_HTTP_PUSH_HOST = '127.0.0.1'
+# Processors skip HTTP telemetry which has not changed since it was last processed, but never
+# for longer than this number of seconds.
+MONITOR_HTTP_DIGEST_MAX_AGE = 3600
 
 # Backend for the monitoring data archive.
 DATASTREAM_BACKEND = 'datastream.backends.mongodb.Backend'
@@ -550,6 +600,13 @@ OLSRD_MONITOR_PORT = 2006
 # UUID of the node that is performing measurements (usually the node where the nodewatcher
 # monitor is running on).
 MEASUREMENT_SOURCE_NODE = ''
+# Backend used for sending ICMP ECHO packets during RTT measurements. The default backend needs
+# either unprivileged ICMP sockets (see net.ipv4.ping_group_range) or the CAP_NET_RAW capability.
+MEASUREMENT_RTT_BACKEND = 'nodewatcher.modules.monitor.measurements.rtt.engine.IcmpSocketBackend'
+# Maximum number of ICMP ECHO packets sent per second during RTT measurements.
+MEASUREMENT_RTT_RATE = 1000
+# Number of seconds after which an unanswered ICMP ECHO packet is considered lost.
+MEASUREMENT_RTT_TIMEOUT = 1.0
 
 # Storage for generated firmware images.
 GENERATOR_STORAGE = 'django.core.files.storage.FileSystemStorage'
@@ -587,6 +644,21 @@ IMAGE_GENERATOR_EMAIL = DEFAULT_FROM_EMAIL
 
 FRONTEND_MAIN_COMPONENT = 'ListComponent'
 
+# Number of seconds for which rendered node partial entries are cached. Cached entries are
+# invalidated when node data changes, which requires a cache backend shared between the web
+# and monitoring processes (see CACHES); with a per-process cache, this bounds staleness.
+FRONTEND_PARTIAL_CACHE_TIMEOUT = 300
+
+# Number of seconds for which per-user sets of nodes with object permissions (used for listing
+# maintained nodes) are cached. Cached sets are invalidated when permissions change, with the same
+# requirements for the cache backend as above.
+PERMISSIONS_NODE_INDEX_CACHE_TIMEOUT = 600
+
+# Number of seconds for which the index of router IDs to nodes (used by monitoring processors) is
+# cached. The index is rebuilt whenever a router ID is saved or deleted, with the same requirements
+# for the cache backend as above.
+ROUTER_ID_INDEX_CACHE_TIMEOUT = 600
+
 MENUS = {
     #'main_menu': [
     #    {
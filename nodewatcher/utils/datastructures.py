@@ -58,3 +58,39 @@ class OrderedSet(collections.MutableSet):
         if isinstance(other, OrderedSet):
             return len(self) == len(other) and list(self) == list(other)
         return set(self) == set(other)
+
+
+class LRUCache(object):
+    """
+    A simple size-bounded cache which evicts least recently used items.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._items = collections.OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            return default
+
+        # Move the item to the most recently used position
+        self._items[key] = value
+        return value
+
+    def set(self, key, value):
+        self._items.pop(key, None)
+        self._items[key] = value
+
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
@@ -1,11 +1,45 @@
+import logging
+import time
+
 from django.apps import apps
+from django.conf import settings
 from django.utils import importlib, module_loading
 
+# Logger instance
+logger = logging.getLogger('loader')
+
+# Module types that have already been discovered and loaded in this process
+_loaded_types = {}
+# Time in seconds that it took to import each discovered module
+_import_times = {}
+
+
+def _discover(type):
+    """
+    Discovers and imports all per-application modules of the given type.
+
+    :param type: Module type name
+    :return: A list of imported modules
+    """
+
+    modules = []
+    for app in apps.get_app_configs():
+        # Attempt to import the submodule if it exists
+        if not module_loading.module_has_submodule(app.module, type):
+            continue
+
+        start = time.time()
+        modules.append(importlib.import_module(".%s" % type, app.name))
+        _import_times['%s.%s' % (app.name, type)] = time.time() - start
+
+    return modules
+
 
 def load_modules(*types):
     """
     Loads the per-application specific modules that must always be loaded
-    before registry operations can function normally.
+    before registry operations can function normally. Discovery is performed
+    only once per process for each type, so repeated calls are free.
 
     :param types: Types of modules that should be loaded (type name
       determines the filename that is loaded)
@@ -14,8 +48,51 @@ def load_modules(*types):
     # Note that we can't simply use module_loading.autodiscover_modules as it
     # doesn't work correctly when multiple module types are specified (it exits
     # on the first import failure). See: https://code.djangoproject.com/ticket/23670
-    for app in apps.get_app_configs():
-        for type in types:
-            # Attempt to import the submodule if it exists
-            if module_loading.module_has_submodule(app.module, type):
-                importlib.import_module(".%s" % type, app.name)
+    for type in types:
+        if type in _loaded_types:
+            continue
+
+        _loaded_types[type] = _discover(type)
+
+
+def get_loaded_modules(type):
+    """
+    Returns the modules of the given type, loading them if needed.
+
+    :param type: Module type name
+    """
+
+    load_modules(type)
+    return list(_loaded_types[type])
+
+
+def get_import_times():
+    """
+    Returns a dictionary mapping loaded module names to the time in seconds
+    it took to import them.
+    """
+
+    return dict(_import_times)
+
+
+def warmup(*types):
+    """
+    Eagerly loads modules, so that forked worker processes do not need to
+    perform discovery themselves. When no types are given, types configured
+    in the ``LOADER_WARMUP_MODULES`` setting are loaded.
+
+    :param types: Types of modules that should be loaded
+    """
+
+    if not types:
+        types = getattr(settings, 'LOADER_WARMUP_MODULES', ())
+
+    if not types:
+        return
+
+    start = time.time()
+    load_modules(*types)
+    logger.info("Loaded modules (%s) in %.3f seconds." % (", ".join(types), time.time() - start))
+
+    for name, duration in sorted(_import_times.items(), key=lambda x: x[1], reverse=True):
+        logger.debug("  - %s: %.3f seconds" % (name, duration))